@@ -1,24 +1,41 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import io
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from streamlit_option_menu import option_menu
 
-from database import save_to_db, load_from_db
-from modules.utils import t, fast_compute_moves, get_match_key_vectorized, get_match_key, parse_packing_time, BOX_UNITS, detect_vollpalettes, safe_hu, safe_del
+from database import query_table, merge_column_specs, projection_report, source_fingerprint, load_artifact, save_artifact, load_log_history
+from modules.utils import t, PREP_COLUMNS
+from core.prep import prepare_pick, prepare_hu, prepare_oe, prepare_cats, load_billing_aux, pick_months, add_moves, delivery_facts, delivery_hu_facts, LazyDataset, PREP_SOURCES, PICK_SOURCES, HU_SOURCES, PREP_VERSION
+from core.hu import detect_vollpalettes_vectorized
+from core.billing import resolve_delivery_base_categories
+from core.ingest import INGEST_WORKERS, submit_ingest
 
 from modules.tab_dashboard import render_dashboard
 from modules.tab_pallets import render_pallets
-from modules.tab_fu import render_fu
+from modules.tab_fu import render_fu, FU_COLUMNS
 from modules.tab_fu_compare import render_fu_compare
 from modules.tab_top import render_top
-from modules.tab_billing import render_billing
+from modules.tab_billing import render_billing, cached_billing_logic_v28, BILLING_COLUMNS
 from modules.tab_packing import render_packing
-from modules.tab_audit import render_audit
+from modules.tab_audit import render_audit, AUDIT_COLUMNS
 from modules.tab_board import render_board
 
+# Popisky nahraných souborů podle cílové tabulky (cs, en)
+UPLOAD_LABELS = {
+    'raw_pick': ('Pick Report', 'Pick Report'), 'raw_marm': ('MARM', 'MARM'), 'raw_vekp': ('VEKP', 'VEKP'), 'raw_vepo': ('VEPO', 'VEPO'),
+    'raw_cats': ('Kategorie', 'Categories'), 'raw_queue': ('Queue', 'Queue'), 'raw_likp': ('LIKP Report (O vs N)', 'LIKP Report'),
+    'raw_oe': ('OE-Times', 'OE-Times'), 'raw_manual': ('Ruční Master Data', 'Manual Master Data'),
+}
+
+# Z velkých SAP exportů se stahují jen sloupce, které některá záložka opravdu čte
+DATA_COLUMNS = merge_column_specs(PREP_COLUMNS, BILLING_COLUMNS, AUDIT_COLUMNS, FU_COLUMNS)
+# Po kolika sekundách se znovu ověří verze tabulek v DB (nahrání z jiného procesu, např. python -m core ingest)
+DATA_VERSION_TTL = 60
+
+
 # ==========================================
 # 1. NASTAVENÍ STRÁNKY A UNIVERZÁLNÍ SAAS DESIGN
 # ==========================================
@@ -108,155 +125,120 @@ if 'lang' not in st.session_state: st.session_state.lang = 'cs'
 def _t(cs, en): 
     return en if st.session_state.get('lang', 'cs') == 'en' else cs
 
+def _ingest_row(stats):
+    """Řádek panelu nahrávání: časy fází a propustnost jednoho souboru (tabulky) z ingest_file."""
+    total = stats.get('total_s') or (stats['read_s'] + stats['detect_s'] + stats['clean_s'] + stats['write_s'])
+    return {
+        _t('Soubor', 'File'): stats['file_name'], _t('Tabulka', 'Table'): stats['table_name'] or '',
+        _t('Řádky', 'Rows'): stats['rows_read'], 'MB': round(stats['bytes'] / 2**20, 1),
+        _t('Čtení (s)', 'Read (s)'): round(stats['read_s'], 2), _t('Detekce (s)', 'Detect (s)'): round(stats['detect_s'], 3),
+        _t('Čištění (s)', 'Clean (s)'): round(stats['clean_s'], 2), _t('Zápis (s)', 'Write (s)'): round(stats['write_s'], 2),
+        _t('Řádků/s', 'Rows/s'): int(stats['rows_read'] / total) if total > 0 else 0,
+        _t('Stav', 'Status'): '✅' if stats['status'] == 'hotovo' else _t('⏳ běží', '⏳ running'),
+    }
+
 # ==========================================
 # 2. LOGIKA NAČÍTÁNÍ A PŘÍPRAVY DAT
 # ==========================================
+@st.cache_data(show_spinner=False, ttl=DATA_VERSION_TTL)
+def fetch_data_version():
+    """Otisk verzí zdrojových tabulek - klíč všech cache dat níže (data_version).
+
+    Admin Zóna po nahrání cache maže hned (st.cache_data.clear); nahrání z jiného procesu se projeví nejpozději po ttl.
+    """
+    return source_fingerprint(PREP_SOURCES)
+
 @st.cache_data(show_spinner=False)
-def fetch_and_prep_data(use_marm=True):
-    df_pick_raw = load_from_db('raw_pick')
-    if df_pick_raw is None or df_pick_raw.empty: return None
-
-    df_marm_raw = load_from_db('raw_marm') if use_marm else None
-    df_queue_raw = load_from_db('raw_queue')
-    df_manual_raw = load_from_db('raw_manual')
-
-    df_pick = df_pick_raw.copy()
-    df_pick['Delivery'] = df_pick['Delivery'].astype(str).str.strip().replace(to_replace=['nan', 'NaN', 'None', 'none', ''], value=np.nan)
-    df_pick['Material'] = df_pick['Material'].astype(str).str.strip().replace(to_replace=['nan', 'NaN', 'None', 'none', ''], value=np.nan)
-    df_pick = df_pick.dropna(subset=['Delivery', 'Material']).copy()
-    
-    num_removed_admins = 0
-    if 'User' in df_pick.columns:
-        mask_admins = df_pick['User'].isin(['UIDJ5089', 'UIH25501'])
-        num_removed_admins = int(mask_admins.sum())
-        df_pick = df_pick[~mask_admins].copy()
-
-    df_pick['Match_Key'] = get_match_key_vectorized(df_pick['Material'])
-    df_pick['Qty'] = pd.to_numeric(df_pick['Act.qty (dest)'], errors='coerce').fillna(0)
-    df_pick['Source Storage Bin'] = df_pick.get('Source Storage Bin', df_pick.get('Storage Bin', '')).fillna('').astype(str)
-    df_pick['Removal of total SU'] = df_pick.get('Removal of total SU', '').fillna('').astype(str).str.strip().str.upper()
-    df_pick['Date'] = pd.to_datetime(df_pick.get('Confirmation date', df_pick.get('Confirmation Date')), errors='coerce')
-    
-    queue_count_col = 'Delivery'
-    df_pick['Queue'] = 'N/A'
-    if df_queue_raw is not None and not df_queue_raw.empty:
-        if 'Transfer Order Number' in df_pick.columns and 'Transfer Order Number' in df_queue_raw.columns:
-            q_map = df_queue_raw.dropna(subset=['Transfer Order Number', 'Queue']).drop_duplicates('Transfer Order Number').set_index('Transfer Order Number')['Queue'].to_dict()
-            df_pick['Queue'] = df_pick['Transfer Order Number'].map(q_map).fillna('N/A')
-            queue_count_col = 'Transfer Order Number'
-            for d_col in ['Confirmation Date', 'Creation Date']:
-                if d_col in df_queue_raw.columns:
-                    d_map = df_queue_raw.dropna(subset=['Transfer Order Number', d_col]).drop_duplicates('Transfer Order Number').set_index('Transfer Order Number')[d_col].to_dict()
-                    to_dates = df_pick['Transfer Order Number'].map(d_map)
-                    df_pick['Date'] = df_pick['Date'].fillna(pd.to_datetime(to_dates, errors='coerce'))
-                    break
-        elif 'SD Document' in df_queue_raw.columns:
-            q_map = df_queue_raw.dropna(subset=['SD Document', 'Queue']).drop_duplicates('SD Document').set_index('SD Document')['Queue'].to_dict()
-            df_pick['Queue'] = df_pick['Delivery'].map(q_map).fillna('N/A')
-        df_pick = df_pick[df_pick['Queue'].astype(str).str.upper() != 'CLEARANCE'].copy()
-
-    manual_boxes = {}
-    if df_manual_raw is not None and not df_manual_raw.empty:
-        c_mat, c_pkg = df_manual_raw.columns[0], df_manual_raw.columns[1]
-        for _, row in df_manual_raw.iterrows():
-            raw_mat = str(row[c_mat])
-            if raw_mat.upper() in ['NAN', 'NONE', '']: continue
-            mat_key = get_match_key(raw_mat)
-            pkg = str(row[c_pkg])
-            nums = re.findall(r'\bK-(\d+)ks?\b|(\d+)\s*ks\b|balen[íi]\s+po\s+(\d+)|krabice\s+(?:po\s+)?(\d+)|(?:role|pytl[íi]k|pytel)[^\d]*(\d+)', pkg, flags=re.IGNORECASE)
-            ext = sorted(list(set([int(g) for m in nums for g in m if g])), reverse=True)
-            if not ext and re.search(r'po\s*kusech', pkg, re.IGNORECASE): ext = [1]
-            if ext: manual_boxes[mat_key] = ext
-
-    box_dict, weight_dict, dim_dict = {}, {}, {}
-    if df_marm_raw is not None and not df_marm_raw.empty:
-        df_marm_raw['Match_Key'] = get_match_key_vectorized(df_marm_raw['Material'])
-        df_boxes = df_marm_raw[df_marm_raw['Alternative Unit of Measure'].isin(BOX_UNITS)].copy()
-        df_boxes['Numerator'] = pd.to_numeric(df_boxes['Numerator'], errors='coerce').fillna(0)
-        box_dict = df_boxes.groupby('Match_Key')['Numerator'].apply(lambda g: sorted([int(x) for x in g if x > 1], reverse=True)).to_dict()
-
-        df_st = df_marm_raw[df_marm_raw['Alternative Unit of Measure'].isin(['ST', 'PCE', 'KS', 'EA', 'PC'])].copy()
-        df_st['Gross Weight'] = pd.to_numeric(df_st['Gross Weight'], errors='coerce').fillna(0)
-        df_st['Weight_KG'] = np.where(df_st['Unit of Weight'].astype(str).str.upper() == 'G', df_st['Gross Weight'] / 1000.0, df_st['Gross Weight'])
-        weight_dict = df_st.groupby('Match_Key')['Weight_KG'].first().to_dict()
-
-        def to_cm(val, unit):
-            try:
-                v = float(val); u = str(unit).upper().strip()
-                return v / 10.0 if u == 'MM' else v * 100.0 if u == 'M' else v
-            except: return 0.0
-
-        for dim_col, short in [('Length', 'L'), ('Width', 'W'), ('Height', 'H')]:
-            if dim_col in df_st.columns: df_st[short] = df_st.apply(lambda r, dc=dim_col: to_cm(r[dc], r.get('Unit of Dimension', 'CM')), axis=1)
-            else: df_st[short] = 0.0
-        dim_dict = df_st.set_index('Match_Key')[['L', 'W', 'H']].max(axis=1).to_dict()
-
-    df_pick['Box_Sizes_List'] = df_pick['Match_Key'].apply(lambda m: manual_boxes.get(m, box_dict.get(m, [])))
-    df_pick['Piece_Weight_KG'] = df_pick['Match_Key'].map(weight_dict).fillna(0.0)
-    df_pick['Piece_Max_Dim_CM'] = df_pick['Match_Key'].map(dim_dict).fillna(0.0)
-
-    # -------------------------------------------------------------
-    # CENTRÁLNÍ MOZEK PRO DETEKCI VOLLPALET
-    # -------------------------------------------------------------
-    df_vekp_raw = load_from_db('raw_vekp')
-    df_vepo_raw = load_from_db('raw_vepo')
-    
-    voll_set = detect_vollpalettes(df_pick, df_vekp_raw, df_vepo_raw)
-
-    df_oe = load_from_db('raw_oe')
-    if df_oe is not None and not df_oe.empty:
-        cols_up = [str(c).upper() for c in df_oe.columns]
-        rename_map = {}
-        has_dn = False
-        has_time = False
-        
-        for orig, up in zip(df_oe.columns, cols_up):
-            if not has_dn and ('DN NUMBER' in up or 'DELIVERY' in up or 'DODAVKA' in up): 
-                rename_map[orig] = 'DN NUMBER (SAP)'
-                has_dn = True
-            elif not has_time and ('PROCESS' in up or 'CAS' in up or 'ČAS' in up or 'TIME' in up): 
-                rename_map[orig] = 'Process Time'
-                has_time = True
-                
-        df_oe.rename(columns=rename_map, inplace=True)
-        df_oe = df_oe.loc[:, ~df_oe.columns.duplicated()].copy()
-        
-        if 'DN NUMBER (SAP)' in df_oe.columns and 'Process Time' in df_oe.columns:
-            df_oe['Delivery'] = df_oe['DN NUMBER (SAP)'].astype(str).str.strip()
-            df_oe['Process_Time_Min'] = df_oe['Process Time'].apply(parse_packing_time)
-            
-            agg_dict = {'Process_Time_Min': 'sum'}
-            for col in ['CUSTOMER', 'Material', 'Scanning serial numbers', 'Reprinting labels ', 'Difficult KLTs', 'Shift', 'Number of item types']:
-                if col in df_oe.columns: agg_dict[col] = 'first'
-                
-            for col in ['KLT', 'Palety', 'Cartons']:
-                if col in df_oe.columns: 
-                    agg_dict[col] = lambda x, c=col: '; '.join(x.dropna().astype(str))
-                
-            df_oe = df_oe.groupby('Delivery').agg(agg_dict).reset_index()
-        else:
-            df_oe = None
-
-    df_cats = load_from_db('raw_cats')
-    if df_cats is not None and not df_cats.empty:
-        c_del_cats = next((c for c in df_cats.columns if str(c).strip().lower() in ['lieferung', 'delivery', 'zakázka']), df_cats.columns[0])
-        df_cats['Lieferung'] = df_cats[c_del_cats].astype(str).str.strip()
-        if 'Kategorie' in df_cats.columns and 'Art' in df_cats.columns: 
-            df_cats['Category_Full'] = df_cats['Kategorie'].astype(str).str.strip() + " " + df_cats['Art'].astype(str).str.strip()
-        df_cats = df_cats.drop_duplicates('Lieferung')
-
-    aus_data = {}
-    for sheet in ["LIKP", "SDSHP_AM2", "T031", "VEKP", "VEPO", "LIPS", "T023"]:
-        aus_df = load_from_db(f'aus_{sheet.lower()}')
-        if aus_df is not None: aus_data[sheet] = aus_df
+def fetch_pick_months(data_version=None):
+    """Měsíce v Pick reportu - stahují se jen DISTINCT datumy, ne celá tabulka ('NaT' = bez data)."""
+    df = query_table('raw_pick', columns=['=Date', '=Confirmation date'], distinct=True)
+    if df is None or df.empty or df.shape[1] == 0: return []
+    dates = pd.to_datetime(df.bfill(axis=1).iloc[:, 0], errors='coerce')
+    return sorted(dates.dt.to_period('M').astype(str).fillna('NaT').unique())
+
+def _prep_artifact(name, key, build):
+    """Část připravených dat: nejdřív artefakt z disku (podle verzí zdrojových tabulek), jinak výpočet a uložení."""
+    data = load_artifact(name, key)
+    if data is None:
+        data = build()
+        if data is not None: save_artifact(name, key, data)
+    return data
 
-    return {
-        'df_pick': df_pick, 'queue_count_col': queue_count_col, 'voll_set': voll_set,
-        'df_vekp': df_vekp_raw, 'df_vepo': df_vepo_raw,
-        'df_cats': df_cats, 'df_oe': df_oe, 'aus_data': aus_data,
-        'num_removed_admins': num_removed_admins, 'manual_boxes': manual_boxes,
-        'weight_dict': weight_dict, 'dim_dict': dim_dict, 'box_dict': box_dict
-    }
+@st.cache_data(show_spinner=False)
+def fetch_pick_data(use_marm=True, date_range=None, excluded_materials=(), data_version=None):
+    """Pick s rozkladem na krabice (None = prázdný Pick); pick_key je verze pro navazující části."""
+    key = source_fingerprint(PICK_SOURCES, PREP_VERSION, DATA_COLUMNS, use_marm, date_range, excluded_materials)
+    data = _prep_artifact('prep_pick', key, lambda: prepare_pick(use_marm, date_range, excluded_materials, DATA_COLUMNS))
+    if data is not None: data['pick_key'] = key
+    return data
+
+@st.cache_data(show_spinner=False)
+def fetch_hu_data(data_version=None):
+    """VEKP, VEPO a strom HU (hu_key = verze VEKP/VEPO)."""
+    key = source_fingerprint(HU_SOURCES, PREP_VERSION, DATA_COLUMNS)
+    return dict(_prep_artifact('prep_hu', key, lambda: prepare_hu(DATA_COLUMNS)), hu_key=key)
+
+@st.cache_data(show_spinner=False)
+def fetch_voll_set(pick_key, hu_key, _df_pick, _df_vekp, _df_vepo):
+    """Centrální mozek vollpalet - klíčem jsou verze Picku a VEKP/VEPO, DataFramy se nehashují."""
+    return _prep_artifact('prep_voll', f"{pick_key}_{hu_key}", lambda: detect_vollpalettes_vectorized(_df_pick, _df_vekp, _df_vepo))
+
+@st.cache_data(show_spinner=False)
+def fetch_oe(data_version=None):
+    return prepare_oe()
+
+@st.cache_data(show_spinner=False)
+def fetch_cats(data_version=None):
+    return prepare_cats()
+
+@st.cache_data(show_spinner=False)
+def fetch_fingerprint(use_marm=True, date_range=None, excluded_materials=(), data_version=None):
+    """Verze všech připravených dat - klíč pro navazující cache (fakturace)."""
+    return source_fingerprint(PREP_SOURCES, PREP_VERSION, DATA_COLUMNS, use_marm, date_range, excluded_materials)
+
+def load_dataset(use_marm=True, date_range=None, excluded_materials=(), data_version=None):
+    """Připravená data jako LazyDataset: Pick hned, VEKP/VEPO, vollpalety, OE a kategorie až když je záložka čte.
+
+    Každá část má vlastní cache (a artefakt na disku), lehké záložky tak velké SAP tabulky vůbec nestahují. None = prázdný Pick.
+    data_version (fetch_data_version) je součástí klíče všech cache - nová verze tabulek v DB je zneplatní.
+    """
+    pick = fetch_pick_data(use_marm, date_range, excluded_materials, data_version)
+    if pick is None: return None
+    hu = lambda ds: fetch_hu_data(data_version)
+    return LazyDataset({
+        'df_vekp': hu, 'df_vepo': hu, 'hu_index': hu, 'hu_key': hu,
+        'voll_set': lambda ds: {'voll_set': fetch_voll_set(ds['pick_key'], ds['hu_key'], ds['df_pick'], ds['df_vekp'], ds['df_vepo'])},
+        'df_oe': lambda ds: {'df_oe': fetch_oe(data_version)},
+        'df_cats': lambda ds: {'df_cats': fetch_cats(data_version)},
+        'fingerprint': lambda ds: {'fingerprint': fetch_fingerprint(use_marm, date_range, excluded_materials, data_version)},
+    }, **pick)
+
+@st.cache_data(show_spinner=False)
+def fetch_billing(data_version, use_marm, excluded_materials, limit_vahy, limit_rozmeru, kusy_na_hmat, unknown_month='Neznámé'):
+    """Fakturace jednou nad celým obdobím (zakázka + měsíc); výběr měsíců ji jen filtruje při vykreslení.
+
+    Klíčem je i verze dat (fetch_data_version), takže nová data v DB fakturaci přepočítají i bez st.cache_data.clear().
+    """
+    data = load_dataset(use_marm, None, excluded_materials, data_version)
+    if data is None: return pd.DataFrame(), pd.DataFrame()
+    df_pick = add_moves(data['df_pick'].assign(Month=pick_months(data['df_pick']['Date'], unknown_month)), limit_vahy, limit_rozmeru, kusy_na_hmat)
+    data_key = (data['fingerprint'], limit_vahy, limit_rozmeru, kusy_na_hmat, unknown_month)
+    return cached_billing_logic_v28(data_key, df_pick, data['df_vekp'], data['df_vepo'], data['df_cats'], data['queue_count_col'], data['voll_set'], _hu_index=data['hu_index'])
+
+@st.cache_data(show_spinner=False)
+def fetch_delivery_facts(data_key, _df_pick, queue_count_col):
+    """Fakta po zakázkách jen z Picku (delivery_facts) sdílená záložkami; data_key = otisk dat + výběr měsíců + limity pohybů."""
+    return delivery_facts(_df_pick, queue_count_col)
+
+@st.cache_data(show_spinner=False)
+def fetch_delivery_hu_facts(data_key, _df_pick, _data):
+    """Fakta doplněná o vollpalety a základní kategorii (delivery_hu_facts) - jen pro Fakturaci a Audit.
+
+    VEKP/VEPO, kategorie a pomocné tabulky fakturace se z LazyDatasetu stahují jen při sestavení, ne při cache hitu.
+    """
+    facts = fetch_delivery_facts(data_key, _df_pick, _data['queue_count_col'])
+    base_map = resolve_delivery_base_categories(facts['Clean_Del'].values, _data['df_cats'], df_pick=_df_pick, **load_billing_aux())
+    return delivery_hu_facts(facts, _df_pick, _data['voll_set'], base_map)
 
 
 # ==========================================
@@ -315,106 +297,56 @@ def main():
             admin_pwd = st.text_input(_t("Heslo:", "Password:"), type="password")
             if admin_pwd == "admin123":
                 uploaded_files = st.file_uploader(_t("Nahrát CSV/Excel", "Upload CSV/Excel"), accept_multiple_files=True)
+                incremental = st.toggle(_t("Inkrementálně (přidat k historii)", "Incremental (append to history)"), value=True, help=_t("Pick report, VEKP a VEPO se nepřepíší celé - nahradí se jen řádky se stejným klíčem (TO + položka, Internal HU) a zbytek historie zůstane v databázi.", "Pick report, VEKP and VEPO are not overwritten - only rows with the same key (TO + item, Internal HU) are replaced and the rest of the history stays in the database."))
                 if st.button(_t("Uložit do databáze", "Save to Database"), type="primary") and uploaded_files:
+                    # Živý panel: časy fází (čtení, detekce, čištění, zápis) a propustnost po každé dávce
+                    # Soubory se zpracují souběžně; vlákna jen zapisují měření, panel a hlášky kreslí hlavní vlákno skriptu
+                    panel, ingest_stats = st.empty(), {}
+                    def record_progress(stats):
+                        ingest_stats[(stats['file_name'], stats['table_name'])] = dict(stats)
+
                     with st.spinner(_t("Zpracovávám a ukládám do Supabase...", "Processing and saving...")):
-                        for file in uploaded_files:
-                            try:
-                                fname = file.name.lower()
-                                if fname.endswith('.xlsx') and 'auswertung' in fname:
-                                    aus_xl = pd.ExcelFile(file)
-                                    for sn in aus_xl.sheet_names: 
-                                        save_to_db(aus_xl.parse(sn, dtype=str), f"aus_{sn.lower()}")
-                                    st.success(f"✅ {_t('Uloženo', 'Saved')} (Auswertung): {file.name}")
-                                    continue
-
-                                temp_df = pd.read_csv(file, dtype=str, sep=None, engine='python') if fname.endswith('.csv') else pd.read_excel(file, dtype=str)
-                                temp_df.columns = temp_df.columns.str.strip()
-                                cols = temp_df.columns.tolist()
-                                cols_up = [str(c).upper() for c in cols]
-                                
-                                if any('DELIVERY' in c for c in cols_up) and any('ACT.QTY' in c for c in cols_up):
-                                    save_to_db(temp_df, 'raw_pick')
-                                    st.success(f"✅ {_t('Uloženo jako Pick Report', 'Saved as Pick Report')}: {file.name}")
-                                elif any('NUMERATOR' in c for c in cols_up) and any('ALTERNATIVE UNIT' in c for c in cols_up): 
-                                    save_to_db(temp_df, 'raw_marm')
-                                    st.success(f"✅ {_t('Uloženo jako MARM', 'Saved as MARM')}: {file.name}")
-                                elif any('HANDLING UNIT' in c for c in cols_up) and any('GENERATED DELIVERY' in c for c in cols_up): 
-                                    save_to_db(temp_df, 'raw_vekp')
-                                    st.success(f"✅ {_t('Uloženo jako VEKP', 'Saved as VEKP')}: {file.name}")
-                                elif (any('HANDLING UNIT ITEM' in c for c in cols_up) or any('HANDLING UNIT POSITION' in c for c in cols_up)) and any('MATERIAL' in c for c in cols_up): 
-                                    save_to_db(temp_df, 'raw_vepo')
-                                    st.success(f"✅ {_t('Uloženo jako VEPO', 'Saved as VEPO')}: {file.name}")
-                                elif any('LIEFERUNG' in c for c in cols_up) and any('KATEGORIE' in c for c in cols_up): 
-                                    save_to_db(temp_df, 'raw_cats')
-                                    st.success(f"✅ {_t('Uloženo jako Kategorie', 'Saved as Categories')}: {file.name}")
-                                elif any('QUEUE' in c for c in cols_up) and (any('TRANSFER ORDER' in c for c in cols_up) or any('SD DOCUMENT' in c for c in cols_up)): 
-                                    save_to_db(temp_df, 'raw_queue')
-                                    st.success(f"✅ {_t('Uloženo jako Queue', 'Saved as Queue')}: {file.name}")
-                                    
-                                elif 'likp' in fname or any('SHIPPING POINT' in c for c in cols_up) or any('VERSANDSTELLE' in c for c in cols_up):
-                                    save_to_db(temp_df, 'raw_likp')
-                                    st.success(f"✅ {_t('Uloženo jako LIKP Report (O vs N)', 'Saved as LIKP Report')}: {file.name}")
-                                    
-                                elif 'oe-times' in fname or any('PROCESS' in c for c in cols_up) or any('TIME' in c for c in cols_up):
-                                    rename_map = {}
-                                    has_dn = False
-                                    has_time = False
-                                    
-                                    for orig, up in zip(cols, cols_up):
-                                        if not has_dn and ('DN NUMBER' in up or 'DELIVERY' in up or 'DODAVKA' in up):
-                                            rename_map[orig] = 'DN NUMBER (SAP)'
-                                            has_dn = True
-                                        elif not has_time and ('PROCESS' in up or 'CAS' in up or 'ČAS' in up or 'TIME' in up):
-                                            rename_map[orig] = 'Process Time'
-                                            has_time = True
-                                            
-                                    temp_df.rename(columns=rename_map, inplace=True)
-                                    temp_df = temp_df.loc[:, ~temp_df.columns.duplicated()]
-                                    save_to_db(temp_df, 'raw_oe')
-                                    st.success(f"✅ {_t('Uloženo jako OE-Times', 'Saved as OE-Times')}: {file.name}")
-                                    
-                                elif len(cols) >= 2 and (any('MATERIAL' in c for c in cols_up) or any('MATERIÁL' in c for c in cols_up)):
-                                    save_to_db(temp_df, 'raw_manual')
-                                    st.success(f"✅ {_t('Uloženo jako Ruční Master Data', 'Saved as Manual Master Data')}: {file.name}")
-                                else:
-                                    st.warning(f"⚠️ {_t('Soubor', 'File')} '{file.name}' {_t('nebyl rozpoznán!', 'not recognized!')}")
-                                
-                            except Exception as e:
-                                st.error(f"❌ {_t('Chyba u souboru', 'Error processing file')} {file.name}: {e}")
+                        with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+                            futures = submit_ingest(pool, [(file, file.name) for file in uploaded_files], incremental, progress=record_progress)
+                            pending = set(futures)
+                            while pending:
+                                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                                if ingest_stats:
+                                    panel.dataframe(pd.DataFrame([_ingest_row(s) for s in list(ingest_stats.values())]), hide_index=True, use_container_width=True)
+                                for fut in sorted(done, key=futures.index):
+                                    file = uploaded_files[futures.index(fut)]
+                                    try:
+                                        saved = fut.result()
+                                        if not saved:
+                                            st.warning(f"⚠️ {_t('Soubor', 'File')} '{file.name}' {_t('nebyl rozpoznán!', 'not recognized!')}")
+                                        elif saved[0]['table_name'].startswith('aus_'):
+                                            st.success(f"✅ {_t('Uloženo', 'Saved')} (Auswertung): {file.name}")
+                                        else:
+                                            st.success(f"✅ {_t('Uloženo jako', 'Saved as')} {_t(*UPLOAD_LABELS[saved[0]['table_name']])}: {file.name}")
+                                    except Exception as e:
+                                        st.error(f"❌ {_t('Chyba u souboru', 'Error processing file')} {file.name}: {e}")
                                 
                         st.cache_data.clear()
+                        # Výchozí pohled (celé období, bez vyloučení) se připraví hned, uživatelé pak startují z artefaktu
+                        with st.spinner(_t("Předpočítávám data pro uživatele...", "Precomputing data for users...")):
+                            data = load_dataset(True, None, (), fetch_data_version())
+                            if data is not None: data['voll_set'] # Pick, VEKP/VEPO i vollpalety -> artefakty na disk
                         time.sleep(2.0)
                         st.rerun()
 
-    progress_bar = st.progress(0, text=_t("🚀 Inicializace Warehouse Control Tower...", "🚀 Initializing Warehouse Control Tower..."))
-    time.sleep(0.1)
-    
-    progress_bar.progress(30, text=_t("📥 Načítání a propojování dat z databáze...", "📥 Fetching and joining database records..."))
-    data_dict = fetch_and_prep_data(use_marm)
+                if st.button(_t("📈 Historie nahrávání", "📈 Upload history")):
+                    st.dataframe(load_log_history(), hide_index=True, use_container_width=True)
 
-    if data_dict is None:
-        progress_bar.empty()
-        st.warning(_t("🗄️ Databáze je zatím prázdná. Otevřete levé menu 'Admin Zóna', zadejte heslo 'admin123' a nahrajte Pick Report a další soubory.", "🗄️ Database is empty. Open Admin Zone in the left menu."))
-        return
-
-    progress_bar.progress(65, text=_t("⚙️ Výpočet fyzických pohybů a kontrola ergonomie...", "⚙️ Calculating physical movements and ergonomics..."))
-    df_pick = data_dict['df_pick']
-    
-    if exclude_mats_input:
-        excluded_materials = [m.strip().upper() for m in re.split(r'[,\s;]+', exclude_mats_input) if m.strip()]
-        if excluded_materials:
-            df_pick = df_pick[~df_pick['Material'].astype(str).str.upper().isin(excluded_materials)].copy()
-            if df_pick.empty:
-                progress_bar.empty()
-                st.warning(_t("⚠️ Po vyloučení těchto materiálů nezbyla v Pick reportu žádná data.", "⚠️ No data left after excluding these materials."))
-                st.stop()
+                if st.button(_t("📏 Report projekce sloupců", "📏 Column projection report")):
+                    with st.spinner(_t("Měřím objem dat...", "Measuring data volume...")):
+                        st.dataframe(projection_report(DATA_COLUMNS).round(2), hide_index=True, use_container_width=True)
 
-    st.session_state['voll_set'] = data_dict['voll_set']
+    excluded_materials = tuple(sorted({m.strip().upper() for m in re.split(r'[,\s;]+', exclude_mats_input or '') if m.strip()}))
 
     # ==========================================
-    # NOVÁ LOGIKA PRO FILTROVÁNÍ MĚSÍCŮ
+    # NOVÁ LOGIKA PRO FILTROVÁNÍ MĚSÍCŮ (rozsah dat se posílá do SQL)
     # ==========================================
-    df_pick['Month'] = df_pick['Date'].dt.to_period('M').astype(str).replace('NaT', _t('Neznámé', 'Unknown'))
+    unknown_month = _t('Neznámé', 'Unknown')
     st.sidebar.divider()
     
     date_options = [
@@ -424,51 +356,83 @@ def main():
     ]
     date_mode = st.sidebar.radio(_t("Filtr období:", "Date Filter:"), date_options, label_visibility="collapsed")
     
-    available_months = sorted(df_pick['Month'].unique())
+    data_version = fetch_data_version()
+    available_months = sorted(m.replace('NaT', unknown_month) for m in fetch_pick_months(data_version))
+    sel_months = None
     
     if date_mode == _t('Podle měsíce', 'By Month'):
         sel_month = st.sidebar.selectbox(_t("Vyberte měsíc:", "Select Month:"), options=available_months)
-        df_pick = df_pick[df_pick['Month'] == sel_month].copy()
+        sel_months = [sel_month] if sel_month else None
         
     elif date_mode == _t('Porovnání měsíců', 'Compare Months'):
         # Výchozí hodnota jsou poslední dva dostupné měsíce (pokud jsou)
         default_months = available_months[-2:] if len(available_months) >= 2 else available_months
         sel_months = st.sidebar.multiselect(_t("Vyberte měsíce k porovnání:", "Select Months to compare:"), options=available_months, default=default_months)
-        
-        if sel_months:
-            df_pick = df_pick[df_pick['Month'].isin(sel_months)].copy()
-        else:
+        if not sel_months:
             st.sidebar.info(_t("Vyberte alespoň jeden měsíc.", "Select at least one month."))
-            df_pick = df_pick.iloc[0:0].copy() # Zabrání vypsání všech dat při prázdném výběru
+
+    periods = [pd.Period(m, 'M') for m in (sel_months or []) if m != unknown_month]
+    date_range = (periods and (min(periods).start_time.to_pydatetime(), (max(periods) + 1).start_time.to_pydatetime())) or None
+
+    progress_bar = st.progress(0, text=_t("🚀 Inicializace Warehouse Control Tower...", "🚀 Initializing Warehouse Control Tower..."))
+    time.sleep(0.1)
+    
+    progress_bar.progress(30, text=_t("📥 Načítání a propojování dat z databáze...", "📥 Fetching and joining database records..."))
+    data_dict = load_dataset(use_marm, date_range, excluded_materials, data_version) # Další části se načtou až podle záložky
+
+    if data_dict is None:
+        progress_bar.empty()
+        if excluded_materials or date_range:
+            st.warning(_t("⚠️ Po vyloučení materiálů / výběru období nezbyla v Pick reportu žádná data.", "⚠️ No data left after excluding materials / selecting the period."))
+            st.stop()
+        st.warning(_t("🗄️ Databáze je zatím prázdná. Otevřete levé menu 'Admin Zóna', zadejte heslo 'admin123' a nahrajte Pick Report a další soubory.", "🗄️ Database is empty. Open Admin Zone in the left menu."))
+        return
+
+    progress_bar.progress(65, text=_t("⚙️ Výpočet fyzických pohybů a kontrola ergonomie...", "⚙️ Calculating physical movements and ergonomics..."))
+    df_pick = data_dict['df_pick']
+
+    # Přesný měsíc až po doplnění dat z Queue (SQL vrací i řádky bez data)
+    df_pick['Month'] = pick_months(df_pick['Date'], unknown_month)
+    if sel_months is not None:
+        df_pick = df_pick[df_pick['Month'].isin(sel_months)].copy() # Prázdný výběr zabrání vypsání všech dat
 
     # ==========================================
 
-    tt, te, tm = fast_compute_moves(df_pick['Qty'].values, df_pick['Queue'].values, df_pick['Removal of total SU'].values, df_pick['Box_Sizes_List'].values, df_pick['Piece_Weight_KG'].values, df_pick['Piece_Max_Dim_CM'].values, limit_vahy, limit_rozmeru, kusy_na_hmat)
-    df_pick['Pohyby_Rukou'], df_pick['Pohyby_Exact'], df_pick['Pohyby_Loose_Miss'] = tt, te, tm
+    add_moves(df_pick, limit_vahy, limit_rozmeru, kusy_na_hmat)
     df_pick['Celkova_Vaha_KG'] = df_pick['Qty'] * df_pick['Piece_Weight_KG']
 
     progress_bar.progress(90, text=_t("📊 Vykreslování vizualizací a tabulek...", "📊 Rendering charts and dashboards..."))
     time.sleep(0.2)
     progress_bar.empty()
 
+    # Fakta po zakázkách pro záložky, které je čtou (jednou na verzi dat, výběr měsíců, limity pohybů a jazyk -
+    # popisek neznámého měsíce je lokalizovaný); sloupce z VEKP/VEPO a LIKP jen pro Fakturaci a Audit
+    facts_key = (data_dict['fingerprint'], sel_months, limit_vahy, limit_rozmeru, kusy_na_hmat, unknown_month)
+    facts = lambda: fetch_delivery_facts(facts_key, df_pick, data_dict['queue_count_col'])
+    hu_facts = lambda: fetch_delivery_hu_facts(facts_key, df_pick, data_dict)
+
     display_q = None
     if selected_page == _t("Přehled a Fronty", "Dashboard & Queue"): 
         display_q = render_dashboard(df_pick, data_dict['queue_count_col'])
     elif selected_page == _t("Paletové zakázky", "Pallet Orders"): 
         render_pallets(df_pick)
     elif selected_page == _t("Celé palety (FU)", "Full Pallets (FU)"): 
-        render_fu(df_pick, data_dict['queue_count_col'])
+        st.session_state['voll_set'] = data_dict['voll_set']
+        render_fu(df_pick, data_dict['queue_count_col'], facts())
     elif selected_page == _t("Porovnání (FU vs SAP)", "Compare (FU vs SAP)"):
-        render_fu_compare(df_pick, st.session_state.get('billing_df'), st.session_state.get('voll_set'), data_dict['queue_count_col'])
+        st.session_state['voll_set'] = data_dict['voll_set']
+        render_fu_compare(df_pick, st.session_state.get('billing_df'), data_dict['voll_set'], data_dict['queue_count_col'], facts())
     elif selected_page == _t("Materiály (TOP)", "Top Materials"): 
         render_top(df_pick)
     elif selected_page == _t("Fakturace", "Billing"): 
-        billing_df = render_billing(df_pick, data_dict['df_vekp'], data_dict['df_vepo'], data_dict['df_cats'], data_dict['queue_count_col'])
+        billing = fetch_billing(data_version, use_marm, excluded_materials, limit_vahy, limit_rozmeru, kusy_na_hmat, unknown_month)
+        billing_df = render_billing(df_pick, data_dict['df_vekp'], data_dict['df_vepo'], data_dict['df_cats'], data_dict['queue_count_col'], hu_index=data_dict['hu_index'], billing=billing, facts=hu_facts())
         st.session_state['billing_df'] = billing_df
     elif selected_page == _t("Balení (Packing)", "Packing"): 
-        render_packing(st.session_state.get('billing_df', pd.DataFrame()), data_dict['df_oe'])
+        render_packing(st.session_state.get('billing_df', pd.DataFrame()), data_dict['df_oe'], facts())
     elif selected_page == _t("Audit & Rentgen", "Audit & X-Ray"): 
-        render_audit(df_pick, data_dict['df_vekp'], data_dict['df_vepo'], data_dict['df_oe'], data_dict['queue_count_col'], st.session_state.get('billing_df', pd.DataFrame()), data_dict['manual_boxes'], data_dict['weight_dict'], data_dict['dim_dict'], data_dict['box_dict'], limit_vahy, limit_rozmeru, kusy_na_hmat)
+        st.session_state['voll_set'] = data_dict['voll_set']
+        render_audit(df_pick, data_dict['df_vekp'], data_dict['df_vepo'], data_dict['df_oe'], data_dict['queue_count_col'], st.session_state.get('billing_df', pd.DataFrame()), data_dict['manual_boxes'], data_dict['weight_dict'], data_dict['dim_dict'], data_dict['box_dict'], limit_vahy, limit_rozmeru, kusy_na_hmat, hu_index=data_dict['hu_index'], facts=hu_facts())
     elif selected_page == _t("Nástěnka (Tisk grafů)", "Notice Board (Print)"):
         render_board(df_pick, st.session_state.get('billing_df', pd.DataFrame()))
 
@@ -0,0 +1,111 @@
+"""Základní kategorie zakázek (N/E/O/OE): původní smyčka přes zakázky vs. resolve_delivery_base_categories.
+
+Syntetické df_cats, LIKP, SDSHP_AM2, VBPA a Pick (včetně prázdných hodnot a duplicit); měří čas a ověří shodný
+výsledek na plných datech (pravidla a okrajové případy viz tests/test_billing.py). Při rozdílu skončí kódem 1, např.:
+    python benchmarks/bench_base_categories.py --dels 20000 --pick 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.billing import resolve_delivery_base_categories  # noqa: E402
+from core.hu import safe_del, safe_del_vectorized  # noqa: E402
+
+
+def make_data(n_dels, n_pick, seed=3):
+    rng = np.random.default_rng(seed)
+    dels = np.array([f"00{80000000 + i}" for i in range(n_dels)], dtype=object)
+    pick = pd.DataFrame({'Delivery': rng.choice(dels, n_pick), 'Queue': rng.choice(['PI_PL', 'pi_pa', 'PI_PA_OE', 'FU', 'PI_PL_FU', 'CLEARANCE', None], n_pick, p=[.2, .3, .2, .05, .05, .1, .1])})
+    pick['Clean_Del'] = safe_del_vectorized(pick['Delivery'])
+    df_cats = pd.DataFrame({'Lieferung': rng.choice(dels, n_dels // 10), 'Kategorie': rng.choice(['N', 'e ', 'O', 'OE', 'X', None], n_dels // 10)})
+    df_likp = pd.DataFrame({'Delivery': rng.choice(np.append(dels, [None, '0']), n_dels), 'Shipping Point/Receiving Pt': rng.choice(['FM20', 'fm21', 'FM22', 'FM23', 'FM24', 'FM99', None], n_dels)})
+    carriers = np.array([f"{i:010d}" for i in range(200)], dtype=object)
+    df_kep = pd.DataFrame({'Spediteur': carriers, 'KEP-Dienstleister': rng.choice(['X', '', None], len(carriers))})
+    df_vbpa = pd.DataFrame({'Vertriebsbeleg': rng.choice(dels, n_dels), 'Partnerrolle': rng.choice(['SP', 'cr', 'WE', None], n_dels),
+                            'Kreditor': rng.choice(np.append(carriers, [None]), n_dels), 'Debitor': rng.choice(carriers, n_dels)})
+    return dels, df_cats, df_likp, df_kep, df_vbpa, pick
+
+
+def reference(all_active_dels, df_cats, df_likp, df_kep, df_vbpa, df_pick_billing):
+    """Původní logika z cached_billing_logic_v28 (iterrows + filtr Picku pro každou zakázku)."""
+    del_base_map = {}
+    if df_cats is not None and not df_cats.empty:
+        c_del_cats = next((c for c in df_cats.columns if str(c).strip().lower() in ['lieferung', 'delivery', 'zakázka']), df_cats.columns[0])
+        c_kat = next((c for c in df_cats.columns if 'kategorie' in str(c).lower() or 'category' in str(c).lower()), None)
+        if c_del_cats and c_kat:
+            for _, r in df_cats.iterrows():
+                cat_val = str(r[c_kat]).strip().upper()
+                if cat_val in ['N', 'E', 'O', 'OE']: del_base_map[safe_del(r[c_del_cats])] = cat_val
+    del_vs_map = {}
+    if df_likp is not None and not df_likp.empty:
+        c_lief = next((c for c in df_likp.columns if "Delivery" in str(c) or "Lieferung" in str(c)), df_likp.columns[0])
+        c_vs = next((c for c in df_likp.columns if "Shipping Point" in str(c) or "Versandstelle" in str(c) or "Receiving Pt" in str(c)), None)
+        if c_vs:
+            for _, r in df_likp.iterrows(): del_vs_map[safe_del(r[c_lief])] = str(r[c_vs]).strip().upper()
+    kep_carriers = set()
+    if df_kep is not None and not df_kep.empty:
+        c_sped = next((c for c in df_kep.columns if "Spediteur" in str(c)), df_kep.columns[0])
+        c_kep = next((c for c in df_kep.columns if "KEP" in str(c)), None)
+        if c_kep:
+            for _, r in df_kep.iterrows():
+                if str(r[c_kep]).strip().upper() == 'X': kep_carriers.add(str(r[c_sped]).strip().lstrip('0'))
+    del_is_kep = {}
+    if df_vbpa is not None and not df_vbpa.empty:
+        c_beleg = next((c for c in df_vbpa.columns if "Vertriebsbeleg" in str(c) or "Delivery" in str(c)), df_vbpa.columns[0])
+        c_role = next((c for c in df_vbpa.columns if "Partnerrolle" in str(c) or "Partner Function" in str(c)), None)
+        c_kred = next((c for c in df_vbpa.columns if "Kreditor" in str(c) or "Vendor" in str(c)), None)
+        c_deb = next((c for c in df_vbpa.columns if "Debitor" in str(c) or "Customer" in str(c)), None)
+        if c_role and (c_kred or c_deb):
+            for _, r in df_vbpa.iterrows():
+                if str(r[c_role]).strip().upper() in ['SP', 'CR']:
+                    if str(r.get(c_kred, r.get(c_deb, ''))).strip().lstrip('0') in kep_carriers: del_is_kep[safe_del(r[c_beleg])] = True
+    for d in all_active_dels:
+        if d not in del_base_map:
+            base = {'FM20': 'N', 'FM21': 'E', 'FM22': 'E', 'FM23': 'N', 'FM24': 'O'}.get(del_vs_map.get(d, ""), 'N')
+            if del_is_kep.get(d, False):
+                base = {'N': 'E', 'O': 'OE'}.get(base, base)
+            elif not df_pick_billing.empty:
+                grp = df_pick_billing[df_pick_billing['Clean_Del'] == d]
+                if not grp.empty:
+                    all_queues = set(grp['Queue'].dropna().astype(str).str.upper().unique())
+                    has_pallet = any(q in ['PI_PL', 'PI_PL_OE', 'FU', 'FU_O', 'FUOE', 'PI_PL_FU'] for q in all_queues)
+                    if ('PI_PA' in all_queues or 'PI_PA_OE' in all_queues) and not has_pallet:
+                        base = {'N': 'E', 'O': 'OE'}.get(base, base)
+            del_base_map[d] = base
+    return del_base_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dels', type=int, default=5_000)
+    parser.add_argument('--pick', type=int, default=100_000)
+    args = parser.parse_args()
+
+    dels, df_cats, df_likp, df_kep, df_vbpa, pick = make_data(args.dels, args.pick)
+    active = safe_del_vectorized(pd.Series(dels)).unique()
+
+    t0 = time.perf_counter()
+    ref = reference(active, df_cats, df_likp, df_kep, df_vbpa, pick)
+    t_loop = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vec = resolve_delivery_base_categories(active, df_cats, df_likp, df_kep, df_vbpa, pick)
+    t_vec = time.perf_counter() - t0
+
+    print(f"{len(active):,} zakázek, Pick {len(pick):,} řádků: {pd.Series(vec).value_counts().to_dict()}")
+    print(f"smyčka přes zakázky {t_loop:8.2f} s")
+    print(f"groupby             {t_vec:8.2f} s  ({t_loop / max(t_vec, 1e-9):.0f}x)")
+    if vec != ref:
+        print(f"CHYBA - rozdíl u {sum(vec.get(k) != v for k, v in ref.items())} zakázek", file=sys.stderr)
+        return 1
+
+    print("OK - shodné kategorie")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
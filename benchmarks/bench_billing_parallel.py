@@ -0,0 +1,67 @@
+"""Fakturace v jednom procesu vs. po dávkách zakázek v procesech (dělení podle měsíce VEKP nebo hashe zakázky).
+
+Syntetická data (viz bench_vollpalettes) rozložená do několika měsíců; ověří shodný billing_df i detail HU.
+Procesy se vynutí i pod prahem BILLING_PARALLEL_MIN_ROWS a na jednom jádru (min_rows=0), např.:
+    python benchmarks/bench_billing_parallel.py --vekp 400000 --pick 2000000 --workers 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_vollpalettes import make_data  # noqa: E402
+from core.billing import billing_logic  # noqa: E402
+from core.hu import detect_vollpalettes_vectorized, stage_table  # noqa: E402
+
+
+def make_inputs(n_vekp, n_pick, months, seed=11):
+    rng = np.random.default_rng(seed)
+    df_pick, df_vekp, df_vepo = make_data(n_vekp, n_pick)
+    df_vekp['Created on'] = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 31 * months, len(df_vekp)), unit='D')
+    df_vepo['Material'] = rng.choice([f"MAT-{i}" for i in range(200)], len(df_vepo))
+    df_pick['Material'] = rng.choice([f"MAT-{i}" for i in range(200)], len(df_pick))
+    df_pick['Transfer Order Number'] = rng.integers(0, n_pick // 3 + 1, len(df_pick)).astype(str)
+    df_pick['Source Storage Bin'] = rng.choice([f"BIN-{i}" for i in range(5000)], len(df_pick))
+    df_pick['Queue'] = df_pick['Queue'].fillna('PI_PL') # zakázka bez jediné fronty v Picku reálně nenastává
+    df_pick['Month'] = '2024-01'
+    df_pick, df_vekp, df_vepo = stage_table(df_pick, 'raw_pick'), stage_table(df_vekp, 'raw_vekp'), stage_table(df_vepo, 'raw_vepo')
+    voll_set = detect_vollpalettes_vectorized(df_pick, df_vekp, df_vepo)
+    return df_pick, df_vekp, df_vepo, voll_set
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vekp', type=int, default=100_000)
+    parser.add_argument('--pick', type=int, default=400_000)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--workers', type=int, default=0, help="0 = všechna jádra")
+    args = parser.parse_args()
+
+    df_pick, df_vekp, df_vepo, voll_set = make_inputs(args.vekp, args.pick, args.months)
+    run = lambda **kw: billing_logic(df_pick, df_vekp, df_vepo, None, 'Transfer Order Number', voll_set, **kw)
+
+    t0 = time.perf_counter()
+    ref = run()
+    t_serial = time.perf_counter() - t0
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Pick {len(df_pick):,} řádků, VEKP {len(df_vekp):,}, {args.months} měsíců, jader {os.cpu_count()}, procesů {workers}")
+    if workers == 1: print("(jeden proces - fakturace poběží bez poolu, zadejte --workers > 1)")
+    print(f"jeden proces       {t_serial:8.2f} s")
+
+    for shard_by in ['month', 'hash']:
+        t0 = time.perf_counter()
+        billing_df, df_hu_details = run(workers=args.workers, shard_by=shard_by, min_rows=0)
+        t_par = time.perf_counter() - t0
+        print(f"procesy ({shard_by:5s})    {t_par:8.2f} s  ({t_serial / max(t_par, 1e-9):.1f}x)")
+        pd.testing.assert_frame_equal(ref[0], billing_df)
+        pd.testing.assert_frame_equal(ref[1], df_hu_details)
+    print("OK - shodná fakturace i detail HU")
+
+
+if __name__ == '__main__':
+    main()
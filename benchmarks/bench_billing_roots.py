@@ -0,0 +1,91 @@
+"""Fakturace kořenových HU (krok 5 v cached_billing_logic_v28): původní smyčka přes kořeny vs. categorize_roots.
+
+Syntetická VEKP (viz bench_hu_index) + VEPO a pickované materiály; ověří shodný detail HU i počty, např.:
+    python benchmarks/bench_billing_roots.py --vekp 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_hu_index import make_vekp  # noqa: E402
+from core.billing import categorize_roots  # noqa: E402
+from core.hu import build_hu_index, hu_leaves, hu_tree_rows  # noqa: E402
+
+
+def make_inputs(n, seed=5):
+    rng = np.random.default_rng(seed)
+    vekp = hu_tree_rows(make_vekp(n, seed))
+    mats = np.array([f"MAT-{i}" for i in range(max(n // 20, 10))], dtype=object)
+    hus = vekp['Clean_HU_Int'].values
+    vepo_pairs = pd.DataFrame({'leaf': rng.choice(hus, 2 * n), 'mat': rng.choice(mats, 2 * n)}).drop_duplicates()
+    dels = vekp['Clean_Del'].unique()
+    picked = pd.DataFrame({'d': rng.choice(dels, 2 * n), 'm': np.where(rng.random(2 * n) < 0.8, vepo_pairs['mat'].values[rng.integers(0, len(vepo_pairs), 2 * n)], rng.choice(mats, 2 * n))})
+    voll_hus = vekp.sample(frac=0.05, random_state=seed)
+    voll_set = set(zip(voll_hus['Clean_Del'], voll_hus['Clean_HU_Int'])) | set(zip(voll_hus['Clean_Del'], voll_hus['Clean_HU_Ext']))
+    del_base_map = dict(zip(dels, rng.choice(['N', 'E', 'O', 'OE'], len(dels))))
+    return vekp, vepo_pairs, picked, voll_set, del_base_map
+
+
+def reference(vekp, index, vepo_pairs, picked, voll_set, del_base_map):
+    """Původní smyčka z cached_billing_logic_v28 (listy už z indexu, viz bench_hu_index)."""
+    vepo_mats = vepo_pairs.groupby('leaf')['mat'].apply(set).to_dict()
+    picked_mats_by_del = picked.groupby('d')['m'].apply(set).to_dict()
+    int_to_ext = dict(zip(vekp['Clean_HU_Int'], vekp['Clean_HU_Ext']))
+    del_hu_counts, hu_details_list = [], []
+    root_df = vekp[vekp['Clean_Parent'] == '']
+    for d, grp in root_df.groupby('Clean_Del'):
+        base = del_base_map.get(d, "N")
+        valid_picked_mats = picked_mats_by_del.get(d, set())
+        for _, r in grp.iterrows():
+            ext_hu, root_hu = r['Clean_HU_Ext'], r['Clean_HU_Int']
+            leaves = hu_leaves(index, root_hu)
+            is_voll = (d, ext_hu) in voll_set or (d, root_hu) in voll_set or any((d, leaf) in voll_set or (d, int_to_ext.get(leaf, '')) in voll_set for leaf in leaves)
+            mats = set()
+            for leaf in leaves: mats.update(vepo_mats.get(leaf, set()))
+            real_mats = {m for m in mats if m in valid_picked_mats}
+            if not real_mats and len(mats) > 0: real_mats = mats
+            if is_voll:
+                cat = {"OE": "O Vollpalette", "E": "N Vollpalette"}.get(base, f"{base} Vollpalette")
+            elif real_mats:
+                cat = f"{base} Sortenrein" if len(real_mats) == 1 else f"{base} Misch"
+            else:
+                continue
+            del_hu_counts.append({'Clean_Del': d, 'Category_Full': cat, 'pocet_hu': 1})
+            hu_details_list.append({'Clean_Del': d, 'HU_Ext': ext_hu, 'HU_Int': root_hu, 'Is_Vollpalette': 'ANO' if is_voll else 'NE', 'Category_Full': cat, 'Materials': ", ".join(sorted(real_mats))})
+    return pd.DataFrame(hu_details_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vekp', type=int, default=50_000)
+    args = parser.parse_args()
+
+    vekp, vepo_pairs, picked, voll_set, del_base_map = make_inputs(args.vekp)
+    index = build_hu_index(vekp)
+
+    t0 = time.perf_counter()
+    ref = reference(vekp, index, vepo_pairs, picked, voll_set, del_base_map)
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    roots = vekp.loc[vekp['Clean_Parent'] == '', ['Clean_Del', 'Clean_HU_Ext', 'Clean_HU_Int']].reset_index(drop=True)
+    roots['base'] = roots['Clean_Del'].map(del_base_map).fillna('N')
+    picked_keys = pd.Index((picked['d'] + '\x1f' + picked['m']).unique(), dtype=object)
+    vec, _ = categorize_roots(roots, index, vepo_pairs, voll_set, picked_keys, dict(zip(vekp['Clean_HU_Int'], vekp['Clean_HU_Ext'])))
+    t_vec = time.perf_counter() - t0
+
+    print(f"VEKP {len(vekp):,} řádků, fakturovaných kořenů {len(ref):,}")
+    print(f"smyčka přes kořeny {t_loop:8.2f} s")
+    print(f"sloupcově          {t_vec:8.2f} s  ({t_loop / max(t_vec, 1e-9):.0f}x)")
+    pd.testing.assert_frame_equal(ref, vec, check_dtype=False)
+    print("OK - shodný detail HU")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Latence cache hitu fakturace: hashování celých DataFramů a voll_set (původní podpis) vs. klíč z otisku dat.
+
+Při hitu se tělo funkce nespouští - čas tvoří jen hashování argumentů a kopie výsledku z cache, proto obě
+varianty vrací stejný výsledek a liší se jen podpisem (viz cached_billing_logic_v28), např.:
+    python benchmarks/bench_cache_keys.py --vekp 500000 --pick 2000000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_vollpalettes import make_data  # noqa: E402
+from core.hu import detect_vollpalettes_vectorized, stage_table  # noqa: E402
+
+logging.getLogger('streamlit').setLevel(logging.ERROR) # mimo `streamlit run` chybí runtime (MemoryCacheStorageManager)
+
+
+def make_result(df_pick):
+    """Výsledek velikosti skutečné fakturace (řádek na zakázku a kategorii) - kopíruje se při každém hitu."""
+    dels = df_pick['Clean_Del'].unique()
+    return pd.DataFrame({'Clean_Del': dels, 'Category_Full': 'N Sortenrein', 'pocet_hu': 1, 'pocet_to': 1}), pd.DataFrame({'Clean_Del': dels})
+
+
+@st.cache_data(show_spinner=False)
+def billing_hashed(df_pick, df_vekp, df_vepo, df_cats, queue_count_col, voll_set, _hu_index=None):
+    return make_result(df_pick)
+
+
+@st.cache_data(show_spinner=False)
+def billing_keyed(data_key, _df_pick, _df_vekp, _df_vepo, _df_cats, queue_count_col, _voll_set, _hu_index=None):
+    return make_result(_df_pick)
+
+
+def hit_latency(fn, args, repeat):
+    fn(*args) # miss - naplní cache
+    t0 = time.perf_counter()
+    for _ in range(repeat): fn(*args)
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vekp', type=int, default=100_000)
+    parser.add_argument('--pick', type=int, default=500_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df_pick, df_vekp, df_vepo = make_data(args.vekp, args.pick)
+    df_pick, df_vekp, df_vepo = stage_table(df_pick, 'raw_pick'), stage_table(df_vekp, 'raw_vekp'), stage_table(df_vepo, 'raw_vepo')
+    voll_set = detect_vollpalettes_vectorized(df_pick, df_vekp, df_vepo)
+    df_cats = pd.DataFrame({'Lieferung': df_pick['Delivery'].unique(), 'Kategorie': 'N'})
+    frames = (df_pick, df_vekp, df_vepo, df_cats, 'Transfer Order Number', voll_set)
+    data_key = ('otisk-verzi-zdrojovych-tabulek', 150, 80, 1, 'Neznámé')
+
+    t_hashed = hit_latency(billing_hashed, frames, args.repeat)
+    t_keyed = hit_latency(billing_keyed, (data_key,) + frames, args.repeat)
+
+    print(f"Pick {len(df_pick):,} řádků, VEKP {len(df_vekp):,}, VEPO {len(df_vepo):,}, voll_set {len(voll_set):,}")
+    print(f"hit - hash DataFramů {t_hashed * 1000:9.1f} ms")
+    print(f"hit - otisk dat      {t_keyed * 1000:9.1f} ms  ({t_hashed / max(t_keyed, 1e-9):.0f}x)")
+    pd.testing.assert_frame_equal(billing_hashed(*frames)[0], billing_keyed(data_key, *frames)[0])
+    assert t_keyed < t_hashed, "Klíč z otisku má být levnější než hash dat"
+    print("OK - shodný výsledek, levnější hit")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Porovnání rychlosti zápisu: pandas to_sql (INSERT po 1000 řádcích) vs. COPY ... FROM STDIN.
+
+Spuštění proti lokálnímu Postgresu (náhrada za Supabase), např.:
+    docker run --rm -e POSTGRES_PASSWORD=pw -p 5432:5432 postgres:16
+    python benchmarks/bench_db_load.py --db-url postgresql+psycopg2://postgres:pw@localhost:5432/postgres --rows 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import _write_frame  # noqa: E402
+
+
+def make_frame(rows, cols):
+    # SAP exporty se nahrávají s dtype=str, proto i zde samé texty
+    rng = np.random.default_rng(42)
+    data = {f"Col {i}": rng.integers(0, 10**9, rows).astype(str) for i in range(cols)}
+    data['Delivery'] = rng.integers(10**8, 10**9, rows).astype(str)
+    data['Material'] = np.char.add('MAT-', rng.integers(0, 50_000, rows).astype(str))
+    return pd.DataFrame(data, dtype=str)
+
+
+def run(engine, df, table_name, use_copy):
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        if use_copy:
+            _write_frame(conn, df, table_name, if_exists='replace')
+        else:
+            df.to_sql(table_name, conn, if_exists='replace', index=False, chunksize=1000)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', default=os.environ.get('BENCH_DB_URL'), help='SQLAlchemy URL lokálního Postgresu')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--cols', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error('Chybí --db-url (nebo proměnná prostředí BENCH_DB_URL).')
+
+    engine = create_engine(args.db_url)
+    if engine.dialect.name != 'postgresql':
+        print(f"Pozor: {engine.dialect.name} nepodporuje COPY, obě cesty poběží přes to_sql.")
+
+    df = make_frame(args.rows, args.cols)
+    print(f"{len(df):,} řádků x {len(df.columns)} sloupců, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB v paměti")
+
+    for label, use_copy in [('to_sql (INSERT, chunksize=1000)', False), ('COPY FROM STDIN', True)]:
+        times = [run(engine, df, '_bench_load', use_copy) for _ in range(args.repeat)]
+        best = min(times)
+        print(f"{label:<34} nejlepší {best:7.2f} s  ->  {len(df) / best:12,.0f} řádků/s")
+
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS "_bench_load"'))
+
+
+if __name__ == '__main__':
+    main()
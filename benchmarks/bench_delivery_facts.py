@@ -0,0 +1,80 @@
+"""Fakta po zakázkách: původní výpočty v záložkách (safe_del přes apply, groupby s lambdou, apply(set), kontrola
+vollpalety po řádcích) vs. jedna tabulka delivery_facts (+ delivery_hu_facts pro vollpalety).
+
+Ověří shodné kusy, převažující materiál (včetně shod v počtu řádků), fronty, počet TO, pohyby i příznak vollpalety, např.:
+    python benchmarks/bench_delivery_facts.py --pick 2000000 --deliveries 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.hu import safe_del, safe_hu, stage_table  # noqa: E402
+from core.prep import delivery_facts, delivery_hu_facts  # noqa: E402
+
+
+def facts_per_tab(df_pick, voll_set):
+    """Původní výpočty: Balení (kusy, materiál), Celé palety (fronty, vollpalety), Rentgen (TO, pohyby)."""
+    df = df_pick.copy()
+    df['Clean_Del'] = df['Delivery'].apply(safe_del)
+    out = df.groupby('Clean_Del').agg(
+        Skladovy_Material=('Material', lambda x: x.value_counts().index[0] if len(x.value_counts()) > 0 else ""),
+        Celkove_Kusy=('Qty', 'sum')
+    )
+    out['Fronty'] = df.assign(Q_Upper=df['Queue'].astype(str).str.upper()).groupby('Clean_Del')['Q_Upper'].apply(set)
+    out['Pocet_TO'] = df.groupby('Clean_Del')['Transfer Order Number'].nunique()
+    out['Pohyby'] = df.groupby('Clean_Del')['Pohyby_Rukou'].sum()
+
+    def check_is_vollpalette(row):
+        hu = safe_hu(row.get('Handling Unit', ''))
+        if not hu: hu = safe_hu(row.get('Source storage unit', ''))
+        return (row['Clean_Del'], hu) in voll_set
+
+    out['Vollpaleta'] = df.apply(check_is_vollpalette, axis=1).groupby(df['Clean_Del']).any()
+    return out.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pick', type=int, default=300_000)
+    parser.add_argument('--deliveries', type=int, default=30_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(5)
+    n = args.pick
+    hu = rng.integers(10**9, 10**9 + n, n).astype(str)
+    df_pick = stage_table(pd.DataFrame({
+        'Delivery': np.char.add('0080', rng.integers(0, args.deliveries, n).astype(str)),
+        'Material': np.char.add('MAT-', rng.integers(0, 300, n).astype(str)), # málo materiálů -> časté shody
+        'Act.qty (dest)': rng.integers(1, 50, n).astype(str),
+        'Queue': rng.choice(['PI_PL', 'PI_PL_FU', 'PI_PL_FUOE', 'PI_PA'], n),
+        'Transfer Order Number': rng.integers(0, n // 3, n).astype(str),
+        'Handling Unit': np.where(rng.random(n) < 0.3, '', hu),
+        'Source storage unit': np.where(rng.random(n) < 0.5, hu, ''),
+    }), 'raw_pick')
+    df_pick['Pohyby_Rukou'] = rng.integers(1, 10, n)
+    voll_set = set(zip(df_pick['Clean_Del'][::7], df_pick['Clean_HU'][::7]))
+
+    t0 = time.perf_counter()
+    ref = facts_per_tab(df_pick, voll_set)
+    t_tabs = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    facts = delivery_hu_facts(delivery_facts(df_pick, 'Transfer Order Number'), df_pick, voll_set, {})
+    t_facts = time.perf_counter() - t0
+
+    print(f"Pick {len(df_pick):,} řádků, {len(facts):,} zakázek")
+    print(f"výpočty v záložkách  {t_tabs:8.2f} s")
+    print(f"delivery_(hu_)facts  {t_facts:8.2f} s  ({t_tabs / max(t_facts, 1e-9):.0f}x)")
+    cols = ['Clean_Del', 'Skladovy_Material', 'Celkove_Kusy', 'Pocet_TO', 'Pohyby', 'Vollpaleta']
+    pd.testing.assert_frame_equal(ref[cols], facts[cols], check_dtype=False)
+    assert [set(q) for q in ref['Fronty']] == [set(q) for q in facts['Fronty']]
+    assert (facts['Pocet_Radku'] == df_pick.groupby('Clean_Del').size().values).all()
+    print("OK - shodná fakta po zakázkách")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Strom HU: původní parent_map/children_map + rekurzivní get_leaves vs. zkompilovaný index (build_hu_index).
+
+Syntetická VEKP s vícestupňovým vnořením, cykly, chybějícími nadřazenými HU a duplicitními řádky.
+Měří čas a ověří shodné listy pro každý kořen (fakturace) i shodné kořeny pro každý list (audit); okrajové
+případy viz tests/test_hu.py. Při rozdílu skončí kódem 1, např.:
+    python benchmarks/bench_hu_index.py --vekp 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.hu import build_hu_index, hu_leaves, hu_root, hu_tree_rows  # noqa: E402
+
+
+def make_vekp(n, seed=11):
+    rng = np.random.default_rng(seed)
+    hu_int = np.array([str(10**9 + i) for i in range(n)], dtype=object)
+    # Rodič má vždy nižší pořadí -> stromy s hloubkou až desítek úrovní; část odkazů míří mimo VEKP nebo do cyklu
+    parent = np.array([None] * n, dtype=object)
+    nested = rng.random(n) < 0.7
+    idx = np.flatnonzero(nested & (np.arange(n) > 0))
+    parent[idx] = hu_int[(idx - rng.integers(1, 20, len(idx)).clip(max=idx))]
+    phantom = rng.random(n) < 0.01
+    parent[phantom] = np.char.add('9', np.arange(phantom.sum()).astype(str)).astype(object)
+    cyc = np.flatnonzero(rng.random(n) < 0.002)
+    parent[cyc] = hu_int[np.minimum(cyc + rng.integers(1, 5, len(cyc)), n - 1)]
+    df = pd.DataFrame({
+        'Internal HU': hu_int, 'Handling Unit': np.char.add('EXT', np.arange(n).astype(str)).astype(object),
+        'Generated delivery': rng.choice([f"00{80000000 + i}" for i in range(max(n // 10, 1))] + [None], n),
+        'Higher-level HU': parent,
+    })
+    dup = df.sample(frac=0.01, random_state=seed).assign(**{'Higher-level HU': None})
+    return pd.concat([df, dup], ignore_index=True)
+
+
+def reference(vekp):
+    """Původní logika z cached_billing_logic_v28 (listy) a auditního rentgenu (kořeny)."""
+    parent_map = dict(zip(vekp['Clean_HU_Int'], vekp['Clean_Parent']))
+    children_map = {}
+    for child, parent in parent_map.items():
+        if parent:
+            if parent not in children_map: children_map[parent] = []
+            children_map[parent].append(child)
+
+    def get_leaves(node, visited=None):
+        if visited is None: visited = set()
+        if node in visited: return []
+        visited.add(node)
+        if node not in children_map or not children_map[node]:
+            return [node]
+        leaves = []
+        for child in children_map[node]:
+            leaves.extend(get_leaves(child, visited))
+        return leaves
+
+    def get_root(h):
+        curr, visited = h, set()
+        while curr in parent_map and parent_map[curr] != "" and curr not in visited:
+            visited.add(curr)
+            curr = parent_map[curr]
+        return curr, curr in visited
+
+    roots = vekp.loc[vekp['Clean_Parent'] == '', 'Clean_HU_Int']
+    return [get_leaves(r) for r in roots], [get_root(h) for h in parent_map]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vekp', type=int, default=50_000)
+    args = parser.parse_args()
+
+    vekp = hu_tree_rows(make_vekp(args.vekp))
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10_000))
+
+    t0 = time.perf_counter()
+    ref_leaves, ref_roots = reference(vekp)
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index = build_hu_index(vekp)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    roots = vekp.loc[vekp['Clean_Parent'] == '', 'Clean_HU_Int']
+    idx_leaves = [hu_leaves(index, r) for r in roots]
+    idx_roots = [hu_root(index, h) for h in dict.fromkeys(vekp['Clean_HU_Int'])]
+    t_query = time.perf_counter() - t0
+
+    print(f"VEKP {len(vekp):,} řádků, uzlů {len(index['hus']):,}, max. hloubka {index['depth'].max()}")
+    print(f"rekurze + while     {t_ref:8.2f} s")
+    print(f"index: sestavení    {t_build:8.2f} s, dotazy {t_query:.2f} s")
+
+    bad_leaves = sum(set(a) != set(b) for a, b in zip(ref_leaves, idx_leaves))
+    # HU v cyklu nemá v indexu kořen (fakturace ji nikdy nezapočítá), jinak musí kořen sedět
+    bad_roots = sum((b is not None) if cyc else (a != b) for (a, cyc), b in zip(ref_roots, idx_roots))
+    if bad_leaves or bad_roots:
+        print(f"CHYBA - rozdílné listy u {bad_leaves} kořenů, kořeny u {bad_roots} HU", file=sys.stderr)
+        return 1
+    print("OK - shodné listy i kořeny")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
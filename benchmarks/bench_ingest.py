@@ -0,0 +1,81 @@
+"""Čtení exportů při nahrání: celý soubor najednou (python parser se sep=None, pd.read_excel) vs. po dávkách.
+
+Měří čas a nárůst špičky RSS procesu (každá varianta v čerstvém procesu) jen pro čtení - zápis do DB je stejný.
+Ověří, že dávky dají dohromady stejný DataFrame (bez BOM v názvu prvního sloupce), např.:
+    python benchmarks/bench_ingest.py --rows 1000000 --xlsx-rows 100000
+"""
+import argparse
+import io
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.ingest import iter_export  # noqa: E402
+
+
+def make_vepo(n, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Internal HU': (10**9 + rng.integers(0, n // 3 + 1, n)).astype(str),
+        'Handling Unit Item': rng.integers(1, 20, n).astype(str),
+        'Material': np.char.add('MAT-', rng.integers(0, 5000, n).astype(str)),
+        'Packed quantity': rng.integers(1, 500, n).astype(str),
+        'Base Unit of Measure': rng.choice(['ST', 'KAR', 'PAL', ''], n),
+        'Batch': np.where(rng.random(n) < 0.3, '', np.char.add('B', rng.integers(0, 99999, n).astype(str))),
+    })
+
+
+def _run(fn, queue):
+    # Špička RSS procesu nad stav po forku (Arrow/C alokace tracemalloc nevidí)
+    with open('/proc/self/statm') as f: base = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    t0 = time.perf_counter()
+    out = fn()
+    queue.put((out, time.perf_counter() - t0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - base))
+
+
+def measure(fn):
+    ctx = mp.get_context('fork')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(fn, queue))
+    proc.start()
+    out = queue.get()
+    proc.join()
+    return out
+
+
+def compare(label, data, fname, read_full, chunk_rows):
+    n_full, t_full, m_full = measure(lambda: len(read_full(io.BytesIO(data))))
+    rows, t_chunk, m_chunk = measure(lambda: sum(len(df) for df in iter_export(io.BytesIO(data), fname, chunk_rows)))
+    print(f"{label}: {n_full:,} řádků, {len(data) / 2**20:.1f} MB")
+    print(f"  celý soubor {t_full:8.2f} s  RSS +{m_full:7.1f} MB")
+    print(f"  po dávkách  {t_chunk:8.2f} s  RSS +{m_chunk:7.1f} MB  ({t_full / max(t_chunk, 1e-9):.1f}x)")
+    full = read_full(io.BytesIO(data))
+    full.columns = full.columns.str.strip().str.lstrip('\ufeff')
+    pd.testing.assert_frame_equal(full, pd.concat(iter_export(io.BytesIO(data), fname, chunk_rows), ignore_index=True))
+    assert rows == n_full
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=300_000, help="řádků CSV")
+    parser.add_argument('--xlsx-rows', type=int, default=30_000, help="řádků Excelu (zápis testovacího souboru je pomalý)")
+    parser.add_argument('--chunk', type=int, default=50_000)
+    args = parser.parse_args()
+
+    csv_data = make_vepo(args.rows).to_csv(sep=';', index=False).encode('utf-8-sig')
+    compare('CSV', csv_data, 'vepo.csv', lambda f: pd.read_csv(f, dtype=str, sep=None, engine='python'), args.chunk)
+
+    buf = io.BytesIO()
+    make_vepo(args.xlsx_rows).to_excel(buf, index=False)
+    compare('XLSX', buf.getvalue(), 'vepo.xlsx', lambda f: pd.read_excel(f, dtype=str), max(args.chunk // 10, 1))
+    print("OK - shodná data, čtení po dávkách")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""První vykreslení lehké záložky (Materiály TOP): celé prepare_data vs. LazyDataset, který stáhne jen Pick.
+
+Data se nahrají do dočasné SQLite (bez Parquet cache a artefaktů); každá varianta běží v čerstvém procesu a měří
+čas a nárůst špičky RSS. Ověří, že části načtené líně jsou stejné jako z prepare_data, např.:
+    python benchmarks/bench_lazy_dataset.py --vekp 500000 --pick 300000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_vollpalettes import make_data  # noqa: E402
+from bench_ingest import measure  # noqa: E402
+import database  # noqa: E402
+from core.hu import detect_vollpalettes_vectorized  # noqa: E402
+from core.prep import LazyDataset, prepare_data, prepare_pick, prepare_hu  # noqa: E402
+
+
+def lazy_dataset():
+    hu = lambda ds: prepare_hu()
+    return LazyDataset({
+        'df_vekp': hu, 'df_vepo': hu, 'hu_index': hu,
+        'voll_set': lambda ds: {'voll_set': detect_vollpalettes_vectorized(ds['df_pick'], ds['df_vekp'], ds['df_vepo'])},
+    }, **prepare_pick())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vekp', type=int, default=200_000)
+    parser.add_argument('--pick', type=int, default=100_000)
+    args = parser.parse_args()
+
+    os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_lazy_'), 'bench.db')}"
+    database.CACHE_DIR = database.ARTIFACT_DIR = ''
+    df_pick, df_vekp, df_vepo = make_data(args.vekp, args.pick)
+    df_pick['Date'], df_pick['Source Storage Bin'] = '2025-01-15', 'BIN-1'
+    for df, name in [(df_pick, 'raw_pick'), (df_vekp, 'raw_vekp'), (df_vepo, 'raw_vepo')]: database.save_to_db(df, name)
+
+    top = lambda ds: ds['df_pick'].groupby('Material')['Qty'].sum().size
+    n_full, t_full, m_full = measure(lambda: top(prepare_data()))
+    n_lazy, t_lazy, m_lazy = measure(lambda: top(lazy_dataset()))
+    print(f"Pick {len(df_pick):,} řádků, VEKP {len(df_vekp):,}, VEPO {len(df_vepo):,}")
+    print(f"prepare_data (vše)   {t_full:8.2f} s  RSS +{m_full:7.1f} MB")
+    print(f"LazyDataset (Pick)   {t_lazy:8.2f} s  RSS +{m_lazy:7.1f} MB  ({t_full / max(t_lazy, 1e-9):.1f}x)")
+    assert n_full == n_lazy
+
+    full, lazy = prepare_data(), lazy_dataset()
+    assert lazy.loaded() == sorted(set(full) - {'df_vekp', 'df_vepo', 'hu_index', 'voll_set', 'df_oe', 'df_cats'})
+    for name in ['df_pick', 'df_vekp', 'df_vepo']: pd.testing.assert_frame_equal(full[name], lazy[name])
+    assert full['voll_set'] == lazy['voll_set']
+    print("OK - shodná data, lehká záložka nestahuje VEKP/VEPO")
+
+
+if __name__ == '__main__':
+    main()
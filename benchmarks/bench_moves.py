@@ -0,0 +1,67 @@
+"""Pohyby: původní smyčka fast_compute_moves vs. vektorová fast_compute_moves_vectorized (NumPy).
+
+Náhodná data s pevným seedem včetně okrajových případů (NaN a záporné Qty, zlomky kusů, NaN váhy, chybějící
+krabice, krabice po 1 kuse, fronty/SU flag v různém zápisu). Pro několik sad limitů změří čas a ověří, že jsou
+všechny tři výstupy (celkem, přesně, bez dat) shodné (okrajové případy viz tests/test_moves.py); při rozdílu
+skončí nenulovým kódem, např.:
+    python benchmarks/bench_moves.py --rows 2000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.moves import apply_move_limits, decompose_box_moves, fast_compute_moves, fast_compute_moves_vectorized  # noqa: E402
+
+LIMITS = [(2.0, 15.0, 1), (0.5, 40.0, 3), (10.0, 5.0, 7)]
+
+
+def make_inputs(n, seed=1):
+    rng = np.random.default_rng(seed)
+    qty = rng.integers(-2, 400, n).astype(float)
+    qty[rng.random(n) < 0.1] += 0.5
+    qty[rng.random(n) < 0.03] = np.nan
+    queue = rng.choice(np.array(['PI_PL', 'PI_PL_FU', 'pi_pl_fuoe', 'PI_PA', None, np.nan], dtype=object), n)
+    su = rng.choice(np.array(['X', ' x ', '', None, np.nan], dtype=object), n)
+    sizes = [[], [1], [6], [12, 6], [1, 48, 12], [100, 10, 5, 1]]
+    box = [sizes[i] if i < len(sizes) else np.nan for i in rng.integers(0, len(sizes) + 1, n)]
+    w = np.where(rng.random(n) < 0.05, np.nan, rng.random(n) * 12)
+    d = np.where(rng.random(n) < 0.05, np.nan, rng.random(n) * 60)
+    return qty, queue, su, box, w, d
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.rows, args.seed)
+    dec = decompose_box_moves(*inputs[:4])
+    for v_lim, d_lim, h_lim in LIMITS:
+        t0 = time.perf_counter()
+        ref = fast_compute_moves(*inputs, v_lim, d_lim, h_lim)
+        t_loop = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        vec = fast_compute_moves_vectorized(*inputs, v_lim, d_lim, h_lim)
+        t_vec = time.perf_counter() - t0
+        # Při změně posuvníku se přepočítají jen limity nad rozkladem z přípravy dat
+        t0 = time.perf_counter()
+        lim = apply_move_limits(dec['box_moves'], dec['rest'], dec['has_boxes'], dec['is_full'], *inputs[4:], v_lim, d_lim, h_lim)
+        t_lim = time.perf_counter() - t0
+        print(f"{args.rows:,} řádků, limity {v_lim:g} kg / {d_lim:g} cm / {h_lim} ks: smyčka {t_loop:.2f} s, "
+              f"vektorově {t_vec:.2f} s, jen limity {t_lim:.3f} s ({t_loop / max(t_lim, 1e-9):.0f}x)")
+        for name, a, b, c in zip(['celkem', 'přesně', 'bez dat'], ref, vec, lim):
+            bad = int(((np.asarray(a) != np.asarray(b)) | (np.asarray(a) != np.asarray(c))).sum())
+            if bad:
+                print(f"CHYBA - rozdílné pohyby ({name}) u {bad} řádků", file=sys.stderr)
+                return 1
+    print("OK - shodné pohyby celkem, přesně i bez dat")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
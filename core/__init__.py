@@ -0,0 +1,4 @@
+"""Výpočetní jádro bez Streamlitu (příprava dat, pohyby, vollpalety, strom HU, fakturace, FU, balení).
+
+Používá ho aplikace (záložky v modules/) i dávkový výpočet: python -m core --help
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from core.batch import main
+
+sys.exit(main())
@@ -0,0 +1,120 @@
+"""Dávkový výpočet mimo Streamlit: Pick -> pohyby -> fakturace za celé období, výstup do Parquet/Excel.
+
+Příklady:
+    python -m core run --out vysledky --months 2025-01 2025-02
+    python -m core run --files exporty/*.xlsx exporty/*.csv --format both
+    python -m core run --workers 0 --shard-by hash
+    python -m core ingest --incremental exporty/pick_2025_03.xlsx
+
+DB se bere z --db-url, proměnné prostředí DB_URL, nebo ze Streamlit secrets. S --files (bez --db-url) se exporty
+nahrají do dočasné SQLite a počítá se jen z nich.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import database
+from database import merge_column_specs
+from core.hu import PREP_COLUMNS
+from core.billing import BILLING_COLUMNS, BILLING_WORKERS, billing_logic, slice_billing
+from core.prep import prepare_data, load_billing_aux, pick_months, add_moves
+from core.ingest import INGEST_WORKERS, submit_ingest
+
+# Dávka čte jen sloupce přípravy dat a fakturace (záložky aplikace si deklarují vlastní)
+BATCH_COLUMNS = merge_column_specs(PREP_COLUMNS, BILLING_COLUMNS)
+MOVE_COLUMNS = ['Delivery', 'Material', 'Transfer Order Number', 'Queue', 'Month', 'Date', 'Qty', 'Pohyby_Rukou', 'Pohyby_Exact', 'Pohyby_Loose_Miss']
+EXCEL_MAX_ROWS = 1_048_575
+
+def run_pipeline(use_marm=True, excluded_materials=(), limit_vahy=2.0, limit_rozmeru=15.0, kusy_na_hmat=1, months=None, unknown_month='Neznámé', workers=1, shard_by='month'):
+    """Celý výpočet jako v aplikaci (fakturace nad celým obdobím, pak výřez měsíců). None = v DB není Pick.
+
+    workers/shard_by viz billing_logic - přepočet celé historie může běžet na všech jádrech.
+    """
+    data = prepare_data(use_marm, None, tuple(excluded_materials), BATCH_COLUMNS)
+    if data is None: return None
+    df_pick = add_moves(data['df_pick'].assign(Month=pick_months(data['df_pick']['Date'], unknown_month)), limit_vahy, limit_rozmeru, kusy_na_hmat)
+    billing_df, df_hu_details = billing_logic(df_pick, data['df_vekp'], data['df_vepo'], data['df_cats'], data['queue_count_col'], data['voll_set'], data['hu_index'], workers=workers, shard_by=shard_by, **load_billing_aux())
+
+    if months:
+        df_pick = df_pick[df_pick['Month'].isin(months)]
+        billing_df, df_hu_details = slice_billing(billing_df, df_hu_details, df_pick, unknown_month)
+    moves = df_pick[[c for c in MOVE_COLUMNS if c in df_pick.columns]].reset_index(drop=True)
+    return {'billing': billing_df, 'hu_details': df_hu_details, 'moves': moves}
+
+def write_results(results, out_dir, fmt='parquet'):
+    """Zapíše výsledky (billing, hu_details, moves) jako <název>.parquet a/nebo jeden billing.xlsx. Vrací cesty."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    if fmt in ('parquet', 'both'):
+        for name, df in results.items():
+            path = os.path.join(out_dir, f"{name}.parquet")
+            df.to_parquet(path, index=False)
+            paths.append(path)
+    if fmt in ('excel', 'both'):
+        too_big = [name for name, df in results.items() if len(df) > EXCEL_MAX_ROWS]
+        if too_big: raise ValueError(f"Tabulky {too_big} se nevejdou na list Excelu - použijte --format parquet nebo --months")
+        path = os.path.join(out_dir, 'billing.xlsx')
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for name, df in results.items(): df.to_excel(writer, index=False, sheet_name=name)
+        paths.append(path)
+    return paths
+
+def _ingest(files, incremental=False, workers=INGEST_WORKERS):
+    # Soubory se zpracují souběžně (viz submit_ingest), výpis v pořadí dokončení
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = submit_ingest(pool, [(path, os.path.basename(path)) for path in files], incremental)
+        for fut in as_completed(futures):
+            path, saved = files[futures.index(fut)], fut.result()
+            print(f"{path}: " + (", ".join(f"{s['table_name']} ({s['rows_read']:,} řádků, {s['total_s']:.1f} s, {s['rows_per_s']:,.0f} řádků/s)" for s in saved) if saved else "nerozpoznáno"), file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m core', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', help="SQLAlchemy URL databáze (jinak DB_URL / Streamlit secrets)")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p_ing = sub.add_parser('ingest', help="nahraje exporty do DB (stejné rozpoznání souborů jako Admin Zóna)")
+    p_ing.add_argument('files', nargs='+')
+    p_ing.add_argument('--incremental', action='store_true', help="Pick/VEKP/VEPO přepíše jen podle klíče, historie zůstane")
+    p_ing.add_argument('--workers', type=int, default=INGEST_WORKERS, help="souběžně zpracovaných souborů")
+
+    p_run = sub.add_parser('run', help="spočítá pohyby a fakturaci a zapíše výsledky")
+    p_run.add_argument('--files', nargs='+', help="exporty, které se před výpočtem nahrají do DB")
+    p_run.add_argument('--out', default='vysledky')
+    p_run.add_argument('--format', choices=['parquet', 'excel', 'both'], default='parquet')
+    p_run.add_argument('--months', nargs='+', help="výřez měsíců YYYY-MM (fakturace se počítá nad celým obdobím)")
+    p_run.add_argument('--exclude', nargs='+', default=[], help="vyloučené materiály")
+    p_run.add_argument('--no-marm', action='store_true')
+    p_run.add_argument('--weight', type=float, default=2.0, help="hranice váhy (kg)")
+    p_run.add_argument('--dim', type=float, default=15.0, help="hranice rozměru (cm)")
+    p_run.add_argument('--grab', type=int, default=1, help="kusů do hrsti")
+    p_run.add_argument('--workers', type=int, default=BILLING_WORKERS, help="procesů pro fakturaci (0 = všechna jádra)")
+    p_run.add_argument('--shard-by', choices=['month', 'hash'], default='month', help="dělení zakázek mezi procesy")
+    args = parser.parse_args(argv)
+
+    if args.db_url:
+        os.environ['DB_URL'] = args.db_url
+    elif args.cmd == 'run' and args.files:
+        # Jednorázová DB jen z předaných souborů; Parquet cache a artefakty se nesmí míchat s jinou DB
+        os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='pick_batch_'), 'batch.db')}"
+        database.CACHE_DIR = database.ARTIFACT_DIR = ''
+    database.init_connection.cache_clear()
+
+    t0 = time.perf_counter()
+    if args.cmd == 'ingest':
+        _ingest(args.files, args.incremental, args.workers)
+        return 0
+
+    if args.files: _ingest(args.files)
+    excluded = sorted({m.strip().upper() for m in args.exclude if m.strip()})
+    results = run_pipeline(not args.no_marm, excluded, args.weight, args.dim, args.grab, args.months, workers=args.workers, shard_by=args.shard_by)
+    if results is None:
+        print("V databázi není Pick report (nebo po vyloučení materiálů nezbyla data).", file=sys.stderr)
+        return 1
+    for path in write_results(results, args.out, args.format): print(path)
+    print(f"Hotovo za {time.perf_counter() - t0:.1f} s: " + ", ".join(f"{k} {len(v):,}" for k, v in results.items()), file=sys.stderr)
+    return 0
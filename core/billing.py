@@ -0,0 +1,328 @@
+"""Fakturace (ZLATÁ LOGIKA v28): základní kategorie zakázek, kořenové HU a spárování picků na kategorie."""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.hu import safe_hu_vectorized, safe_del_vectorized, hu_tree_rows, build_hu_index, hu_leaf_pairs, pick_vollpalettes
+
+# Sloupce VEKP/VEPO, které fakturace čte (projekce při načítání z DB)
+BILLING_COLUMNS = {
+    'raw_vekp': [0, 1, 'Internal HU', 'HU-Nummer intern', '=Handling Unit', 'Generated delivery', 'generierte',
+                 'higher-level', 'übergeordn', 'superordinate', 'created on', 'erfasst am', 'datum', 'date', 'Clean_'],
+    'raw_vepo': [0, 'Internal HU', 'HU-Nummer intern', 'Material', 'Clean_'],
+}
+
+# Počet procesů fakturace v aplikaci (1 = bez procesů, 0 = všechna jádra); dávka má vlastní --workers
+BILLING_WORKERS = int(os.environ.get('BILLING_WORKERS') or 1)
+# Procesy se vyplatí až od tohoto počtu řádků Picku a jen s více jádry: spawn procesu (import pandas) a předání
+# kontextu stojí ~1-2 s na proces, menší fakturace je v jednom procesu rychlejší (viz bench_billing_parallel)
+BILLING_PARALLEL_MIN_ROWS = 500_000
+
+# Listy Auswertungu, které fakturace čte: KEP dopravci a partneři zakázky (registr viz core.prep.AUS_REGISTRY)
+BILLING_AUS_SHEETS = ['SDSHP_AM2', 'VBPA']
+
+def voll_category(base):
+    # Vollpalety se fakturují jen jako N/O (E -> N, OE -> O)
+    return base.map({'OE': 'O Vollpalette', 'E': 'N Vollpalette'}).fillna(base + ' Vollpalette')
+
+def categorize_roots(roots, hu_index, vepo_pairs, voll_set, picked_keys, int_to_ext):
+    """Fakturační kategorie kořenových HU (Clean_Del, Clean_HU_Ext, Clean_HU_Int, base) sloupcově.
+
+    Kořen -> listy -> materiály; členství ve voll_set a v pickovaných materiálech přes isin.
+    Vrací detail HU a kategorie (bez vollpalet), do kterých spadl materiál v rámci zakázky.
+    """
+    # Klíče "zakázka|HU" jako object (isin nad hash tabulkou, ne po prvcích přes Arrow)
+    key = lambda a, b: (a.astype(str) + '\x1f' + b.astype(str)).astype(object)
+    voll_keys = pd.Index([f"{d}\x1f{h}" for d, h in voll_set], dtype=object)
+    in_voll = lambda d, h: key(d, h).isin(voll_keys).values
+
+    roots = roots.copy()
+    r, leaf = hu_leaf_pairs(hu_index, roots['Clean_HU_Int'].values)
+    lv = pd.DataFrame({'r': r, 'd': roots['Clean_Del'].values[r], 'leaf': leaf})
+    leaf_voll = in_voll(lv['d'], lv['leaf']) | in_voll(lv['d'], lv['leaf'].map(int_to_ext).fillna(''))
+    roots['is_voll'] = in_voll(roots['Clean_Del'], roots['Clean_HU_Ext']) | in_voll(roots['Clean_Del'], roots['Clean_HU_Int'])
+    roots['is_voll'] |= np.bincount(r[leaf_voll], minlength=len(roots)) > 0
+
+    # Materiály z listů; pokud žádný nebyl pickován v dané zakázce, berou se všechny
+    rm = lv.merge(vepo_pairs, on='leaf')[['r', 'd', 'mat']].drop_duplicates(['r', 'mat'])
+    rm['picked'] = key(rm['d'], rm['mat']).isin(picked_keys).values
+    real = rm[rm['picked'] | ~rm.groupby('r')['picked'].transform('any')].sort_values(['r', 'mat'])
+    roots['n_mats'] = np.bincount(real['r'], minlength=len(roots))
+    # Spojení materiálů po skupinách: reduceat nad seřazenými řetězci místo join pro každý kořen
+    materials = np.full(len(roots), '', dtype=object)
+    if not real.empty:
+        starts = np.flatnonzero(np.r_[True, real['r'].values[1:] != real['r'].values[:-1]])
+        joined = np.add.reduceat((real['mat'] + ', ').to_numpy(dtype=object), starts)
+        materials[real['r'].values[starts]] = pd.Series(joined, dtype=object).str[:-2].values
+    roots['Materials'] = materials
+
+    roots['Category_Full'] = np.where(roots['is_voll'], voll_category(roots['base']), roots['base'] + np.where(roots['n_mats'] == 1, ' Sortenrein', ' Misch'))
+    billed = roots[roots['is_voll'] | (roots['n_mats'] > 0)].sort_values('Clean_Del', kind='stable')
+
+    df_hu_details = pd.DataFrame({
+        'Clean_Del': billed['Clean_Del'], 'HU_Ext': billed['Clean_HU_Ext'], 'HU_Int': billed['Clean_HU_Int'],
+        'Is_Vollpalette': np.where(billed['is_voll'], 'ANO', 'NE'), 'Category_Full': billed['Category_Full'], 'Materials': billed['Materials'],
+    }).reset_index(drop=True)
+
+    mat_cats = real.assign(Category_Full=roots['Category_Full'].values[real['r']])
+    mat_cats = mat_cats[~mat_cats['Category_Full'].str.contains('Vollpalette', regex=False)].drop_duplicates(['d', 'mat', 'Category_Full'])
+    mat_cats = mat_cats.groupby(['d', 'mat'])['Category_Full'].agg(['size', 'first'])
+    return df_hu_details, mat_cats
+
+# Základní kategorie dle přepravního místa (T031), ostatní přepravní místa = N
+SHIPPING_POINT_BASE = {'FM20': 'N', 'FM21': 'E', 'FM22': 'E', 'FM23': 'N', 'FM24': 'O'}
+PALLET_QUEUES = ['PI_PL', 'PI_PL_OE', 'FU', 'FU_O', 'FUOE', 'PI_PL_FU']
+PARCEL_QUEUES = ['PI_PA', 'PI_PA_OE']
+
+def resolve_delivery_base_categories(deliveries, df_cats=None, df_likp=None, df_kep=None, df_vbpa=None, df_pick=None):
+    """Základní kategorie (N/E/O/OE) zakázek najednou: df_cats -> přepravní místo z LIKP -> KEP dopravce / jen balíkové fronty.
+
+    Vrací slovník zakázka -> kategorie pro všechny zakázky z df_cats a pro zadané (aktivní) zakázky.
+    """
+    txt = lambda s: s.map(str).str.strip().str.upper()
+    cats = pd.Series(dtype=object)
+    if df_cats is not None and not df_cats.empty:
+        c_del_cats = next((c for c in df_cats.columns if str(c).strip().lower() in ['lieferung', 'delivery', 'zakázka']), df_cats.columns[0])
+        c_kat = next((c for c in df_cats.columns if 'kategorie' in str(c).lower() or 'category' in str(c).lower()), None)
+        if c_kat:
+            cats = pd.Series(txt(df_cats[c_kat]).values, index=safe_del_vectorized(df_cats[c_del_cats]).values)
+            cats = cats[cats.isin(['N', 'E', 'O', 'OE'])]
+            cats = cats[~cats.index.duplicated(keep='last')]
+
+    dels = pd.Index(pd.unique(np.asarray(deliveries, dtype=object)))
+    dels = dels[~dels.isin(cats.index)]
+    base = pd.Series('N', index=dels, dtype=object)
+
+    if df_likp is not None and not df_likp.empty:
+        c_lief = next((c for c in df_likp.columns if "Delivery" in str(c) or "Lieferung" in str(c)), df_likp.columns[0])
+        c_vs = next((c for c in df_likp.columns if "Shipping Point" in str(c) or "Versandstelle" in str(c) or "Receiving Pt" in str(c)), None)
+        if c_vs:
+            vs = pd.Series(txt(df_likp[c_vs]).values, index=safe_del_vectorized(df_likp[c_lief]).values)
+            vs = vs[~vs.index.duplicated(keep='last')]
+            base = vs.reindex(dels).map(SHIPPING_POINT_BASE).fillna('N')
+
+    # KEP: zakázka, jejímž dopravcem (role SP/CR ve VBPA) je KEP dopravce ze SDSHP_AM2
+    is_kep = pd.Series(False, index=dels)
+    if df_kep is not None and not df_kep.empty and df_vbpa is not None and not df_vbpa.empty:
+        c_sped = next((c for c in df_kep.columns if "Spediteur" in str(c)), df_kep.columns[0])
+        c_kep = next((c for c in df_kep.columns if "KEP" in str(c)), None)
+        c_beleg = next((c for c in df_vbpa.columns if "Vertriebsbeleg" in str(c) or "Delivery" in str(c)), df_vbpa.columns[0])
+        c_role = next((c for c in df_vbpa.columns if "Partnerrolle" in str(c) or "Partner Function" in str(c)), None)
+        c_kred = next((c for c in df_vbpa.columns if "Kreditor" in str(c) or "Vendor" in str(c)), None)
+        c_deb = next((c for c in df_vbpa.columns if "Debitor" in str(c) or "Customer" in str(c)), None)
+        if c_kep and c_role and (c_kred or c_deb):
+            kep_carriers = df_kep.loc[txt(df_kep[c_kep]) == 'X', c_sped].map(str).str.strip().str.lstrip('0')
+            vbpa = df_vbpa[txt(df_vbpa[c_role]).isin(['SP', 'CR'])]
+            sped = vbpa[c_kred or c_deb].map(str).str.strip().str.lstrip('0')
+            is_kep = pd.Series(dels.isin(safe_del_vectorized(vbpa.loc[sped.isin(kep_carriers), c_beleg])), index=dels)
+
+    # Bez KEP: zakázka pickovaná jen z balíkových front (žádná paletová) je také E/OE
+    parcel_only = pd.Series(False, index=dels)
+    if df_pick is not None and not df_pick.empty:
+        q = df_pick[['Clean_Del', 'Queue']].dropna(subset=['Queue'])
+        q = q.assign(Queue=q['Queue'].astype(str).str.upper())
+        flags = q.assign(pallet=q['Queue'].isin(PALLET_QUEUES), parcel=q['Queue'].isin(PARCEL_QUEUES)).groupby('Clean_Del')[['pallet', 'parcel']].any()
+        parcel_only = (flags['parcel'] & ~flags['pallet']).reindex(dels, fill_value=False)
+
+    upgrade = is_kep | parcel_only
+    base = base.where(~upgrade, base.replace({'N': 'E', 'O': 'OE'}))
+    return {**cats.to_dict(), **base.to_dict()}
+
+def billing_logic(df_pick, df_vekp, df_vepo, df_cats, queue_count_col, voll_set, hu_index=None, df_likp=None, df_kep=None, df_vbpa=None, workers=1, shard_by='month', min_rows=BILLING_PARALLEL_MIN_ROWS):
+    """Fakturace v28 (ZLATÁ LOGIKA): zakázka x kategorie -> počet HU, TO, pohyby; plus detail fakturovaných HU.
+
+    Pomocné tabulky (LIKP, SDSHP_AM2 s KEP dopravci, VBPA) předává volající - viz core.prep.load_billing_aux.
+    S workers > 1 (0 = všechna jádra) se kroky 5-7 počítají po dávkách zakázek v procesech - podle měsíce
+    z VEKP (shard_by='month') nebo hashe zakázky ('hash'); výsledek je stejný jako v jednom procesu.
+    Na jednom jádru nebo pod min_rows řádky Picku běží fakturace i tak v jednom procesu (min_rows=0 procesy vynutí).
+    """
+    billing_df = pd.DataFrame()
+    df_hu_details = pd.DataFrame()
+    if df_vekp is None or df_vekp.empty: 
+        return billing_df, df_hu_details
+
+    # ---------------------------------------------------------
+    # 1. PŘÍPRAVA A OČIŠTĚNÍ VEKP (VŠECHNY ZAKÁZKY BEZ FILTRU)
+    # ---------------------------------------------------------
+    # Clean_Del / Clean_HU_* / Clean_Parent jsou předpočítané ve stagingu (no-op, pokud už existují)
+    vekp_filtered = hu_tree_rows(df_vekp).copy()
+    
+    if vekp_filtered.empty: return billing_df, df_hu_details
+
+    # Extrakce měsíce z VEKP (pro spolehlivé filtrování)
+    c_created = next((c for c in vekp_filtered.columns if any(x in str(c).lower() for x in ['created on', 'erfasst am', 'datum', 'date'])), None)
+    if c_created:
+        vekp_filtered['VEKP_Date'] = pd.to_datetime(vekp_filtered[c_created], errors='coerce')
+        vekp_filtered['VEKP_Month'] = vekp_filtered['VEKP_Date'].dt.to_period('M').astype(str).replace('NaT', 'Neznámé')
+    else:
+        vekp_filtered['VEKP_Month'] = 'Neznámé'
+        
+    del_vekp_month = vekp_filtered.groupby('Clean_Del')['VEKP_Month'].first().to_dict()
+
+    int_to_ext = dict(zip(vekp_filtered['Clean_HU_Int'], vekp_filtered['Clean_HU_Ext']))
+
+    # ---------------------------------------------------------
+    # 2. PŘÍPRAVA PICK DAT (Pro spárování s TO)
+    # ---------------------------------------------------------
+    df_pick_billing = pd.DataFrame()
+    if df_pick is not None and not df_pick.empty:
+        df_pick_billing = df_pick.copy()
+        for col, src, clean in [('Clean_Del', 'Delivery', safe_del_vectorized), ('Clean_HU', 'Handling Unit', safe_hu_vectorized), ('Clean_SSU', 'Source storage unit', safe_hu_vectorized)]:
+            if col not in df_pick_billing.columns: df_pick_billing[col] = clean(df_pick_billing.get(src, pd.Series('', index=df_pick_billing.index)))
+        
+        if 'Pohyby_Rukou' not in df_pick_billing.columns:
+            df_pick_billing['Pohyby_Rukou'] = 0
+
+    # ---------------------------------------------------------
+    # 3. ZÁKLADNÍ KATEGORIE (df_cats -> T031 -> VBPA/KEP)
+    # ---------------------------------------------------------
+    del_base_map = resolve_delivery_base_categories(
+        vekp_filtered['Clean_Del'].unique(), df_cats, df_likp, df_kep, df_vbpa, df_pick_billing
+    )
+
+    # ---------------------------------------------------------
+    # 4. VEPO STROM A MAPOVÁNÍ MATERIÁLŮ
+    # ---------------------------------------------------------
+    # Páry (HU, materiál) z VEPO
+    vepo_pairs = pd.DataFrame(columns=['leaf', 'mat'])
+    if df_vepo is not None and not df_vepo.empty:
+        vepo_hu_col = next((c for c in df_vepo.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df_vepo.columns[0])
+        vepo_mat_col = next((c for c in df_vepo.columns if "Material" in str(c)), None)
+        if vepo_mat_col:
+            v = df_vepo.dropna(subset=[vepo_hu_col, vepo_mat_col])
+            vepo_pairs = pd.DataFrame({'leaf': safe_hu_vectorized(v[vepo_hu_col]).values, 'mat': v[vepo_mat_col].astype(str).str.strip().values}).drop_duplicates()
+
+    # Strom HU se sestavuje jednou na verzi VEKP (prepare_data); bez předaného indexu si ho postavíme zde
+    if hu_index is None: hu_index = build_hu_index(vekp_filtered)
+
+    ctx = dict(queue_count_col=queue_count_col, voll_set=voll_set, hu_index=hu_index, vepo_pairs=vepo_pairs,
+               int_to_ext=int_to_ext, del_vekp_month=del_vekp_month, del_base_map=del_base_map)
+    if workers < 1: workers = os.cpu_count() or 1
+    if min_rows and ((os.cpu_count() or 1) < 2 or len(df_pick_billing) < min_rows): workers = 1
+    if workers == 1:
+        return _billing_shard(ctx, vekp_filtered, df_pick_billing)
+
+    # Dávky zakázek: VEKP i Pick řádky jedné zakázky jsou vždy ve stejné dávce
+    if shard_by == 'month':
+        shard_of = lambda dels: dels.map(del_vekp_month).fillna('Neznámé').values
+    else:
+        shard_of = lambda dels: pd.util.hash_array(dels.astype(str).to_numpy(dtype=object)) % workers
+    vekp_shard = shard_of(vekp_filtered['Clean_Del'])
+    pick_shard = shard_of(df_pick_billing['Clean_Del']) if not df_pick_billing.empty else np.array([], dtype=object)
+    shards = pd.unique(np.concatenate([pd.unique(vekp_shard), pd.unique(pick_shard)]).astype(object))
+    # Kopie: _billing_shard do dávky zapisuje (Is_Vollpalette, Category_Full), výběr maskou nesmí sdílet data s celkem
+    tasks = [(vekp_filtered[vekp_shard == s].copy(), df_pick_billing[pick_shard == s].copy() if not df_pick_billing.empty else df_pick_billing) for s in shards]
+
+    # spawn: fakturace běží i ze Streamlit serveru, vícevláknový proces se nesmí forkovat (viz core.ingest)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_shard_worker, initargs=(ctx,)) as pool:
+        parts = [p for p in pool.map(_run_shard, tasks) if not p[0].empty]
+    if not parts: return billing_df, df_hu_details
+
+    # Stejné pořadí jako v jednom procesu: outer merge řadí podle klíče, detail HU stabilně podle zakázky
+    billing_df = pd.concat([b for b, _ in parts]).sort_values(['Clean_Del', 'Category_Full']).reset_index(drop=True)
+    details = [h for _, h in parts if not h.empty] # dávka bez fakturovaných HU by rozbila typy sloupců
+    if details: df_hu_details = pd.concat(details).sort_values('Clean_Del', kind='stable').reset_index(drop=True)
+    return billing_df, df_hu_details
+
+# Kontext dávek v pracovním procesu (strom HU, VEPO, voll_set, ...) - předává se jednou na proces, ne s každou dávkou
+_SHARD_CTX = {}
+
+def _init_shard_worker(ctx):
+    _SHARD_CTX.update(ctx)
+
+def _run_shard(task):
+    return _billing_shard(_SHARD_CTX, *task)
+
+def _billing_shard(ctx, vekp_filtered, df_pick_billing):
+    """Příznak vollpalety v Picku a kroky 5-7 fakturace pro dávku zakázek (řádky VEKP a Pick jen těchto zakázek)."""
+    queue_count_col, voll_set, del_vekp_month, del_base_map = ctx['queue_count_col'], ctx['voll_set'], ctx['del_vekp_month'], ctx['del_base_map']
+
+    picked_keys = pd.Index([], dtype=object)
+    if not df_pick_billing.empty:
+        picked_keys = pd.Index((df_pick_billing['Clean_Del'] + '\x1f' + df_pick_billing['Material'].astype(str).str.strip()).unique(), dtype=object)
+        df_pick_billing['Is_Vollpalette'] = pick_vollpalettes(df_pick_billing, voll_set)
+
+    # ---------------------------------------------------------
+    # 5. VYÚČTOVÁNÍ: ZLATÁ LOGIKA (Pouze Kořeny)
+    # ---------------------------------------------------------
+    roots = vekp_filtered.loc[vekp_filtered['Clean_Parent'] == '', ['Clean_Del', 'Clean_HU_Ext', 'Clean_HU_Int']].reset_index(drop=True)
+    roots['base'] = roots['Clean_Del'].map(del_base_map).fillna('N')
+
+    df_hu_details, mat_cats = categorize_roots(roots, ctx['hu_index'], ctx['vepo_pairs'], voll_set, picked_keys, ctx['int_to_ext'])
+
+    if not df_hu_details.empty:
+        df_hu_counts = df_hu_details.groupby(['Clean_Del', 'Category_Full']).size().reset_index(name='pocet_hu')
+    else:
+        df_hu_counts = pd.DataFrame(columns=['Clean_Del', 'Category_Full', 'pocet_hu'])
+
+    # ---------------------------------------------------------
+    # 6. SPÁROVÁNÍ FYZICKÝCH PICKŮ (TO) NA VÝSLEDNÉ KATEGORIE
+    # ---------------------------------------------------------
+    if not df_pick_billing.empty:
+        non_voll_mats = df_pick_billing[~df_pick_billing['Is_Vollpalette']].groupby('Clean_Del')['Material'].nunique()
+
+        base = df_pick_billing['Clean_Del'].map(del_base_map).fillna('N')
+        mat = df_pick_billing['Material'].astype(str).str.strip()
+        hit = mat_cats.reindex(pd.MultiIndex.from_arrays([df_pick_billing['Clean_Del'], mat]))
+        n_cats = hit['size'].fillna(0).values
+        fallback = base + np.where(df_pick_billing['Clean_Del'].map(non_voll_mats).fillna(1) > 1, ' Misch', ' Sortenrein')
+        cat = np.where(n_cats == 1, hit['first'].values, np.where(n_cats > 1, base + ' Misch', fallback))
+        df_pick_billing['Category_Full'] = np.where(df_pick_billing['Is_Vollpalette'], voll_category(base), cat)
+
+        pick_agg = df_pick_billing.groupby(['Clean_Del', 'Category_Full']).agg(
+            pocet_to=(queue_count_col, "nunique"),
+            pohyby_celkem=("Pohyby_Rukou", "sum"),
+            pocet_lokaci=("Source Storage Bin", "nunique"),
+            pocet_mat=("Material", "nunique") 
+        ).reset_index()
+    else:
+        pick_agg = pd.DataFrame(columns=['Clean_Del', 'Category_Full', 'pocet_to', 'pohyby_celkem', 'pocet_lokaci', 'pocet_mat'])
+
+    # ---------------------------------------------------------
+    # 7. AGREGACE DLE ZAKÁZKY
+    # ---------------------------------------------------------
+    billing_df = pd.merge(df_hu_counts, pick_agg, on=['Clean_Del', 'Category_Full'], how='outer')
+
+    billing_df['Delivery'] = billing_df['Clean_Del']
+    billing_df['Clean_Del_Merge'] = billing_df['Clean_Del']
+    
+    # Přiřazení měsíce (Přednostně z VEKP data)
+    if not df_pick_billing.empty:
+        del_metadata = df_pick_billing.groupby('Clean_Del').agg(
+            Month=('Month', 'first'),
+            hlavni_fronta=("Queue", lambda x: x.mode()[0] if not x.empty else "")
+        ).to_dict('index')
+        billing_df['Month'] = billing_df['Clean_Del'].apply(
+            lambda d: del_vekp_month.get(d, 'Neznámé') if del_vekp_month.get(d, 'Neznámé') != 'Neznámé' 
+            else del_metadata.get(d, {}).get('Month', 'Neznámé')
+        )
+        billing_df['hlavni_fronta'] = billing_df.apply(lambda r: del_metadata.get(r['Clean_Del'], {}).get('hlavni_fronta', ''), axis=1)
+    else:
+        billing_df['Month'] = billing_df['Clean_Del'].map(del_vekp_month).fillna('Neznámé')
+        billing_df['hlavni_fronta'] = ''
+
+    for col in ['pocet_to', 'pohyby_celkem', 'pocet_lokaci', 'pocet_hu', 'pocet_mat']:
+        billing_df[col] = billing_df[col].fillna(0).astype(int)
+
+    billing_df["Bilance"] = (billing_df["pocet_to"] - billing_df["pocet_hu"]).astype(int)
+    billing_df["TO_navic"] = billing_df["Bilance"].clip(lower=0)
+
+    return billing_df, df_hu_details
+
+def slice_billing(billing_df, df_hu_details, df_pick, unknown_month='Neznámé'):
+    """Výřez fakturace za celé období pro daný Pick: zakázky z jeho měsíců + zakázky s ním spárované."""
+    if 'Month' in df_pick.columns and not billing_df.empty:
+        pick_months = [m for m in df_pick['Month'].unique() if m != unknown_month]
+        if len(pick_months) >= 1:
+            # OPRAVA: Očištění 'Delivery' na 'Clean_Del' přímo zde, aby nedošlo ke KeyError
+            valid_dels = df_pick['Clean_Del'] if 'Clean_Del' in df_pick.columns else safe_del_vectorized(df_pick['Delivery'])
+            valid_dels = set(valid_dels.dropna().unique())
+
+            # Zobrazíme zakázky z vybraných měsíců + zakázky spárované s Pick reportem
+            billing_df = billing_df[(billing_df['Month'].isin(pick_months)) | (billing_df['Clean_Del'].isin(valid_dels))].copy()
+            df_hu_details = df_hu_details[df_hu_details['Clean_Del'].isin(billing_df['Clean_Del'])].copy()
+    return billing_df, df_hu_details
@@ -0,0 +1,68 @@
+"""Celé palety: úkoly FU/FUOE ze skeneru vs. vollpalety ve fakturaci (podklad pro porovnání FU vs SAP)."""
+import pandas as pd
+
+KLT_TYPES = ['K1', 'K2', 'K3', 'K4', 'KLT', 'KLT1', 'KLT2']
+
+def fu_compare_tasks(df_pick, voll_set, queue_count_col):
+    """TO úkoly s příznaky: fronta FU/FUOE (bez KLT), nepřebaleno (Source HU = Dest HU) a vyfakturováno jako vollpaleta."""
+    df_p = df_pick.copy()
+    # Očištěná zakázka a HU jsou ze stagingu (Clean_Del / Clean_SSU / Clean_HU)
+    df_p['Source_HU'] = df_p['Clean_SSU']
+    df_p['Dest_HU'] = df_p['Clean_HU']
+
+    c_su = 'Storage Unit Type' if 'Storage Unit Type' in df_p.columns else ('Type' if 'Type' in df_p.columns else None)
+    if c_su:
+        df_p['Is_KLT'] = df_p[c_su].astype(str).str.upper().isin(KLT_TYPES)
+    else:
+        df_p['Is_KLT'] = False
+
+    df_p['Queue_UPPER'] = df_p['Queue'].astype(str).str.upper()
+    df_p['Is_FU'] = (df_p['Queue_UPPER'] == 'PI_PL_FU') & (~df_p['Is_KLT'])
+    df_p['Is_FUOE'] = (df_p['Queue_UPPER'] == 'PI_PL_FUOE') & (~df_p['Is_KLT'])
+    df_p['Is_FU_Any'] = df_p['Is_FU'] | df_p['Is_FUOE']
+    df_p['Is_Untouched'] = (df_p['Source_HU'] == df_p['Dest_HU']) & (df_p['Source_HU'] != '')
+
+    df_p['Is_Voll_Billed'] = [(d, dst) in voll_set or (d, src) in voll_set for d, dst, src in zip(df_p['Clean_Del'], df_p['Dest_HU'], df_p['Source_HU'])]
+
+    agg = dict(
+        Delivery=('Clean_Del', 'first'),
+        Queue=('Queue', 'first'),
+        Queue_UPPER=('Queue_UPPER', 'first'),
+        Storage_Unit_Type=(c_su, 'first') if c_su else ('Queue', 'first'),
+        Is_FU_Any=('Is_FU_Any', 'max'),
+        Is_Untouched=('Is_Untouched', 'min'),
+        Is_Voll_Billed=('Is_Voll_Billed', 'max'),
+        Source_HU=('Source_HU', 'first'),
+        Dest_HU=('Dest_HU', 'first'),
+        Material=('Material', 'first')
+    )
+    if 'Month' in df_p.columns: agg['Month'] = ('Month', 'first')
+    return df_p.groupby(queue_count_col).agg(**agg).reset_index()
+
+def fu_monthly_trend(tasks, billing_df, unknown_month='Neznámé'):
+    """Po měsících: úkoly FU/FUOE, z toho nepřebalené, vyfakturované vollpalety N a O/OE, ideální a ztracené palety."""
+    months = sorted([m for m in tasks['Month'].dropna().unique() if m != unknown_month])
+    chart_data = []
+
+    for m in months:
+        m_df = tasks[tasks['Month'] == m]
+        valid_dels_m = set(m_df['Delivery'].unique())
+
+        # Billing pro daný měsíc přesně tak jak odjel na skeneru
+        m_bill = billing_df[billing_df['Clean_Del'].isin(valid_dels_m)]
+
+        chart_data.append({
+            'Month': m,
+            'FU_Tasks': m_df[(m_df['Queue_UPPER'] == 'PI_PL_FU') & (m_df['Is_FU_Any'])].shape[0],
+            'FU_Untouched': m_df[(m_df['Queue_UPPER'] == 'PI_PL_FU') & (m_df['Is_FU_Any']) & (m_df['Is_Untouched'])].shape[0],
+            'Billed_N': m_bill[m_bill['Category_Full'] == 'N Vollpalette']['pocet_hu'].sum(),
+
+            'FUOE_Tasks': m_df[(m_df['Queue_UPPER'] == 'PI_PL_FUOE') & (m_df['Is_FU_Any'])].shape[0],
+            'FUOE_Untouched': m_df[(m_df['Queue_UPPER'] == 'PI_PL_FUOE') & (m_df['Is_FU_Any']) & (m_df['Is_Untouched'])].shape[0],
+            'Billed_O': m_bill[m_bill['Category_Full'].isin(['O Vollpalette', 'OE Vollpalette'])]['pocet_hu'].sum(),
+
+            'Ideal': m_df[(m_df['Is_FU_Any']) & (m_df['Is_Untouched']) & (m_df['Is_Voll_Billed'])].shape[0],
+            'Lost': m_df[(m_df['Is_FU_Any']) & (~m_df['Is_Voll_Billed'])].shape[0]
+        })
+
+    return pd.DataFrame(chart_data)
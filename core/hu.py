@@ -0,0 +1,331 @@
+"""SAP klíče (zakázka, HU), typovaný staging tabulek, detekce vollpalet a strom HU z VEKP."""
+import numpy as np
+import pandas as pd
+
+from core.moves import get_match_key_vectorized
+
+# ==========================================
+# CENTRÁLNÍ MOZEK PRO DETEKCI VOLLPALET (Vylepšené párování SSU a HU)
+# ==========================================
+
+def safe_hu(val):
+    v = str(val).strip()
+    if v.lower() in ['nan', 'none', '']: return ''
+    if v.endswith('.0'): v = v[:-2]
+    return v
+
+def safe_del(val):
+    v = str(val).strip()
+    if v.lower() in ['nan', 'none', '']: return ''
+    if v.endswith('.0'): v = v[:-2]
+    return v.lstrip('0')
+
+def safe_hu_vectorized(series):
+    s = series.fillna('').astype(str).str.strip()
+    s = s.where(~s.str.lower().isin(['nan', 'none', '']), '')
+    return s.str.replace(r'\.0$', '', regex=True)
+
+def safe_del_vectorized(series):
+    return safe_hu_vectorized(series).str.lstrip('0')
+
+def is_box(v):
+    v = str(v).upper().strip()
+    if v == 'CARTON-16': return False 
+    if v in ['K1','K2','K3','K4','KLT','KLT1','KLT2']: return True
+    if v.startswith('K') and len(v) <= 2: return True
+    if 'CARTON' in v or 'BOX' in v or v in ['CT', 'CD3', 'CD', 'CR']: return True
+    return False
+
+def is_box_vectorized(series):
+    v = series.fillna('').astype(str).str.upper().str.strip()
+    box = v.isin(['K1', 'K2', 'K3', 'K4', 'KLT', 'KLT1', 'KLT2', 'CT', 'CD3', 'CD', 'CR'])
+    box |= v.str.startswith('K') & (v.str.len() <= 2)
+    box |= v.str.contains('CARTON', regex=False) | v.str.contains('BOX', regex=False)
+    return box & (v != 'CARTON-16')
+
+def detect_vollpalettes(df_pick, df_vekp, df_vepo):
+    voll_set = set()
+    if any(df is None or df.empty for df in [df_pick, df_vekp, df_vepo]):
+        return voll_set
+        
+    vepo_hu_col = next((c for c in df_vepo.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df_vepo.columns[0])
+    valid_vepo_hus = set(df_vepo[vepo_hu_col].dropna().apply(safe_hu))
+    
+    vekp_hu_col = next((c for c in df_vekp.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df_vekp.columns[0])
+    vekp_ext_col = df_vekp.columns[1]
+    parent_col = next((c for c in df_vekp.columns if "higher-level" in str(c).lower() or "übergeordn" in str(c).lower() or "superordinate" in str(c).lower()), None)
+    c_gen = next((c for c in df_vekp.columns if "Generated delivery" in str(c) or "generierte" in str(c).lower()), None)
+    c_pm = next((c for c in df_vekp.columns if "Packmittel" in str(c) or "Packaging" in str(c) or "Pack. mat" in str(c)), None)
+    
+    valid_roots = {}
+    for _, r in df_vekp.iterrows():
+        deliv = safe_del(r[c_gen]) if c_gen else ""
+        parent = safe_hu(r[parent_col]) if parent_col else ""
+        pm = str(r.get(c_pm, '')).upper().strip() if c_pm else ""
+        
+        if parent == "" and not is_box(pm):
+            ext_hu = safe_hu(r[vekp_ext_col])
+            int_hu = safe_hu(r[vekp_hu_col])
+            if int_hu in valid_vepo_hus:
+                # Uložíme si externí i interní číslo, abychom dokázali z Pick reportu spárovat cokoliv!
+                if ext_hu: valid_roots[(deliv, ext_hu)] = int_hu
+                if int_hu: valid_roots[(deliv, int_hu)] = int_hu
+                
+    c_su = 'Storage Unit Type' if 'Storage Unit Type' in df_pick.columns else ('Type' if 'Type' in df_pick.columns else None)
+    
+    for _, r in df_pick.iterrows():
+        if str(r.get('Removal of total SU', '')).strip().upper() != 'X': continue 
+        su_type = str(r.get(c_su, '')) if c_su else ''
+        if is_box(su_type): continue 
+        if 'PI_PA' in str(r.get('Queue', '')).upper(): continue 
+        
+        ssu = safe_hu(r.get('Source storage unit', ''))
+        hu = safe_hu(r.get('Handling Unit', ''))
+        
+        pick_hu = ""
+        if ssu and hu:
+            if ssu != hu: continue 
+            pick_hu = ssu
+        elif ssu: pick_hu = ssu
+        elif hu: pick_hu = hu
+        else: continue
+        
+        deliv = safe_del(r.get('Delivery', ''))
+        
+        if (deliv, pick_hu) in valid_roots:
+            int_match = valid_roots[(deliv, pick_hu)]
+            voll_set.add((deliv, pick_hu))
+            voll_set.add((deliv, int_match)) # Přidáme obě varianty pro jistotu
+            
+    return voll_set
+
+def detect_vollpalettes_vectorized(df_pick, df_vekp, df_vepo):
+    """Stejný voll_set jako detect_vollpalettes, ale kořeny i párování přes Pandas operace a merge."""
+    if any(df is None or df.empty for df in [df_pick, df_vekp, df_vepo]):
+        return set()
+
+    vepo_hu_col = _hu_col(df_vepo)
+    vepo_clean = df_vepo['Clean_HU_Int'] if 'Clean_HU_Int' in df_vepo.columns else safe_hu_vectorized(df_vepo[vepo_hu_col])
+    valid_vepo_hus = set(vepo_clean[df_vepo[vepo_hu_col].notna()])
+
+    # Kořenové HU (bez nadřazené HU, ne krabice), které mají obsah ve VEPO
+    vekp = stage_table(df_vekp, 'raw_vekp')
+    c_pm = next((c for c in vekp.columns if "Packmittel" in str(c) or "Packaging" in str(c) or "Pack. mat" in str(c)), None)
+    is_root = (vekp['Clean_Parent'] == '') & vekp['Clean_HU_Int'].isin(valid_vepo_hus)
+    if c_pm: is_root &= ~is_box_vectorized(vekp[c_pm])
+    roots = vekp[is_root]
+
+    # Klíč (zakázka, HU) pro externí i interní číslo; při shodě vyhrává pozdější řádek jako u slovníku
+    order = np.arange(len(roots)) * 2
+    keys = pd.concat([
+        pd.DataFrame({'d': roots['Clean_Del'].values, 'hu': roots['Clean_HU_Ext'].values, 'int': roots['Clean_HU_Int'].values, 'o': order}),
+        pd.DataFrame({'d': roots['Clean_Del'].values, 'hu': roots['Clean_HU_Int'].values, 'int': roots['Clean_HU_Int'].values, 'o': order + 1}),
+    ])
+    keys = keys[keys['hu'] != ''].sort_values('o').drop_duplicates(['d', 'hu'], keep='last')
+
+    empty = pd.Series('', index=df_pick.index)
+    col = lambda c: df_pick[c] if c in df_pick.columns else empty
+    ssu = df_pick['Clean_SSU'] if 'Clean_SSU' in df_pick.columns else safe_hu_vectorized(col('Source storage unit'))
+    hu = df_pick['Clean_HU'] if 'Clean_HU' in df_pick.columns else safe_hu_vectorized(col('Handling Unit'))
+    deliv = df_pick['Clean_Del'] if 'Clean_Del' in df_pick.columns else safe_del_vectorized(col('Delivery'))
+
+    c_su = 'Storage Unit Type' if 'Storage Unit Type' in df_pick.columns else ('Type' if 'Type' in df_pick.columns else None)
+    mask = col('Removal of total SU').fillna('').astype(str).str.strip().str.upper() == 'X'
+    if c_su: mask &= ~is_box_vectorized(df_pick[c_su])
+    mask &= ~col('Queue').fillna('').astype(str).str.upper().str.contains('PI_PA', regex=False)
+    mask &= ~((ssu != '') & (hu != '') & (ssu != hu))
+    pick_hu = ssu.where(ssu != '', hu)
+    mask &= pick_hu != ''
+
+    cand = pd.DataFrame({'d': deliv[mask].values, 'hu': pick_hu[mask].values}).drop_duplicates()
+    hits = cand.merge(keys[['d', 'hu', 'int']], on=['d', 'hu'], how='inner')
+    return set(zip(hits['d'], hits['hu'])) | set(zip(hits['d'], hits['int']))
+
+def pick_vollpalettes(df_pick, voll_set):
+    """Příznak vollpalety pro každý (stagovaný) pick řádek: (zakázka, HU - jinak zdrojová HU) je ve voll_set."""
+    hu = df_pick['Clean_HU'].where(df_pick['Clean_HU'] != '', df_pick['Clean_SSU'])
+    return pd.Series([(d, h) in voll_set for d, h in zip(df_pick['Clean_Del'].to_numpy(dtype=object), hu.to_numpy(dtype=object))], index=df_pick.index, dtype=bool)
+
+
+# ==========================================
+# TYPOVANÝ STAGING (očištěné sloupce se ukládají už při nahrání do DB)
+# ==========================================
+
+# Sloupce, které potřebuje příprava dat (core.prep.prepare_pick a prepare_hu) a detekce vollpalet - viz database.resolve_columns
+PREP_COLUMNS = {
+    'raw_pick': ['=Delivery', '=Material', '=User', 'Act.qty (dest)', 'Storage Bin', 'Removal of total SU', 'Confirmation date',
+                 'Transfer Order', 'Handling Unit', 'Source storage unit', 'Storage Unit Type', '=Type',
+                 '=Match_Key', '=Qty', '=Date', 'Clean_'],
+    'raw_vekp': [0, 1, 'Internal HU', 'HU-Nummer intern', '=Handling Unit', 'Generated delivery', 'generierte',
+                 'higher-level', 'übergeordn', 'superordinate', 'Packmittel', 'Packaging', 'Pack. mat', 'Clean_'],
+    'raw_vepo': [0, 'Internal HU', 'HU-Nummer intern', 'Clean_'],
+}
+
+# Sloupec, podle kterého se pozná, že řádky tabulky už prošly stagingem
+STAGED_MARKERS = {'raw_pick': 'Match_Key', 'raw_marm': 'Match_Key', 'raw_vekp': 'Clean_Del', 'raw_vepo': 'Clean_HU_Int'}
+
+def _hu_col(df):
+    return next((c for c in df.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df.columns[0])
+
+def _dim_to_cm(values, units):
+    v = pd.to_numeric(values, errors='coerce').fillna(0.0)
+    u = units.astype(str).str.upper().str.strip()
+    return np.where(u == 'MM', v / 10.0, np.where(u == 'M', v * 100.0, v))
+
+def is_staged(df, table_name):
+    marker = STAGED_MARKERS.get(table_name)
+    return df is not None and marker in df.columns and bool(df[marker].notna().all())
+
+def stage_table(df, table_name):
+    """Doplní k surové tabulce typované a očištěné sloupce (Qty, Date, Clean_Del, Clean_HU_*, Match_Key...).
+
+    Volá se při nahrání do DB; při čtení je to no-op, pokud už řádky staging mají (starší data se dopočítají).
+    """
+    if df is None or df.empty or table_name not in STAGED_MARKERS or is_staged(df, table_name): return df
+    df = df.copy()
+    if table_name == 'raw_pick':
+        df['Match_Key'] = get_match_key_vectorized(df['Material'])
+        df['Qty'] = pd.to_numeric(df['Act.qty (dest)'], errors='coerce').fillna(0.0)
+        df['Date'] = pd.to_datetime(df.get('Confirmation date', df.get('Confirmation Date')), errors='coerce')
+        df['Clean_Del'] = safe_del_vectorized(df['Delivery'])
+        df['Clean_HU'] = safe_hu_vectorized(df.get('Handling Unit', pd.Series('', index=df.index)))
+        df['Clean_SSU'] = safe_hu_vectorized(df.get('Source storage unit', pd.Series('', index=df.index)))
+    elif table_name == 'raw_marm':
+        df['Match_Key'] = get_match_key_vectorized(df['Material'])
+        df['Numerator_Num'] = pd.to_numeric(df.get('Numerator'), errors='coerce').fillna(0.0)
+        gross = pd.to_numeric(df.get('Gross Weight'), errors='coerce').fillna(0.0)
+        w_unit = df.get('Unit of Weight', pd.Series('', index=df.index)).astype(str).str.upper()
+        df['Weight_KG'] = np.where(w_unit == 'G', gross / 1000.0, gross)
+        d_unit = df.get('Unit of Dimension', pd.Series('CM', index=df.index))
+        for dim_col, short in [('Length', 'L'), ('Width', 'W'), ('Height', 'H')]:
+            df[f'{short}_CM'] = _dim_to_cm(df[dim_col], d_unit) if dim_col in df.columns else 0.0
+    elif table_name == 'raw_vekp':
+        # Externí HU je v exportu VEKP vždy druhý sloupec (bereme ho před přidáním nových sloupců)
+        ext_col = df.columns[1]
+        parent_col = next((c for c in df.columns if "higher-level" in str(c).lower() or "übergeordn" in str(c).lower() or "superordinate" in str(c).lower()), None)
+        gen_col = next((c for c in df.columns if "Generated delivery" in str(c) or "generierte" in str(c).lower()), None)
+        df['Clean_Del'] = safe_del_vectorized(df[gen_col]) if gen_col else ''
+        df['Clean_HU_Int'] = safe_hu_vectorized(df[_hu_col(df)])
+        df['Clean_HU_Ext'] = safe_hu_vectorized(df[ext_col])
+        df['Clean_Parent'] = safe_hu_vectorized(df[parent_col]) if parent_col else ''
+    elif table_name == 'raw_vepo':
+        df['Clean_HU_Int'] = safe_hu_vectorized(df[_hu_col(df)])
+    return df
+
+
+# ==========================================
+# INDEX HIERARCHIE HU (VEKP strom sestavený jednou pro fakturaci i audit)
+# ==========================================
+
+def hu_tree_rows(df_vekp):
+    """Řádky VEKP, ze kterých se skládá strom HU (s HU a zakázkou) - stejný výběr jako ve fakturaci."""
+    vekp = stage_table(df_vekp, 'raw_vekp').dropna(subset=["Handling Unit", "Generated delivery"])
+    return vekp[vekp['Clean_Del'] != '']
+
+def build_hu_index(df_vekp):
+    """Zkompiluje strom HU do plochých polí: rodič, kořen, hloubka a listy (CSR) pro každou HU.
+
+    Uzly jsou interní čísla HU (při duplicitě platí poslední řádek) a nadřazené HU, které ve VEKP chybí.
+    HU v cyklu (nebo pod ním) nemá kořen ani listy (-1), viz hu_tree_issues. Bez rekurze, jen vektorové průchody.
+    """
+    vekp = hu_tree_rows(df_vekp) if df_vekp is not None and not df_vekp.empty else pd.DataFrame(columns=['Clean_Del', 'Clean_HU_Int', 'Clean_Parent'])
+
+    # Kódy uzlů v pořadí prvního výskytu, rodič a zakázka z posledního řádku dané HU (jako u slovníku)
+    codes, hus = pd.factorize(vekp['Clean_HU_Int'])
+    last = vekp[['Clean_Del', 'Clean_Parent']].set_axis(codes)
+    last = last[~last.index.duplicated(keep='last')].sort_index()
+    n_real = len(hus)
+    parent = pd.Index(hus).get_indexer(last['Clean_Parent'])
+    parent[last['Clean_Parent'].values == ''] = -1
+
+    # Nadřazené HU bez vlastního řádku ve VEKP dostanou fantomové uzly za skutečnými HU
+    missing = (parent < 0) & (last['Clean_Parent'].values != '')
+    phantom_codes, phantoms = pd.factorize(last['Clean_Parent'][missing])
+    parent[missing] = n_real + phantom_codes
+    hus = np.concatenate([np.asarray(hus, dtype=object), np.asarray(phantoms, dtype=object)])
+    parent = np.concatenate([parent, np.full(len(phantoms), -1)]).astype(np.int64)
+    n = len(hus)
+
+    # Kořen a hloubka skokem po ukazatelích: každý průchod zdvojnásobí délku skoku, stačí log2(n) průchodů.
+    # Kořen ukazuje sám na sebe; HU v cyklu (nebo pod ním) se ke kořeni nikdy nedostane.
+    up = np.where(parent >= 0, parent, np.arange(n))
+    dist = (parent >= 0).astype(np.int64)
+    for _ in range(max(n.bit_length(), 1)):
+        nxt = up[up]
+        if np.array_equal(nxt, up): break
+        dist = dist + dist[up]
+        up = nxt
+    rooted = parent[up] < 0
+    root = np.where(rooted, up, -1)
+    depth = np.where(rooted, dist, -1)
+
+    # Listy = HU bez potomků; po úrovních zdola nahoru se každý list zapíše ke všem svým předkům (včetně sebe)
+    has_child = np.bincount(parent[parent >= 0], minlength=n) > 0
+    leaf = np.flatnonzero(~has_child & (root >= 0))
+    owners, leaves, anc = [], [], leaf
+    while len(anc):
+        owners.append(anc)
+        leaves.append(leaf)
+        keep = parent[anc] >= 0
+        anc, leaf = parent[anc][keep], leaf[keep]
+    owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+    leaves = np.concatenate(leaves) if leaves else np.empty(0, dtype=np.int64)
+    order = np.lexsort((leaves, owners))
+    leaf_ptr = np.concatenate([[0], np.cumsum(np.bincount(owners, minlength=n))])
+
+    return {
+        'hus': hus, 'pos': dict(zip(hus, range(n))), 'n_real': n_real, 'dels': last['Clean_Del'].values,
+        'parent': parent, 'root': root, 'depth': depth,
+        'leaf_ptr': leaf_ptr, 'leaf_ids': leaves[order],
+    }
+
+def hu_tree_issues(index):
+    """Datová kvalita stromu HU: cykly v nadřazených HU a odkazy na nadřazenou HU, která ve VEKP chybí."""
+    n_real, parent = index['n_real'], index['parent']
+    cyc = np.flatnonzero(index['root'][:n_real] < 0)
+    orphan = np.flatnonzero(parent[:n_real] >= n_real)
+    rows = np.concatenate([cyc, orphan])
+    return pd.DataFrame({
+        'Zakázka (Delivery)': index['dels'][rows],
+        'HU': index['hus'][rows],
+        'Nadřazená HU': index['hus'][parent[rows]],
+        'Problém': ['Cyklus v hierarchii (HU se nevyfakturuje)'] * len(cyc) + ['Nadřazená HU chybí ve VEKP (nebo nemá zakázku)'] * len(orphan),
+    })
+
+def hu_root(index, hu):
+    """Kořenová HU (neznámá HU je kořenem sama sobě, HU v cyklu vrací None)."""
+    i = index['pos'].get(hu)
+    if i is None: return hu
+    r = index['root'][i]
+    return index['hus'][r] if r >= 0 else None
+
+def hu_depth(index, hu):
+    i = index['pos'].get(hu)
+    return 0 if i is None else int(index['depth'][i])
+
+def hu_leaves(index, hu):
+    """Listové HU pod danou HU (HU bez potomků vrací sama sebe)."""
+    i = index['pos'].get(hu)
+    if i is None: return [hu]
+    return index['hus'][index['leaf_ids'][index['leaf_ptr'][i]:index['leaf_ptr'][i + 1]]].tolist()
+
+def hu_leaf_pairs(index, hus):
+    """Vektorová obdoba hu_leaves pro celé pole HU: vrací (pozice vstupní HU, listová HU) pro každý pár."""
+    hus = np.asarray(hus, dtype=object)
+    i = pd.Series(hus).map(index['pos']).fillna(-1).astype(np.int64).values
+    known = i >= 0
+    if not known.any(): return np.arange(len(hus)), hus.copy()
+    j = np.maximum(i, 0)
+    start = index['leaf_ptr'][j]
+    lens = np.where(known, index['leaf_ptr'][j + 1] - start, 1)
+    rows = np.repeat(np.arange(len(hus)), lens)
+    offs = np.arange(len(rows)) - np.repeat(np.cumsum(lens) - lens, lens)
+    # Neznámá HU je listem sama sobě (jako hu_leaves)
+    leaves, sel = hus[rows], known[rows]
+    leaves[sel] = index['hus'][index['leaf_ids'][(start[rows] + offs)[sel]]]
+    return rows, leaves
+
+def hu_is_phantom(index, hu):
+    """HU, na kterou se odkazuje jako na nadřazenou, ale ve VEKP nemá vlastní řádek."""
+    i = index['pos'].get(hu)
+    return i is not None and i >= index['n_real']
@@ -0,0 +1,284 @@
+"""Nahrávání SAP exportů do DB: rozpoznání typu souboru podle sloupců a uložení do správné tabulky.
+
+Exporty se čtou a ukládají po dávkách (CSV přes C parser, .xlsx přes openpyxl read-only), takže ani 300 MB VEPO
+nemusí být v paměti celé.
+"""
+import csv
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from database import init_connection, save_chunks_to_db, UPSERT_KEYS
+from core.hu import stage_table
+from core.prep import AUS_SHEETS
+
+INGEST_CHUNK_ROWS = 100_000
+# Souběžně zpracovávané soubory při nahrání více exportů najednou (viz submit_ingest)
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS') or 4)
+# Auswertung nad touto velikostí se parsuje po listech v samostatných procesech
+AUS_PARALLEL_MIN_BYTES = 5 * 2**20
+
+def detect_table(fname, cols):
+    """Cílová tabulka pro export podle názvu souboru a sloupců (None = nerozpoznáno)."""
+    fname = fname.lower()
+    cols_up = [str(c).upper() for c in cols]
+    has = lambda *parts: any(p in c for c in cols_up for p in parts)
+    if has('DELIVERY') and has('ACT.QTY'): return 'raw_pick'
+    if has('NUMERATOR') and has('ALTERNATIVE UNIT'): return 'raw_marm'
+    if has('HANDLING UNIT') and has('GENERATED DELIVERY'): return 'raw_vekp'
+    if has('HANDLING UNIT ITEM', 'HANDLING UNIT POSITION') and has('MATERIAL'): return 'raw_vepo'
+    if has('LIEFERUNG') and has('KATEGORIE'): return 'raw_cats'
+    if has('QUEUE') and has('TRANSFER ORDER', 'SD DOCUMENT'): return 'raw_queue'
+    if 'likp' in fname or has('SHIPPING POINT', 'VERSANDSTELLE'): return 'raw_likp'
+    if 'oe-times' in fname or has('PROCESS', 'TIME'): return 'raw_oe'
+    if len(cols) >= 2 and has('MATERIAL', 'MATERIÁL'): return 'raw_manual'
+    return None
+
+def normalize_oe(df):
+    """Sjednotí názvy sloupců OE-Times (první sloupec se zakázkou -> 'DN NUMBER (SAP)', s časem -> 'Process Time')."""
+    rename_map = {}
+    has_dn = False
+    has_time = False
+
+    for orig in df.columns:
+        up = str(orig).upper()
+        if not has_dn and ('DN NUMBER' in up or 'DELIVERY' in up or 'DODAVKA' in up):
+            rename_map[orig] = 'DN NUMBER (SAP)'
+            has_dn = True
+        elif not has_time and ('PROCESS' in up or 'CAS' in up or 'ČAS' in up or 'TIME' in up):
+            rename_map[orig] = 'Process Time'
+            has_time = True
+
+    df = df.rename(columns=rename_map)
+    return df.loc[:, ~df.columns.duplicated()]
+
+def sniff_delimiter(file):
+    """Oddělovač CSV odhadnutý z první řádky (stejně jako sep=None v pd.read_csv); pozice v souboru se nemění."""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f: line = f.readline()
+    else:
+        pos = file.tell()
+        line = file.readline()
+        file.seek(pos)
+    if isinstance(line, bytes): line = line.decode('utf-8-sig', errors='replace')
+    return csv.Sniffer().sniff(line).delimiter
+
+def iter_csv_chunks(file, chunk_rows=INGEST_CHUNK_ROWS):
+    """CSV po dávkách jako text - oddělovač se odhadne jednou, dál čte rychlý C parser."""
+    with pd.read_csv(file, dtype=str, sep=sniff_delimiter(file), chunksize=chunk_rows) as reader:
+        yield from reader
+
+def _xlsx_value(cell):
+    # Převod buňky jako v pd.read_excel (openpyxl): prázdná -> '', chyba -> NaN, celé číslo bez desetinné části
+    if cell.value is None: return ''
+    if cell.data_type == 'e': return float('nan')
+    if cell.data_type == 'n':
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+def iter_xlsx_chunks(file, sheet=None, chunk_rows=INGEST_CHUNK_ROWS):
+    """List .xlsx (výchozí první) po dávkách přes openpyxl read-only; hodnoty jako pd.read_excel(dtype=str).
+
+    Šířku tabulky určuje hlavička (buňky vpravo od posledního pojmenovaného sloupce se ignorují), prázdné
+    řádky uprostřed zůstávají, prázdné řádky na konci listu se zahodí.
+    """
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet] if sheet is not None else wb.worksheets[0]
+        ws.reset_dimensions()
+        rows = ws.iter_rows()
+        header = [_xlsx_value(c) for c in next(rows, ())]
+        while header and header[-1] == '': header.pop()
+        if not header:
+            yield pd.DataFrame()
+            return
+        width = len(header)
+        to_frame = lambda batch: TextParser([header] + batch, header=0, dtype=str, skip_blank_lines=False).read()
+
+        batch, empty, yielded = [], 0, False
+        for row in rows:
+            values = [_xlsx_value(c) for c in row[:width]]
+            if all(v == '' for v in values):
+                empty += 1
+                continue
+            batch += [[''] * width for _ in range(empty)]
+            empty = 0
+            batch.append(values + [''] * (width - len(values)))
+            if len(batch) >= chunk_rows:
+                yield to_frame(batch)
+                batch, yielded = [], True
+        if batch or not yielded: yield to_frame(batch)
+    finally:
+        wb.close()
+
+def iter_export(file, fname, chunk_rows=INGEST_CHUNK_ROWS):
+    """Export po dávkách DataFramů (text, očištěné názvy sloupců); vždy aspoň jedna dávka, i bez řádků."""
+    name = fname.lower()
+    if name.endswith('.csv'): chunks = iter_csv_chunks(file, chunk_rows)
+    elif name.endswith(('.xlsx', '.xlsm')): chunks = iter_xlsx_chunks(file, chunk_rows=chunk_rows)
+    else: chunks = iter([pd.read_excel(file, dtype=str)]) # .xls apod. - openpyxl je neumí číst po řádcích
+
+    empty = True
+    for df in chunks:
+        df.columns = df.columns.str.strip()
+        empty = False
+        yield df
+    if empty: yield pd.DataFrame()
+
+def _file_size(file):
+    if isinstance(file, (str, os.PathLike)): return os.path.getsize(file)
+    if getattr(file, 'size', None) is not None: return file.size # Streamlit UploadedFile
+    return file.getbuffer().nbytes if hasattr(file, 'getbuffer') else None
+
+def _timed(chunks, stats, prep, progress):
+    """Propouští dávky do zápisu a měří čtení, čištění a zápis (čas od odevzdání dávky do žádosti o další)."""
+    while True:
+        t0 = time.perf_counter()
+        df = next(chunks, None)
+        stats['read_s'] += time.perf_counter() - t0
+        if df is None: return
+        t0 = time.perf_counter()
+        df = prep(df)
+        stats['clean_s'] += time.perf_counter() - t0
+        stats['rows_read'] += len(df)
+        stats['chunks'] += 1
+        t0 = time.perf_counter()
+        yield df
+        stats['write_s'] += time.perf_counter() - t0
+        if progress: progress(stats)
+
+def _finish(stats, write_s):
+    # Přesný čas zápisu (včetně závěrečného upsertu) z save_chunks_to_db; vrací sloupce pro load_log
+    stats['write_s'] = write_s
+    stats['total_s'] = stats['read_s'] + stats['detect_s'] + stats['clean_s'] + write_s
+    stats['rows_per_s'] = stats['rows_read'] / stats['total_s'] if stats['total_s'] > 0 else 0.0
+    return {k: (round(v, 3) if isinstance(v, float) else v) for k, v in stats.items() if k not in ('table_name', 'status')}
+
+def _new_stats(fname, table, size, read_s=0.0):
+    return {'file_name': fname, 'table_name': table, 'bytes': float(size or 0), 'rows_read': 0, 'chunks': 0,
+            'read_s': read_s, 'detect_s': 0.0, 'clean_s': 0.0, 'write_s': 0.0, 'status': 'zpracovává se'}
+
+def _ingest_sheet(file, fname, sheet, size, progress=None):
+    """Jeden list Auswertungu -> aus_<list> po dávkách; file je cesta nebo soubor (workbook se otevírá read-only)."""
+    stats = _new_stats(fname, f"aus_{sheet.lower()}", size)
+    if hasattr(file, 'seek'): file.seek(0)
+    save_chunks_to_db(_timed(iter_xlsx_chunks(file, sheet), stats, lambda df: df, progress), stats['table_name'],
+                      log_extra=lambda write_s: _finish(stats, write_s))
+    stats['status'] = 'hotovo'
+    return stats
+
+def _ingest_auswertung(file, fname, size, progress=None):
+    """Uloží listy Auswertungu, které čte některý konzument (AUS_SHEETS); ostatní listy se ani neparsují.
+
+    Velký workbook se na serverové DB parsuje a zapisuje po listech souběžně v procesech (openpyxl drží GIL),
+    každý proces s vlastním spojením; progress se pak volá až po dokončení listu. Nahraný soubor (ne cesta) se pro
+    procesy jednou uloží do dočasného souboru - každý si ho otevře sám, obsah se do procesů nekopíruje.
+    """
+    wb = openpyxl.load_workbook(file, read_only=True)
+    sheets = [sn for sn in wb.sheetnames if sn.upper() in AUS_SHEETS]
+    wb.close()
+    if len(sheets) < 2 or (size or 0) < AUS_PARALLEL_MIN_BYTES or init_connection().dialect.name == 'sqlite':
+        saved = []
+        for sn in sheets:
+            saved.append(_ingest_sheet(file, fname, sn, size, progress))
+            if progress: progress(saved[-1])
+        return saved
+
+    if not isinstance(file, (str, os.PathLike)):
+        with tempfile.NamedTemporaryFile(prefix='aus_', suffix='.xlsx', delete=False) as tmp:
+            file.seek(0)
+            shutil.copyfileobj(file, tmp)
+        try:
+            return _ingest_auswertung(tmp.name, fname, size, progress)
+        finally:
+            os.remove(tmp.name)
+
+    # spawn: proces se nesmí forkovat z vícevláknového serveru (a zdědit jeho spojení do DB)
+    with ProcessPoolExecutor(max_workers=min(len(sheets), os.cpu_count() or 1), mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = [pool.submit(_ingest_sheet, file, fname, sn, size) for sn in sheets]
+        for fut in as_completed(futures):
+            if progress: progress(fut.result())
+        return [fut.result() for fut in futures]
+
+def ingest_file(file, fname, incremental=False, progress=None):
+    """Uloží jeden export do DB a vrátí měření pro každou uloženou tabulku; prázdný seznam = soubor nebyl rozpoznán.
+
+    Workbook *auswertung*.xlsx se ukládá po listech do aus_<list> (jen listy z AUS_SHEETS), ostatní soubory podle detect_table
+    (typ se pozná z první dávky, další dávky se čistí a zapisují průběžně). Měření (časy fází read/detect/
+    clean/write, řádky, bajty, řádků/s) se ukládá i do load_log; progress(stats) se volá po každé dávce a na konci.
+    """
+    size = _file_size(file)
+    if fname.lower().endswith('.xlsx') and 'auswertung' in fname.lower(): return _ingest_auswertung(file, fname, size, progress)
+
+    t0 = time.perf_counter()
+    chunks = iter_export(file, fname)
+    first = next(chunks)
+    stats = _new_stats(fname, None, size, time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    table = stats['table_name'] = detect_table(fname, first.columns)
+    stats['detect_s'] = time.perf_counter() - t0
+    if table is None:
+        chunks.close()
+        return []
+    # Typované sloupce se ukládají už při nahrání (no-op pro tabulky bez stagingu)
+    prep = lambda df: stage_table(normalize_oe(df) if table == 'raw_oe' else df, table)
+    save_chunks_to_db(_timed(itertools.chain([first], chunks), stats, prep, progress), table,
+                      incremental=incremental and table in UPSERT_KEYS, log_extra=lambda write_s: _finish(stats, write_s))
+    stats['status'] = 'hotovo'
+    if progress: progress(stats)
+    return [stats]
+
+def peek_table(file, fname):
+    """Cílová tabulka exportu jen z hlavičky a první řádky ('auswertung' = workbook po listech, None = nerozpoznáno)."""
+    if fname.lower().endswith('.xlsx') and 'auswertung' in fname.lower(): return 'auswertung'
+    chunks = iter_export(file, fname, chunk_rows=1)
+    try:
+        return detect_table(fname, next(chunks).columns)
+    finally:
+        chunks.close()
+        if hasattr(file, 'seek'): file.seek(0)
+
+def _submit_chain(pool, chain, incremental, progress):
+    """Pošle do poolu první soubor řetězce [(future, soubor, název)]; další se pošle až z callbacku po jeho dokončení.
+
+    Žádné vlákno poolu tak nečeká na jiný soubor; chyba souboru se předá jeho future a řetěz pokračuje.
+    """
+    if not chain: return
+    target, file, fname = chain[0]
+    def done(fut):
+        _submit_chain(pool, chain[1:], incremental, progress) # dřív než výsledek - volající pak nezavře pool předčasně
+        if fut.exception() is None: target.set_result(fut.result())
+        else: target.set_exception(fut.exception())
+    try:
+        pool.submit(ingest_file, file, fname, incremental, progress).add_done_callback(done)
+    except Exception as e: # pool už neběží - zbytek řetězce se nespustí
+        for t, _, _ in chain: t.set_exception(e)
+
+def submit_ingest(pool, files, incremental=False, progress=None):
+    """Naplánuje nahrání exportů ([(soubor, název)]) do poolu vláken; vrací futures (výsledek ingest_file) v pořadí files.
+
+    Soubory do různých tabulek běží souběžně, každý zapisuje vlastním spojením z poolu SQLAlchemy. Soubory do
+    stejné tabulky (a všechny Auswertungy) jdou za sebou v pořadí nahrání - další se do poolu pošle až po dokončení
+    předchozího, vlákna poolu na sebe nečekají; SQLite má jen jednoho zapisovatele, tam jde vše za sebou.
+    progress se volá z pracovních vláken.
+    """
+    serial = init_connection().dialect.name == 'sqlite'
+    chains, futures = {}, []
+    for i, (file, fname) in enumerate(files):
+        try:
+            key = 'sqlite' if serial else peek_table(file, fname)
+        except Exception:
+            key = None # nečitelný soubor - chybu nahlásí jeho vlastní future
+        futures.append(Future())
+        chains.setdefault(key if key is not None else ('file', i), []).append((futures[-1], file, fname))
+    for chain in chains.values(): _submit_chain(pool, chain, incremental, progress)
+    return futures
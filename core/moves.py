@@ -0,0 +1,190 @@
+"""Fyzické pohyby skladníka: párovací klíče materiálů, rozklad na krabice a ergonomické limity."""
+import numpy as np
+import pandas as pd
+
+# Jednotky MARM, které znamenají krabici (balení po více kusech)
+BOX_UNITS = {'AEK', 'KAR', 'KART', 'PAK', 'VPE', 'CAR', 'BLO', 'ASK', 'BAG', 'PAC'}
+
+def get_match_key_vectorized(series):
+    s = series.astype(str).str.strip().str.upper()
+    mask_decimal = s.str.match(r'^\d+\.\d+$')
+    s = s.copy()
+    s[mask_decimal] = s[mask_decimal].str.rstrip('0').str.rstrip('.')
+    mask_numeric = s.str.match(r'^0+\d+$')
+    s[mask_numeric] = s[mask_numeric].str.lstrip('0')
+    return s
+
+def get_match_key(val):
+    v = str(val).strip().upper()
+    if '.' in v and v.replace('.', '').isdigit(): v = v.rstrip('0').rstrip('.')
+    if v.isdigit(): v = v.lstrip('0') or '0'
+    return v
+
+def parse_packing_time(val):
+    v = str(val).strip()
+    if v in ['', 'nan', 'None', 'NaN']: return 0.0
+    try:
+        num = float(v)
+        if num < 1.0: return num * 24 * 60
+        return num
+    except: pass
+    parts = v.split(':')
+    try:
+        if len(parts) == 3: return int(parts[0])*60 + int(parts[1]) + float(parts[2])/60.0
+        elif len(parts) == 2: return int(parts[0]) + float(parts[1])/60.0
+    except: pass
+    return 0.0
+
+def fast_compute_moves(qty_list, queue_list, su_list, box_list, w_list, d_list, v_lim, d_lim, h_lim):
+    res_total, res_exact, res_miss = [], [], []
+    for qty, q, su, boxes, w, d in zip(qty_list, queue_list, su_list, box_list, w_list, d_list):
+        if qty <= 0:
+            res_total.append(0); res_exact.append(0); res_miss.append(0); continue
+        if str(q).upper() in ('PI_PL_FU', 'PI_PL_FUOE') and str(su).strip().upper() == 'X':
+            res_total.append(1); res_exact.append(1); res_miss.append(0); continue
+        if not isinstance(boxes, list): boxes = []
+        real_boxes = [b for b in boxes if b > 1]
+        pb = pok = pmiss = 0
+        zbytek = qty
+        for b in real_boxes:
+            if zbytek >= b:
+                m = int(zbytek // b); pb += m; zbytek = zbytek % b
+                
+        if zbytek > 0:
+            if w >= v_lim or d >= d_lim: p = int(zbytek)
+            else: p = int(np.ceil(zbytek / h_lim))
+            if len(boxes) > 0: pok += p
+            else: pmiss += p
+            
+        res_total.append(pb + pok + pmiss); res_exact.append(pb + pok); res_miss.append(pmiss)
+    return res_total, res_exact, res_miss
+
+
+# ==========================================
+# VEKTOROVÝ VÝPOČET POHYBŮ (NumPy, bez smyčky přes řádky)
+# ==========================================
+
+def pack_box_sizes(box_list):
+    """Zabalí seznamy krabic do matice (řádky x max. počet krabic), prázdná místa = 0."""
+    lists = [b if isinstance(b, list) else [] for b in box_list]
+    lengths = np.fromiter((len(b) for b in lists), dtype=np.int64, count=len(lists))
+    width = int(lengths.max()) if len(lengths) > 0 else 0
+    boxes = np.zeros((len(lists), width), dtype=np.int64)
+    if width > 0:
+        values = np.fromiter((v for b in lists for v in b), dtype=np.int64, count=int(lengths.sum()))
+        rows = np.repeat(np.arange(len(lists)), lengths)
+        cols = np.arange(len(values)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        boxes[rows, cols] = values
+    return boxes, lengths > 0
+
+def decompose_box_moves(qty_list, queue_list, su_list, box_list):
+    """Rozklad řádků na celé krabice. Nezávisí na limitech, stačí ho spočítat jednou na řádek.
+
+    NaN v qty se chová jako ve fast_compute_moves: celá paleta (PI_PL_FU/PI_PL_FUOE + X) dá 1 pohyb, jinak 0.
+    """
+    qty = np.asarray(qty_list, dtype=np.float64)
+    boxes, has_boxes = pack_box_sizes(box_list)
+
+    queue_up = pd.Series(queue_list, dtype=object).astype(str).str.upper().values
+    su_up = pd.Series(su_list, dtype=object).astype(str).str.strip().str.upper().values
+    is_zero = qty <= 0 # NaN není <= 0, stejně jako ve smyčce
+    is_full = ~is_zero & np.isin(queue_up, ['PI_PL_FU', 'PI_PL_FUOE']) & (su_up == 'X')
+    active = ~is_zero & ~is_full
+
+    zbytek = np.where(active, qty, 0.0)
+    pb = np.zeros(len(qty), dtype=np.int64)
+    for j in range(boxes.shape[1]):
+        b = boxes[:, j]
+        mask = (b > 1) & (zbytek >= b)
+        safe_b = np.where(mask, b, 1)
+        pb += np.where(mask, np.floor_divide(zbytek, safe_b), 0).astype(np.int64)
+        zbytek = np.where(mask, np.mod(zbytek, safe_b), zbytek)
+
+    return {'box_moves': pb, 'rest': zbytek, 'has_boxes': has_boxes, 'is_full': is_full}
+
+def apply_move_limits(box_moves, rest, has_boxes, is_full, w_list, d_list, v_lim, d_lim, h_lim):
+    """Z předpočítaného rozkladu dopočítá pohyby pro konkrétní ergonomické limity."""
+    w = np.asarray(w_list, dtype=np.float64)
+    d = np.asarray(d_list, dtype=np.float64)
+    rest = np.asarray(rest, dtype=np.float64)
+    has_boxes = np.asarray(has_boxes, dtype=bool)
+    is_full = np.asarray(is_full, dtype=bool)
+    box_moves = np.asarray(box_moves, dtype=np.int64)
+
+    heavy = (w >= v_lim) | (d >= d_lim)
+    loose = np.where(heavy, np.trunc(rest), np.ceil(rest / h_lim))
+    loose = np.where(rest > 0, loose, 0).astype(np.int64)
+    pok = np.where(has_boxes, loose, 0)
+    pmiss = np.where(has_boxes, 0, loose)
+
+    res_total = np.where(is_full, 1, box_moves + pok + pmiss)
+    res_exact = np.where(is_full, 1, box_moves + pok)
+    res_miss = np.where(is_full, 0, pmiss)
+    return res_total, res_exact, res_miss
+
+def fast_compute_moves_vectorized(qty_list, queue_list, su_list, box_list, w_list, d_list, v_lim, d_lim, h_lim):
+    """Stejný výsledek jako fast_compute_moves, ale počítaný po sloupcích nad NumPy poli."""
+    dec = decompose_box_moves(qty_list, queue_list, su_list, box_list)
+    return apply_move_limits(dec['box_moves'], dec['rest'], dec['has_boxes'], dec['is_full'], w_list, d_list, v_lim, d_lim, h_lim)
+
+def sweep_move_scenarios(df_pick, weight_limits, dim_limits, grab_limits, group_col='Queue'):
+    """Vyhodnotí mřížku scénářů (váha x rozměr x hrst) jedním průchodem a vrátí souhrn scénář x fronta.
+
+    Očekává sloupce rozkladu z decompose_box_moves (Box_Moves, Loose_Rest, Has_Box_Data, Is_Full_SU).
+    """
+    out_cols = ['Scenario', 'Weight_Limit', 'Dim_Limit', 'Grab_Limit', group_col, 'Lines', 'Moves', 'Moves_Exact', 'Moves_Miss']
+    grid = [(float(v), float(dl), int(h)) for v in weight_limits for dl in dim_limits for h in grab_limits]
+    if df_pick is None or df_pick.empty or not grid:
+        return pd.DataFrame(columns=out_cols)
+
+    base = pd.DataFrame({
+        'grp': df_pick[group_col].astype(str).values,
+        'box': df_pick['Box_Moves'].values.astype(np.int64),
+        'rest': df_pick['Loose_Rest'].values.astype(np.float64),
+        'has': df_pick['Has_Box_Data'].values.astype(bool),
+        'full': df_pick['Is_Full_SU'].values.astype(bool),
+        'w': pd.to_numeric(df_pick['Piece_Weight_KG'], errors='coerce').values,
+        'd': pd.to_numeric(df_pick['Piece_Max_Dim_CM'], errors='coerce').values,
+    })
+    groups = sorted(base['grp'].unique())
+    base['code'] = pd.Categorical(base['grp'], categories=groups).codes
+
+    # Část nezávislá na limitech (krabice a celé palety)
+    fixed = base.groupby('code').agg(Lines=('box', 'size'), full=('full', 'sum'), box=('box', 'sum')).reindex(range(len(groups)), fill_value=0)
+
+    # Volné kusy: sloučíme shodné kombinace (fronta, zbytek, váha, rozměr), ať je matice scénářů malá
+    loose = base[(~base['full']) & (base['rest'] > 0)]
+    uniq = loose.groupby(['code', 'rest', 'w', 'd', 'has'], dropna=False).size().reset_index(name='cnt').sort_values('code', kind='stable')
+
+    V = np.array([g[0] for g in grid])[:, None]
+    D = np.array([g[1] for g in grid])[:, None]
+    H = np.array([g[2] for g in grid])[:, None]
+
+    exact_m = np.zeros((len(grid), len(groups)))
+    miss_m = np.zeros((len(grid), len(groups)))
+    if not uniq.empty:
+        rest = uniq['rest'].values[None, :]
+        heavy = (uniq['w'].values[None, :] >= V) | (uniq['d'].values[None, :] >= D)
+        moves = np.where(heavy, np.trunc(rest), np.ceil(rest / H)) * uniq['cnt'].values[None, :]
+        has = uniq['has'].values[None, :]
+        codes = uniq['code'].values
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        present = codes[starts]
+        exact_m[:, present] = np.add.reduceat(np.where(has, moves, 0), starts, axis=1)
+        miss_m[:, present] = np.add.reduceat(np.where(has, 0, moves), starts, axis=1)
+
+    fixed_exact = (fixed['box'].values + fixed['full'].values)[None, :]
+    exact_m = exact_m + fixed_exact
+
+    res = pd.DataFrame({
+        'Weight_Limit': np.repeat(V[:, 0], len(groups)),
+        'Dim_Limit': np.repeat(D[:, 0], len(groups)),
+        'Grab_Limit': np.repeat(H[:, 0], len(groups)),
+        group_col: np.tile(groups, len(grid)),
+        'Lines': np.tile(fixed['Lines'].values, len(grid)),
+        'Moves_Exact': exact_m.ravel().astype(np.int64),
+        'Moves_Miss': miss_m.ravel().astype(np.int64),
+    })
+    res['Moves'] = res['Moves_Exact'] + res['Moves_Miss']
+    res['Scenario'] = res['Weight_Limit'].map('{:g} kg'.format) + ' / ' + res['Dim_Limit'].map('{:g} cm'.format) + ' / ' + res['Grab_Limit'].astype(str) + ' ks'
+    return res[out_cols]
@@ -0,0 +1,33 @@
+"""Balení (OE-Times): spojení fakturace s časy u balícího stolu a skladovými údaji o zakázce."""
+import numpy as np
+import pandas as pd
+
+def _pack_del(s):
+    return s.astype(str).str.replace(r'\.0$', '', regex=True).str.strip().str.lstrip('0')
+
+def packing_matches(billing_df, df_oe):
+    """Fakturace spojená s časy balení (inner join přes očištěné číslo zakázky)."""
+    df_oe_clean = df_oe.copy()
+    df_oe_clean['Clean_Del'] = _pack_del(df_oe_clean['Delivery'])
+
+    bill_clean = billing_df.copy()
+    bill_clean['Clean_Del'] = _pack_del(bill_clean['Clean_Del_Merge'])
+    return pd.merge(bill_clean, df_oe_clean, on='Clean_Del', how='inner')
+
+def packing_efficiency(valid_time_df, facts=None):
+    """Doplní kusy a hlavní materiál zakázky z faktů po zakázkách (core.prep.delivery_facts; jinak počet TO / materiál z OE) a čas na 1 HU.
+
+    Vrací (tabulka, sloupec s kusy, sloupec s materiálem).
+    """
+    if facts is not None and not facts.empty:
+        valid_time_df = pd.merge(valid_time_df, facts[['Clean_Del', 'Skladovy_Material', 'Celkove_Kusy']], on='Clean_Del', how='left')
+        pcs_col = 'Celkove_Kusy'
+        mat_col = 'Skladovy_Material'
+    else:
+        # Fallback (kdyby pick report chyběl)
+        pcs_col = 'pocet_to'
+        mat_col = 'Material_y' if 'Material_y' in valid_time_df.columns else 'Material'
+
+    # Výpočet efektivity
+    valid_time_df['Min_per_HU'] = np.where(valid_time_df['pocet_hu'] > 0, valid_time_df['Process_Time_Min'] / valid_time_df['pocet_hu'], valid_time_df['Process_Time_Min'])
+    return valid_time_df, pcs_col, mat_col
@@ -0,0 +1,247 @@
+"""Příprava dat z DB bez Streamlitu: ETL Picku a SAP tabulek pro aplikaci i dávkový výpočet (python -m core)."""
+import re
+
+import numpy as np
+import pandas as pd
+
+from database import query_table, load_from_db
+from core.moves import BOX_UNITS, get_match_key, parse_packing_time, decompose_box_moves, apply_move_limits
+from core.hu import detect_vollpalettes_vectorized, build_hu_index, stage_table, pick_vollpalettes
+from core.billing import BILLING_AUS_SHEETS
+
+# Registr listů Auswertungu: konzument -> listy, které čte (tabulky aus_<list>). Jiné listy se při nahrání
+# přeskočí a do relace se nenačítají; nový konzument musí svůj list přidat sem.
+AUS_REGISTRY = {
+    'billing': BILLING_AUS_SHEETS,
+}
+AUS_SHEETS = sorted({s.upper() for sheets in AUS_REGISTRY.values() for s in sheets})
+# Zdroje, jejichž verze tvoří otisk připravených dat (včetně pomocných tabulek fakturace)
+PREP_SOURCES = ['raw_pick', 'raw_marm', 'raw_queue', 'raw_manual', 'raw_vekp', 'raw_vepo', 'raw_oe', 'raw_cats', 'raw_likp'] + [f'aus_{s.lower()}' for s in AUS_SHEETS]
+# Zdroje jednotlivých částí (LazyDataset v aplikaci je načítá a cachuje zvlášť)
+PICK_SOURCES = ['raw_pick', 'raw_marm', 'raw_queue', 'raw_manual']
+HU_SOURCES = ['raw_vekp', 'raw_vepo']
+PREP_VERSION = 4 # Zvýšit při změně logiky prepare_* (zneplatní uložené artefakty)
+
+def prepare_data(use_marm=True, date_range=None, excluded_materials=(), columns=None):
+    """Kompletní ETL z DB: Pick + Queue + MARM/ruční balení -> rozklad na krabice, vollpalety, strom HU, OE-Times, kategorie.
+
+    columns je projekce sloupců na tabulku (viz database.resolve_columns); None = všechny sloupce.
+    """
+    data = prepare_pick(use_marm, date_range, excluded_materials, columns)
+    if data is None: return None
+    data.update(prepare_hu(columns))
+    data['voll_set'] = detect_vollpalettes_vectorized(data['df_pick'], data['df_vekp'], data['df_vepo'])
+    data['df_oe'], data['df_cats'] = prepare_oe(), prepare_cats()
+    return data
+
+def prepare_pick(use_marm=True, date_range=None, excluded_materials=(), columns=None):
+    """Pick + Queue + MARM/ruční balení -> rozklad na krabice (None = Pick je po filtrech prázdný)."""
+    columns = columns or {}
+    # Filtry se posílají přímo do SQL; řádky bez data projdou (datum se může doplnit z Queue a dofiltruje se v main)
+    pick_where = []
+    if date_range: pick_where.append(('Date', 'between', date_range, True))
+    if excluded_materials: pick_where.append(('Material', 'not in_ci', list(excluded_materials)))
+    df_pick_raw = query_table('raw_pick', columns=columns.get('raw_pick'), where=pick_where)
+    if df_pick_raw is None or df_pick_raw.empty: return None
+
+    df_marm_raw = load_from_db('raw_marm') if use_marm else None
+    df_queue_raw = load_from_db('raw_queue')
+    df_manual_raw = load_from_db('raw_manual')
+
+    # Typované sloupce (Qty, Date, Match_Key, Clean_*) se ukládají už při nahrání; starší data se dopočítají
+    df_pick = stage_table(df_pick_raw, 'raw_pick').copy()
+    df_pick['Delivery'] = df_pick['Delivery'].astype(str).str.strip().replace(to_replace=['nan', 'NaN', 'None', 'none', ''], value=np.nan)
+    df_pick['Material'] = df_pick['Material'].astype(str).str.strip().replace(to_replace=['nan', 'NaN', 'None', 'none', ''], value=np.nan)
+    df_pick = df_pick.dropna(subset=['Delivery', 'Material']).copy()
+    
+    num_removed_admins = 0
+    if 'User' in df_pick.columns:
+        mask_admins = df_pick['User'].isin(['UIDJ5089', 'UIH25501'])
+        num_removed_admins = int(mask_admins.sum())
+        df_pick = df_pick[~mask_admins].copy()
+
+    df_pick['Source Storage Bin'] = df_pick.get('Source Storage Bin', df_pick.get('Storage Bin', '')).fillna('').astype(str)
+    df_pick['Removal of total SU'] = df_pick.get('Removal of total SU', '').fillna('').astype(str).str.strip().str.upper()
+    df_pick['Date'] = pd.to_datetime(df_pick['Date'], errors='coerce')
+    
+    queue_count_col = 'Delivery'
+    df_pick['Queue'] = 'N/A'
+    if df_queue_raw is not None and not df_queue_raw.empty:
+        if 'Transfer Order Number' in df_pick.columns and 'Transfer Order Number' in df_queue_raw.columns:
+            q_map = df_queue_raw.dropna(subset=['Transfer Order Number', 'Queue']).drop_duplicates('Transfer Order Number').set_index('Transfer Order Number')['Queue'].to_dict()
+            df_pick['Queue'] = df_pick['Transfer Order Number'].map(q_map).fillna('N/A')
+            queue_count_col = 'Transfer Order Number'
+            for d_col in ['Confirmation Date', 'Creation Date']:
+                if d_col in df_queue_raw.columns:
+                    d_map = df_queue_raw.dropna(subset=['Transfer Order Number', d_col]).drop_duplicates('Transfer Order Number').set_index('Transfer Order Number')[d_col].to_dict()
+                    to_dates = df_pick['Transfer Order Number'].map(d_map)
+                    df_pick['Date'] = df_pick['Date'].fillna(pd.to_datetime(to_dates, errors='coerce'))
+                    break
+        elif 'SD Document' in df_queue_raw.columns:
+            q_map = df_queue_raw.dropna(subset=['SD Document', 'Queue']).drop_duplicates('SD Document').set_index('SD Document')['Queue'].to_dict()
+            df_pick['Queue'] = df_pick['Delivery'].map(q_map).fillna('N/A')
+        df_pick = df_pick[df_pick['Queue'].astype(str).str.upper() != 'CLEARANCE'].copy()
+
+    manual_boxes = {}
+    if df_manual_raw is not None and not df_manual_raw.empty:
+        c_mat, c_pkg = df_manual_raw.columns[0], df_manual_raw.columns[1]
+        for _, row in df_manual_raw.iterrows():
+            raw_mat = str(row[c_mat])
+            if raw_mat.upper() in ['NAN', 'NONE', '']: continue
+            mat_key = get_match_key(raw_mat)
+            pkg = str(row[c_pkg])
+            nums = re.findall(r'\bK-(\d+)ks?\b|(\d+)\s*ks\b|balen[íi]\s+po\s+(\d+)|krabice\s+(?:po\s+)?(\d+)|(?:role|pytl[íi]k|pytel)[^\d]*(\d+)', pkg, flags=re.IGNORECASE)
+            ext = sorted(list(set([int(g) for m in nums for g in m if g])), reverse=True)
+            if not ext and re.search(r'po\s*kusech', pkg, re.IGNORECASE): ext = [1]
+            if ext: manual_boxes[mat_key] = ext
+
+    box_dict, weight_dict, dim_dict = {}, {}, {}
+    if df_marm_raw is not None and not df_marm_raw.empty:
+        df_marm = stage_table(df_marm_raw, 'raw_marm')
+        df_boxes = df_marm[df_marm['Alternative Unit of Measure'].isin(BOX_UNITS)]
+        box_dict = df_boxes.groupby('Match_Key')['Numerator_Num'].apply(lambda g: sorted([int(x) for x in g if x > 1], reverse=True)).to_dict()
+
+        df_st = df_marm[df_marm['Alternative Unit of Measure'].isin(['ST', 'PCE', 'KS', 'EA', 'PC'])]
+        weight_dict = df_st.groupby('Match_Key')['Weight_KG'].first().to_dict()
+        dim_dict = df_st.set_index('Match_Key')[['L_CM', 'W_CM', 'H_CM']].max(axis=1).to_dict()
+
+    df_pick['Box_Sizes_List'] = df_pick['Match_Key'].apply(lambda m: manual_boxes.get(m, box_dict.get(m, [])))
+    df_pick['Piece_Weight_KG'] = df_pick['Match_Key'].map(weight_dict).fillna(0.0)
+    df_pick['Piece_Max_Dim_CM'] = df_pick['Match_Key'].map(dim_dict).fillna(0.0)
+
+    # Rozklad na celé krabice nezávisí na limitech z postranního panelu -> počítáme jednou
+    dec = decompose_box_moves(df_pick['Qty'].values, df_pick['Queue'].values, df_pick['Removal of total SU'].values, df_pick['Box_Sizes_List'].values)
+    df_pick['Box_Moves'], df_pick['Loose_Rest'] = dec['box_moves'], dec['rest']
+    df_pick['Has_Box_Data'], df_pick['Is_Full_SU'] = dec['has_boxes'], dec['is_full']
+
+    return {
+        'df_pick': df_pick, 'queue_count_col': queue_count_col,
+        'num_removed_admins': num_removed_admins, 'manual_boxes': manual_boxes,
+        'weight_dict': weight_dict, 'dim_dict': dim_dict, 'box_dict': box_dict
+    }
+
+def prepare_hu(columns=None):
+    """VEKP + VEPO pro centrální mozek vollpalet a strom HU pro fakturaci a audit (jednou na verzi VEKP)."""
+    columns = columns or {}
+    df_vekp_raw = stage_table(load_from_db('raw_vekp', columns=columns.get('raw_vekp')), 'raw_vekp')
+    df_vepo_raw = stage_table(load_from_db('raw_vepo', columns=columns.get('raw_vepo')), 'raw_vepo')
+    return {'df_vekp': df_vekp_raw, 'df_vepo': df_vepo_raw, 'hu_index': build_hu_index(df_vekp_raw)}
+
+def prepare_oe():
+    """OE-Times sečtené po zakázkách (Process_Time_Min); None = tabulka chybí nebo nemá zakázku a čas."""
+    df_oe = load_from_db('raw_oe')
+    if df_oe is not None and not df_oe.empty:
+        cols_up = [str(c).upper() for c in df_oe.columns]
+        rename_map = {}
+        has_dn = False
+        has_time = False
+        
+        for orig, up in zip(df_oe.columns, cols_up):
+            if not has_dn and ('DN NUMBER' in up or 'DELIVERY' in up or 'DODAVKA' in up): 
+                rename_map[orig] = 'DN NUMBER (SAP)'
+                has_dn = True
+            elif not has_time and ('PROCESS' in up or 'CAS' in up or 'ČAS' in up or 'TIME' in up): 
+                rename_map[orig] = 'Process Time'
+                has_time = True
+                
+        df_oe.rename(columns=rename_map, inplace=True)
+        df_oe = df_oe.loc[:, ~df_oe.columns.duplicated()].copy()
+        
+        if 'DN NUMBER (SAP)' in df_oe.columns and 'Process Time' in df_oe.columns:
+            df_oe['Delivery'] = df_oe['DN NUMBER (SAP)'].astype(str).str.strip()
+            df_oe['Process_Time_Min'] = df_oe['Process Time'].apply(parse_packing_time)
+            
+            agg_dict = {'Process_Time_Min': 'sum'}
+            for col in ['CUSTOMER', 'Material', 'Scanning serial numbers', 'Reprinting labels ', 'Difficult KLTs', 'Shift', 'Number of item types']:
+                if col in df_oe.columns: agg_dict[col] = 'first'
+                
+            for col in ['KLT', 'Palety', 'Cartons']:
+                if col in df_oe.columns: 
+                    agg_dict[col] = lambda x, c=col: '; '.join(x.dropna().astype(str))
+                
+            df_oe = df_oe.groupby('Delivery').agg(agg_dict).reset_index()
+        else:
+            df_oe = None
+    return df_oe
+
+def prepare_cats():
+    """Kategorie zakázek (Lieferung -> Category_Full), jeden řádek na zakázku."""
+    df_cats = load_from_db('raw_cats')
+    if df_cats is not None and not df_cats.empty:
+        c_del_cats = next((c for c in df_cats.columns if str(c).strip().lower() in ['lieferung', 'delivery', 'zakázka']), df_cats.columns[0])
+        df_cats['Lieferung'] = df_cats[c_del_cats].astype(str).str.strip()
+        if 'Kategorie' in df_cats.columns and 'Art' in df_cats.columns: 
+            df_cats['Category_Full'] = df_cats['Kategorie'].astype(str).str.strip() + " " + df_cats['Art'].astype(str).str.strip()
+        df_cats = df_cats.drop_duplicates('Lieferung')
+    return df_cats
+
+class LazyDataset:
+    """Připravená data po částech: položka se načte až při prvním přístupu (ds['df_vekp']) a v instanci se pamatuje.
+
+    loaders mapuje položku na funkci loader(ds) -> dict položek (jeden loader může naplnit víc položek najednou,
+    např. VEKP, VEPO a strom HU); známé položky (Pick) se předají rovnou.
+    """
+    def __init__(self, loaders, **items):
+        self._loaders, self._items = loaders, items
+
+    def __getitem__(self, name):
+        if name not in self._items: self._items.update(self._loaders[name](self))
+        return self._items[name]
+
+    def __contains__(self, name):
+        return name in self._items or name in self._loaders
+
+    def loaded(self):
+        """Už načtené položky (kontrola, co si záložka opravdu stáhla)."""
+        return sorted(self._items)
+
+def load_aus(consumer):
+    """Listy Auswertungu, které konzument deklaroval v AUS_REGISTRY ({list: DataFrame, nebo None když v DB chybí})."""
+    return {sheet: load_from_db(f'aus_{sheet.lower()}') for sheet in AUS_REGISTRY[consumer]}
+
+def load_billing_aux():
+    """Pomocné tabulky fakturace: LIKP (přepravní místo), SDSHP_AM2 (KEP dopravci) a VBPA (partneři zakázky)."""
+    aus = load_aus('billing')
+    return {'df_likp': load_from_db('raw_likp'), 'df_kep': aus['SDSHP_AM2'], 'df_vbpa': aus['VBPA']}
+
+def pick_months(dates, unknown_month='Neznámé'):
+    """Měsíc (YYYY-MM) každého pick řádku; řádky bez data dostanou unknown_month."""
+    return dates.dt.to_period('M').astype(str).replace('NaT', unknown_month)
+
+def add_moves(df_pick, limit_vahy, limit_rozmeru, kusy_na_hmat):
+    """Doplní pohyby pro dané ergonomické limity (Pohyby_Rukou / _Exact / _Loose_Miss) z předpočítaného rozkladu na krabice."""
+    tt, te, tm = apply_move_limits(df_pick['Box_Moves'].values, df_pick['Loose_Rest'].values, df_pick['Has_Box_Data'].values, df_pick['Is_Full_SU'].values, df_pick['Piece_Weight_KG'].values, df_pick['Piece_Max_Dim_CM'].values, limit_vahy, limit_rozmeru, kusy_na_hmat)
+    df_pick['Pohyby_Rukou'], df_pick['Pohyby_Exact'], df_pick['Pohyby_Loose_Miss'] = tt, te, tm
+    return df_pick
+
+def _group_sets(keys, values):
+    """frozenset hodnot pro každý klíč - unikátní páry seřazené podle klíče a rozdělené na úseky (bez apply po skupinách)."""
+    pairs = pd.DataFrame({'k': keys.values, 'v': values.values}).drop_duplicates().sort_values('k', kind='stable')
+    k = pairs['k'].to_numpy(dtype=object)
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    return pd.Series([frozenset(c) for c in np.split(pairs['v'].to_numpy(dtype=object), starts[1:])], index=k[starts], dtype=object)
+
+def delivery_facts(df_pick, queue_count_col='Delivery'):
+    """Tabulka faktů po zakázkách (Clean_Del) jen z Picku - sestaví se jednou na verzi dat a čtou z ní záložky.
+
+    Měsíc (první řádek), fronty a materiály (frozenset), počet TO, lokací a řádků, pohyby, kusy, převažující materiál.
+    Sloupce z VEKP/VEPO a pomocných tabulek fakturace doplní delivery_hu_facts.
+    """
+    g = df_pick.groupby('Clean_Del')
+    facts = g.agg(Celkove_Kusy=('Qty', 'sum'), Pocet_Radku=('Material', 'size'), Pocet_TO=(queue_count_col, 'nunique'))
+    if 'Month' in df_pick.columns: facts['Month'] = g['Month'].first()
+    if 'Source Storage Bin' in df_pick.columns: facts['Pocet_Lokaci'] = g['Source Storage Bin'].nunique()
+    if 'Pohyby_Rukou' in df_pick.columns: facts['Pohyby'] = g['Pohyby_Rukou'].sum()
+    facts['Fronty'] = _group_sets(df_pick['Clean_Del'], df_pick['Queue'].astype(str).str.upper())
+    facts['Materialy'] = _group_sets(df_pick['Clean_Del'], df_pick['Material'])
+    # Nejčastější materiál bez lambdy po skupinách; při shodě vyhrává dřív viděný (jako value_counts)
+    pairs = pd.DataFrame({'Clean_Del': df_pick['Clean_Del'].values, 'Material': df_pick['Material'].values, 'pos': np.arange(len(df_pick))})
+    pairs = pairs.groupby(['Clean_Del', 'Material'], sort=False)['pos'].agg(['size', 'min']).reset_index()
+    facts['Skladovy_Material'] = pairs.sort_values(['size', 'min'], ascending=[False, True]).drop_duplicates('Clean_Del').set_index('Clean_Del')['Material']
+    return facts.reset_index()
+
+def delivery_hu_facts(facts, df_pick, voll_set, base_map):
+    """K faktům z delivery_facts doplní příznak vollpalety (některý řádek zakázky) a základní kategorii (N/E/O/OE, jinak 'N')."""
+    voll = pick_vollpalettes(df_pick, voll_set).groupby(df_pick['Clean_Del'].values).any()
+    return facts.assign(Vollpaleta=facts['Clean_Del'].map(voll).fillna(False).astype(bool),
+                        Zakladni_Kategorie=facts['Clean_Del'].map(base_map).fillna('N'))
@@ -1,27 +1,441 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-from sqlalchemy import create_engine
+import io
+import os
+import contextlib
+import functools
+import json
+import hashlib
+import itertools
+import logging
+import pickle
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import create_engine, inspect, text, select, func, or_, cast, String, MetaData, Table
+from sqlalchemy.exc import NoSuchTableError
 
-@st.cache_resource
+# Přirozené klíče pro inkrementální nahrávání (každá skupina = kandidáti na jeden klíčový sloupec, jen přesné názvy)
+UPSERT_KEYS = {
+    'raw_pick': [['Transfer Order Number'], ['Transfer Order Item', 'TO Item']],
+    'raw_vekp': [['Internal HU', 'HU-Nummer intern']],
+    'raw_vepo': [['Internal HU', 'HU-Nummer intern']],
+}
+
+LOAD_LOG_TABLE = 'load_log'
+VERSIONS_TABLE = 'table_versions'
+
+# Lokální Parquet cache před Supabase (restart aplikace pak nestahuje nezměněné tabulky znovu); prázdná hodnota ji vypne
+CACHE_DIR = os.environ.get('DB_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.db_cache'))
+ARTIFACT_DIR = os.path.join(CACHE_DIR, 'artifacts') if CACHE_DIR else ''
+# Formát artefaktů (zvýšit při změně jejich struktury) a verze pandas - pickle jiné verze nemusí jít načíst;
+# změny logiky přípravy nese klíč od volajícího (PREP_VERSION v core.prep)
+ARTIFACT_VERSION = f"a1-pd{pd.__version__}"
+try:
+    import pyarrow.compute as pc
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=None)
 def init_connection():
-    """Vytvoří a bezpečně udrží připojení do Supabase."""
-    db_url = st.secrets["DB_URL"]
+    """Vytvoří a bezpečně udrží připojení do Supabase (DB_URL z prostředí, jinak ze Streamlit secrets)."""
+    db_url = os.environ.get('DB_URL') or st.secrets["DB_URL"]
     # Vytvoření SQLAlchemy motoru pro rychlou komunikaci s Pandas
     engine = create_engine(db_url)
     return engine
 
-def save_to_db(df, table_name):
-    """Nahraje Excel data do databáze (vždy přepíše starou verzi novou)."""
-    engine = init_connection()
-    with st.spinner(f'Ukládám {table_name} do databáze...'):
+def _key_column(columns, candidates):
+    # Jen přesná shoda (bez ohledu na velikost písmen a mezery) - podřetězec by z klíče udělal třeba položku zakázky
+    return next((c for c in columns for cand in candidates if str(c).strip().lower() == cand.lower()), None)
+
+def resolve_upsert_keys(df, table_name):
+    """Najde v DataFrame sloupce přirozeného klíče pro danou tabulku (nebo None)."""
+    groups = UPSERT_KEYS.get(table_name)
+    if not groups: return None
+    keys = [_key_column(df.columns, candidates) for candidates in groups]
+    return None if None in keys else keys
+
+def missing_upsert_keys(df, table_name):
+    """Klíčové sloupce, které v DataFrame chybí (u každého jmenovitě první kandidát)."""
+    return [candidates[0] for candidates in UPSERT_KEYS.get(table_name, []) if _key_column(df.columns, candidates) is None]
+
+def _q(engine, name):
+    return engine.dialect.identifier_preparer.quote(str(name))
+
+def _ensure_columns(conn, table_name, col_types):
+    """Doplní do existující tabulky chybějící sloupce (nové soubory mohou mít jiné exporty ze SAPu)."""
+    existing = {c['name'] for c in inspect(conn).get_columns(table_name)}
+    # Souběžné nahrávání může stejný sloupec (load_log) přidávat ve dvou transakcích - Postgres umí IF NOT EXISTS
+    if_not_exists = 'IF NOT EXISTS ' if conn.engine.dialect.name == 'postgresql' else ''
+    for col, col_type in col_types.items():
+        if col not in existing:
+            conn.execute(text(f"ALTER TABLE {_q(conn.engine, table_name)} ADD COLUMN {if_not_exists}{_q(conn.engine, col)} {col_type}"))
+
+def _append_log(conn, entry):
+    log_df = pd.DataFrame([entry])
+    if inspect(conn).has_table(LOAD_LOG_TABLE):
+        _ensure_columns(conn, LOAD_LOG_TABLE, {c: 'DOUBLE PRECISION' if pd.api.types.is_numeric_dtype(log_df[c]) else 'TEXT' for c in log_df.columns})
+    log_df.to_sql(LOAD_LOG_TABLE, conn, if_exists='append', index=False)
+
+def _table_row_count(conn, table_name):
+    """Počet řádků po nahrání - COUNT(*) ve stejné transakci (součet z logu by se rozešel s tabulkou po první mezeře v logu)."""
+    return float(conn.execute(text(f"SELECT COUNT(*) FROM {_q(conn.engine, table_name)}")).scalar() or 0)
+
+def _ensure_key_index(conn, table_name, key_cols):
+    cols = ", ".join(_q(conn.engine, k) for k in key_cols)
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {_q(conn.engine, 'ix_' + table_name + '_key')} ON {_q(conn.engine, table_name)} ({cols})"))
+
+def _copy_frame(conn, df, table_name, chunk_rows=100_000):
+    """Streamuje DataFrame jako CSV přes COPY ... FROM STDIN (psycopg2), po dávkách kvůli paměti."""
+    cols = ", ".join(_q(conn.engine, c) for c in df.columns)
+    # NULL jako \N, aby prázdný text ('' z očištěných sloupců) zůstal prázdným textem a ne NULL
+    sql = f"COPY {_q(conn.engine, table_name)} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    cur = conn.connection.cursor()
+    try:
+        for start in range(0, len(df), chunk_rows):
+            buf = io.StringIO()
+            df.iloc[start:start + chunk_rows].to_csv(buf, index=False, header=False, na_rep='\\N')
+            buf.seek(0)
+            cur.copy_expert(sql, buf)
+    finally:
+        cur.close()
+
+def _write_frame(conn, df, table_name, if_exists='replace'):
+    """Zapíše DataFrame do tabulky. Na Postgresu (psycopg2) hromadně přes COPY, jinde přes to_sql."""
+    if conn.engine.dialect.name == 'postgresql' and conn.engine.dialect.driver == 'psycopg2':
+        # Schéma tabulky necháme vytvořit Pandas (prázdný rámec), data pak pošleme jedním proudem
+        df.head(0).to_sql(table_name, conn, if_exists=if_exists, index=False)
+        if len(df) > 0: _copy_frame(conn, df, table_name)
+    else:
         # chunksize=1000 rozseká velká data na menší kousky, aby to nespadlo
-        df.to_sql(table_name, engine, if_exists='replace', index=False, chunksize=1000)
+        df.to_sql(table_name, conn, if_exists=if_exists, index=False, chunksize=1000)
 
-def load_from_db(table_name):
-    """Bleskově načte tabulku z databáze do aplikace."""
+def _bump_version(conn, table_name):
+    """Nová verze tabulky - podle ní lokální cache pozná, že musí data stáhnout znovu."""
+    versions = _q(conn.engine, VERSIONS_TABLE)
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {versions} (table_name TEXT PRIMARY KEY, version TEXT, updated_at TEXT)"))
+    conn.execute(text(f"DELETE FROM {versions} WHERE table_name = :t"), {'t': table_name})
+    conn.execute(text(f"INSERT INTO {versions} (table_name, version, updated_at) VALUES (:t, :v, :u)"),
+                 {'t': table_name, 'v': uuid.uuid4().hex, 'u': datetime.now().isoformat(timespec='seconds')})
+
+def _upsert_staged(conn, table_name, stg_name, cols, key_cols, keep_last=False):
+    """Nahradí v cílové tabulce řádky se stejným klíčem jako v pomocné tabulce a přidá nové. Vrací (nahrazeno, vloženo).
+
+    S keep_last se z pomocné tabulky vloží pro každý klíč jen poslední řádek (podle _seq).
+    """
+    engine = conn.engine
+    stg_types = {c['name']: c['type'].compile(dialect=engine.dialect) for c in inspect(conn).get_columns(stg_name) if c['name'] != '_seq'}
+    _ensure_columns(conn, table_name, stg_types)
+
+    tgt, stg = _q(engine, table_name), _q(engine, stg_name)
+    match = lambda a, b: " AND ".join(f"{a}.{_q(engine, k)} = {b}.{_q(engine, k)}" for k in key_cols)
+    replaced = conn.execute(text(f"DELETE FROM {tgt} AS t WHERE EXISTS (SELECT 1 FROM {stg} AS s WHERE {match('s', 't')})")).rowcount
+
+    latest = ''
+    if keep_last:
+        _ensure_key_index(conn, stg_name, key_cols)
+        latest = f" WHERE NOT EXISTS (SELECT 1 FROM {stg} AS d WHERE {match('d', 's')} AND d._seq > s._seq)"
+    col_sql = ", ".join(_q(engine, c) for c in cols)
+    inserted = conn.execute(text(f"INSERT INTO {tgt} ({col_sql}) SELECT {', '.join(f's.{_q(engine, c)}' for c in cols)} FROM {stg} AS s{latest}")).rowcount
+    conn.execute(text(f"DROP TABLE {stg}"))
+    return max(int(replaced or 0), 0), int(inserted)
+
+def save_to_db(df, table_name, incremental=False):
+    """Nahraje Excel data do databáze.
+
+    Výchozí režim přepíše starou verzi novou. S incremental=True se u tabulek s přirozeným klíčem
+    (raw_pick, raw_vekp, raw_vepo) přepíší jen řádky se shodným klíčem a historie zůstává v DB. Chybí-li v exportu
+    klíčový sloupec, inkrementální nahrání skončí ValueError (celé přepsání by historii smazalo); jen do ještě
+    neexistující tabulky se zapíše celý export.
+    """
+    return save_chunks_to_db([df], table_name, incremental)
+
+def save_chunks_to_db(chunks, table_name, incremental=False, log_extra=None):
+    """Jako save_to_db, ale data přicházejí po dávkách (iterátor DataFramů) - v paměti je vždy jen jedna dávka.
+
+    Vše proběhne v jedné transakci, ostatní uživatelé nevidí rozpracovanou tabulku. Do záznamu v load_log
+    se přidá čas zápisu (write_s, bez čekání na dávky) a log_extra - slovník, nebo funkce(write_s) -> slovník
+    volaná až po zápisu poslední dávky. Vrací zapsaný záznam logu.
+    """
     engine = init_connection()
+    t_start, t_wait = time.perf_counter(), 0.0
+    # Spinner jen ve vlákně skriptu běžící aplikace (ne v dávce python -m core ani v souběžném nahrávání)
+    in_script = st.runtime.exists() and get_script_run_ctx(suppress_warning=True) is not None
+    with st.spinner(f'Ukládám {table_name} do databáze...') if in_script else contextlib.nullcontext():
+        with engine.begin() as conn:
+            key_cols, mode, cols, rows_in = None, 'replace', [], 0
+            chunks = iter(chunks)
+            for i in itertools.count():
+                t0 = time.perf_counter()
+                df = next(chunks, None)
+                t_wait += time.perf_counter() - t0
+                if df is None: break
+                if i == 0:
+                    key_cols = resolve_upsert_keys(df, table_name) if incremental else None
+                    exists = inspect(conn).has_table(table_name)
+                    if incremental and key_cols is None and exists and table_name in UPSERT_KEYS:
+                        raise ValueError(f"{table_name}: v exportu chybí klíčové sloupce {missing_upsert_keys(df, table_name)} - "
+                                         "inkrementální nahrání by přepsalo celou historii, soubor nebyl uložen")
+                    mode = 'upsert' if key_cols and exists else 'replace'
+                    cols = list(df.columns)
+                if mode == 'upsert':
+                    # Dávky jdou do pomocné tabulky; u Picku platí pro duplicitní klíč poslední řádek souboru
+                    if table_name == 'raw_pick':
+                        df = df.drop_duplicates(subset=key_cols, keep='last')
+                        df = df.assign(_seq=range(rows_in, rows_in + len(df)))
+                    _write_frame(conn, df, f"_stg_{table_name}", if_exists='replace' if i == 0 else 'append')
+                else:
+                    _write_frame(conn, df, table_name, if_exists='replace' if i == 0 else 'append')
+                rows_in += len(df)
+
+            replaced = 0
+            if mode == 'upsert':
+                replaced, rows_in = _upsert_staged(conn, table_name, f"_stg_{table_name}", cols, key_cols, keep_last=table_name == 'raw_pick')
+            if key_cols: _ensure_key_index(conn, table_name, key_cols)
+            _bump_version(conn, table_name)
+
+            rows_total = _table_row_count(conn, table_name) if mode == 'upsert' else float(rows_in)
+            write_s = round(time.perf_counter() - t_start - t_wait, 3)
+            entry = {
+                'table_name': table_name, 'mode': mode, 'loaded_at': datetime.now().isoformat(timespec='seconds'),
+                'rows_in': float(rows_in), 'rows_replaced': float(replaced), 'rows_total': rows_total,
+                'key_cols': ", ".join(map(str, key_cols)) if key_cols else '', 'write_s': write_s,
+                **(log_extra(write_s) if callable(log_extra) else log_extra or {})
+            }
+            _append_log(conn, entry)
+    return entry
+
+def load_log_history(limit=50):
+    """Posledních N záznamů z load_log (nejnovější první) - historie nahrávání včetně časů fází."""
+    engine = init_connection()
+    if not inspect(engine).has_table(LOAD_LOG_TABLE): return pd.DataFrame()
+    with engine.connect() as conn:
+        return pd.read_sql(text(f"SELECT * FROM {LOAD_LOG_TABLE} ORDER BY loaded_at DESC LIMIT :n"), conn, params={'n': int(limit)})
+
+def resolve_columns(all_cols, spec):
+    """Vybere sloupce podle specifikace (pořadí zůstává jako v tabulce, kvůli pozičnímu hledání).
+
+    Položka spec: int = pozice sloupce, '=Název' = přesná shoda, jinak podřetězec (vše bez ohledu na velikost písmen).
+    """
+    picked = set()
+    for item in spec:
+        if isinstance(item, int):
+            if item < len(all_cols): picked.add(all_cols[item])
+        elif item.startswith('='):
+            picked.update(c for c in all_cols if str(c).lower() == item[1:].lower())
+        else:
+            picked.update(c for c in all_cols if item.lower() in str(c).lower())
+    return [c for c in all_cols if c in picked]
+
+def merge_column_specs(*specs):
+    """Sloučí deklarace sloupců jednotlivých konzumentů ({tabulka: [spec...]}) do jedné na tabulku."""
+    merged = {}
+    for spec in specs:
+        for table_name, items in spec.items():
+            merged.setdefault(table_name, [])
+            merged[table_name] += [i for i in items if i not in merged[table_name]]
+    return merged
+
+def _predicate(col, op, value):
+    if op.endswith('_ci'):
+        # Porovnání bez ohledu na velikost písmen a okolní mezery (materiály z ručního zadání)
+        col, op, value = func.upper(func.trim(col)), op[:-3], [str(v).strip().upper() for v in value]
+    if op == '=': return col == value
+    if op == '!=': return col != value
+    if op == '<': return col < value
+    if op == '<=': return col <= value
+    if op == '>': return col > value
+    if op == '>=': return col >= value
+    if op == 'in': return col.in_(list(value))
+    if op == 'not in': return col.not_in(list(value))
+    if op == 'between': return (col >= value[0]) & (col < value[1])
+    if op == 'is null': return col.is_(None)
+    raise ValueError(f"Neznámý operátor: {op}")
+
+def _arrow_predicate(name, op, value):
+    """Totéž co _predicate, ale jako filtr pyarrow při čtení Parquetu (řádky se filtrují po dávkách, ne v celém DataFrame)."""
+    col = pc.field(name)
+    if op == 'is null': return col.is_null()
+    valid = col.is_valid()
+    if op.endswith('_ci'):
+        col, op, value = pc.utf8_upper(pc.utf8_trim_whitespace(col)), op[:-3], [str(v).strip().upper() for v in value]
+    if op == '=': m = col == value
+    elif op == '!=': m = col != value
+    elif op == '<': m = col < value
+    elif op == '<=': m = col <= value
+    elif op == '>': m = col > value
+    elif op == '>=': m = col >= value
+    elif op == 'in': m = col.isin(list(value))
+    elif op == 'not in': m = ~col.isin(list(value))
+    elif op == 'between': m = (col >= value[0]) & (col < value[1])
+    else: raise ValueError(f"Neznámý operátor: {op}")
+    return valid & m # NULL neprojde (Kleene &), stejně jako v SQL
+
+def table_versions(engine, table_names):
+    """Verze tabulek z table_versions (jedním dotazem); u tabulek nahraných před jejím zavedením počet řádků, chybějící = None."""
+    existing = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        known = dict(conn.execute(text(f"SELECT table_name, version FROM {_q(engine, VERSIONS_TABLE)}")).all()) if VERSIONS_TABLE in existing else {}
+        res = {}
+        for t in table_names:
+            if t not in existing: res[t] = None
+            elif known.get(t): res[t] = known[t]
+            else: res[t] = f"rows:{conn.execute(text(f'SELECT COUNT(*) FROM {_q(engine, t)}')).scalar()}"
+    return res
+
+def table_version(engine, table_name):
+    return table_versions(engine, [table_name])[table_name]
+
+def source_fingerprint(table_names, *params):
+    """Otisk verzí zdrojových tabulek a parametrů výpočtu - klíč pro předpočítané výsledky."""
+    versions = table_versions(init_connection(), table_names)
+    parts = [f"{t}={versions[t]}" for t in table_names] + [repr(p) for p in params]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+def _artifact_path(name, key):
+    return os.path.join(ARTIFACT_DIR, f"{name}__{ARTIFACT_VERSION}__{key}.pkl")
+
+def load_artifact(name, key):
+    """Načte předpočítaný výsledek z lokálního disku (None, pokud pro daný klíč neexistuje nebo je poškozený)."""
+    if not ARTIFACT_DIR: return None
+    path = _artifact_path(name, key)
     try:
-        return pd.read_sql_table(table_name, engine)
-    except ValueError:
-        # Pokud tabulka ještě v databázi neexistuje (např. při prvním spuštění)
+        with open(path, 'rb') as f: obj = pickle.load(f)
+        os.utime(path) # naposledy použité artefakty přežijí úklid
+        return obj
+    except FileNotFoundError:
+        return None
+    except (pickle.UnpicklingError, EOFError):
+        logger.warning("Poškozený artefakt %s, počítá se znovu", path)
         return None
+    except Exception:
+        logger.exception("Artefakt %s nelze načíst, počítá se znovu", path)
+        return None
+
+def save_artifact(name, key, obj, keep=10):
+    """Uloží předpočítaný výsledek na disk a nechá jen `keep` naposledy použitých artefaktů daného jména."""
+    if not ARTIFACT_DIR: return
+    path = _artifact_path(name, key)
+    try:
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        with open(path + '.tmp', 'wb') as f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        # Úklid i artefaktů starších verzí (stejná předpona jména)
+        old = sorted((os.path.join(ARTIFACT_DIR, f) for f in os.listdir(ARTIFACT_DIR) if f.startswith(f"{name}__") and f.endswith('.pkl')), key=os.path.getmtime, reverse=True)
+        for f in old[keep:]: os.remove(f)
+    except OSError as e:
+        logger.warning("Artefakt %s se nepodařilo uložit: %s", path, e) # Artefakt je jen zrychlení startu
+    except (pickle.PicklingError, TypeError, AttributeError):
+        logger.exception("Artefakt %s nelze serializovat", path)
+        with contextlib.suppress(OSError): os.remove(path + '.tmp')
+
+def _cache_base(tbl, col_names):
+    key = 'all' if col_names is None else hashlib.md5("\x1f".join(col_names).encode()).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"{tbl.name}__{key}")
+
+def _cache_is_current(base, version):
+    try:
+        with open(base + '.json') as f: return json.load(f).get('version') == version and os.path.exists(base + '.parquet')
+    except (OSError, ValueError):
+        return False
+
+def _cached_frame(engine, tbl, col_names):
+    """Vrátí (projektovanou) tabulku z lokálního Parquetu; pokud chybí nebo je zastaralý, stáhne ji a uloží."""
+    base = _cache_base(tbl, col_names)
+    version = table_version(engine, tbl.name)
+    if _cache_is_current(base, version): return pd.read_parquet(base + '.parquet')
+
+    cols = [tbl.c[c] for c in col_names] if col_names is not None else [tbl]
+    with engine.connect() as conn:
+        df = pd.read_sql(select(*cols), conn)
+    try:
+        # Zápis přes dočasný soubor, ať souběžné načtení nikdy nepřečte rozepsaný Parquet
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(base + '.parquet.tmp', index=False)
+        os.replace(base + '.parquet.tmp', base + '.parquet')
+        with open(base + '.json', 'w') as f:
+            json.dump({'version': version, 'rows': len(df), 'cached_at': datetime.now().isoformat(timespec='seconds')}, f)
+    except Exception:
+        pass # Cache je jen zrychlení - když se nepovede zapsat, vrátíme data přímo z DB
+    return df
+
+def query_table(table_name, columns=None, where=None, distinct=False):
+    """Načte tabulku s projekcí sloupců (spec viz resolve_columns) a filtry (v SQL, nebo nad lokální cache).
+
+    where je seznam podmínek (sloupec, operátor, hodnota[, i_null]) spojených přes AND.
+    Operátory: = != < <= > >= in, not in, in_ci, not in_ci, between (od včetně, do vyjma), is null.
+    S i_null=True projdou i řádky s NULL ve sloupci. Podmínky na neexistující sloupce se přeskočí
+    (dofiltruje se v Pandas). Vrací None, pokud tabulka neexistuje.
+
+    Je-li k dispozici pyarrow, čte se z lokální Parquet cache (platné verze). S filtry se platná cache čte přes filtr
+    pyarrow (do paměti jdou jen vyhovující řádky); chybí-li, jdou filtry do SQL a cache se naplní až dotazem bez filtrů.
+    Prázdné DB_CACHE_DIR cache vypne.
+    """
+    engine = init_connection()
+    try:
+        tbl = Table(table_name, MetaData(), autoload_with=engine)
+    except NoSuchTableError:
+        return None
+    col_names = resolve_columns(list(tbl.c.keys()), columns) if columns else None
+    if col_names == []: return pd.DataFrame()
+    conds = [c for c in (where or []) if c[0] in tbl.c]
+
+    if HAS_PARQUET and CACHE_DIR:
+        # Sloupce z podmínek musí být v cache, i když je volající nechce vrátit
+        cache_cols = col_names if col_names is None else [c for c in tbl.c.keys() if c in col_names or any(c == cond[0] for cond in conds)]
+        df = None
+        if not conds:
+            df = _cached_frame(engine, tbl, cache_cols)
+        elif _cache_is_current(_cache_base(tbl, cache_cols), table_version(engine, tbl.name)):
+            expr = None
+            for cond in conds:
+                m = _arrow_predicate(cond[0], cond[1], cond[2])
+                if len(cond) > 3 and cond[3]: m = m | pc.field(cond[0]).is_null()
+                expr = m if expr is None else expr & m
+            df = pd.read_parquet(_cache_base(tbl, cache_cols) + '.parquet', columns=col_names, filters=expr)
+        if df is not None:
+            return df.drop_duplicates(ignore_index=True) if distinct else df
+
+    cols = [tbl.c[c] for c in col_names] if col_names is not None else [tbl]
+    stmt = select(*cols).distinct() if distinct else select(*cols)
+    for cond in conds:
+        clause = _predicate(tbl.c[cond[0]], cond[1], cond[2])
+        stmt = stmt.where(or_(clause, tbl.c[cond[0]].is_(None)) if len(cond) > 3 and cond[3] else clause)
+    with engine.connect() as conn:
+        return pd.read_sql(stmt, conn)
+
+def load_from_db(table_name, columns=None):
+    """Bleskově načte tabulku z databáze do aplikace (s columns jen deklarované sloupce)."""
+    # Pokud tabulka ještě v databázi neexistuje (např. při prvním spuštění), vrací None
+    return query_table(table_name, columns=columns)
+
+def projection_report(column_specs, chunk_rows=50_000):
+    """Kolik dat projekce ušetří: objem přenosu (součet délek hodnot v SQL) a paměť DataFrame všech vs. vybraných sloupců.
+
+    Paměť se měří po dávkách, aby se celá tabulka nemusela naráz vejít do RAM.
+    """
+    engine = init_connection()
+    rows = []
+    for table_name, spec in column_specs.items():
+        try:
+            tbl = Table(table_name, MetaData(), autoload_with=engine)
+        except NoSuchTableError:
+            continue
+        all_cols = list(tbl.c.keys())
+        sel_cols = resolve_columns(all_cols, spec)
+        with engine.connect() as conn:
+            sizes = conn.execute(select(*[func.coalesce(func.sum(func.length(cast(tbl.c[c], String))), 0) for c in all_cols])).one()
+            mem = dict.fromkeys(all_cols, 0)
+            for chunk in pd.read_sql(select(tbl), conn, chunksize=chunk_rows):
+                for c, b in chunk.memory_usage(index=False, deep=True).items(): mem[c] += int(b)
+        transfer = dict(zip(all_cols, map(int, sizes)))
+        rows.append({
+            'Tabulka': table_name, 'Sloupců': len(all_cols), 'Sloupců (projekce)': len(sel_cols),
+            'Přenos MB': sum(transfer.values()) / 1e6, 'Přenos MB (projekce)': sum(transfer[c] for c in sel_cols) / 1e6,
+            'Paměť MB': sum(mem.values()) / 1e6, 'Paměť MB (projekce)': sum(mem[c] for c in sel_cols) / 1e6,
+        })
+    return pd.DataFrame(rows)
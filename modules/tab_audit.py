@@ -3,14 +3,23 @@ import pandas as pd
 import numpy as np
 import io
 import re
-from modules.utils import t, get_match_key, safe_del, safe_hu
+from modules.utils import t, get_match_key, safe_del, safe_hu, build_hu_index, hu_root
+from core.prep import delivery_facts
+
+# Sloupce pro audit, rentgen zakázky a analýzu obalů (projekce při načítání z DB)
+AUDIT_COLUMNS = {
+    'raw_pick': ['=Delivery', '=Material', 'Act.qty (dest)', 'Removal of total SU', 'Transfer Order'],
+    'raw_vekp': [0, 1, 'Internal HU', 'HU-Nummer intern', 'Handling Unit', 'delivery', 'lieferung', 'dodávka', 'zakázka',
+                 'higher-level', 'übergeordn', 'superordinate', 'Packaging materials', 'Packmittel', 'obal', 'manipul', 'Total Weight', 'Clean_'],
+    'raw_vepo': [0, 'Internal HU', 'HU-Nummer intern', 'Material', 'Clean_'],
+}
 
 try:
     fast_render = st.fragment
 except AttributeError:
     fast_render = lambda f: f
 
-def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df, manual_boxes=None, weight_dict=None, dim_dict=None, box_dict=None, limit_vahy=2.0, limit_rozmeru=15.0, kusy_na_hmat=1):
+def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df, manual_boxes=None, weight_dict=None, dim_dict=None, box_dict=None, limit_vahy=2.0, limit_rozmeru=15.0, kusy_na_hmat=1, hu_index=None, facts=None):
     if manual_boxes is None: manual_boxes = {}
     if weight_dict is None: weight_dict = {}
     if dim_dict is None: dim_dict = {}
@@ -118,9 +127,8 @@ def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df,
                             if df_vekp is not None and not df_vekp.empty:
                                 c_gen = next((c for c in df_vekp.columns if "Generated delivery" in str(c) or "generierte" in str(c).lower()), None)
                                 if c_gen:
-                                    df_vekp['Temp_Del'] = df_vekp[c_gen].apply(safe_del)
-                                    vekp_det = df_vekp[df_vekp['Temp_Del'].isin(mismatch_dels)].copy()
-                                    vekp_det.drop(columns=['Temp_Del'], errors='ignore').to_excel(writer, index=False, sheet_name='5_VEKP_Raw')
+                                    vekp_det = df_vekp[df_vekp['Clean_Del'].isin(mismatch_dels)].copy() # Clean_Del je ze stagingu
+                                    vekp_det.to_excel(writer, index=False, sheet_name='5_VEKP_Raw')
                                     
                                     if df_vepo is not None and not df_vepo.empty:
                                         err_hus = set(vekp_det.iloc[:,0].apply(safe_hu))
@@ -129,9 +137,8 @@ def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df,
                                         vepo_det.to_excel(writer, index=False, sheet_name='6_VEPO_Raw')
 
                             if df_pick is not None and not df_pick.empty:
-                                df_pick['Temp_Del'] = df_pick['Delivery'].apply(safe_del)
-                                pick_det = df_pick[df_pick['Temp_Del'].isin(mismatch_dels)].copy()
-                                pick_det.drop(columns=['Temp_Del'], errors='ignore').to_excel(writer, index=False, sheet_name='7_Pick_Raw')
+                                pick_det = df_pick[df_pick['Clean_Del'].isin(mismatch_dels)].copy()
+                                pick_det.to_excel(writer, index=False, sheet_name='7_Pick_Raw')
 
                         st.download_button(
                             label="📥 Stáhnout kompletní datový rentgen (7 záložek) pro analýzu chyb (Excel)",
@@ -210,15 +217,16 @@ def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df,
     
     @fast_render
     def render_audit_interactive():
-        df_pick['Clean_Del'] = df_pick['Delivery'].apply(safe_del)
-        avail_dels = sorted(df_pick['Clean_Del'].dropna().unique())
+        # Zakázky, počet TO a pohyby z tabulky faktů (app.fetch_delivery_facts); Clean_Del v Picku i VEKP je ze stagingu
+        del_facts = (facts if facts is not None else delivery_facts(df_pick, queue_count_col)).set_index('Clean_Del')
+        avail_dels = sorted(del_facts.index)
         sel_del = st.selectbox("Vyberte Delivery pro kompletní rentgen:", options=[""] + avail_dels, key="audit_rentgen_selection")
         
         if sel_del:
             st.markdown("#### 1️⃣ Fáze: Pickování ve skladu")
             pick_del = df_pick[df_pick['Clean_Del'] == sel_del].copy()
-            to_count = pick_del[queue_count_col].nunique()
-            moves_count = pick_del['Pohyby_Rukou'].sum()
+            to_count = int(del_facts.at[sel_del, 'Pocet_TO'])
+            moves_count = del_facts.at[sel_del, 'Pohyby']
             
             c1, c2 = st.columns(2)
             c1.metric("Počet úkolů (TO)", to_count)
@@ -227,7 +235,6 @@ def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df,
 
             st.markdown("#### 2️⃣ Fáze: Systémové Obaly (VEKP / VEPO)")
             if df_vekp is not None and not df_vekp.empty:
-                df_vekp['Clean_Del'] = df_vekp['Generated delivery'].apply(safe_del)
                 vekp_del = df_vekp[df_vekp['Clean_Del'] == sel_del].copy()
                 
                 sel_del_kat = "Neznámá"
@@ -249,14 +256,8 @@ def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df,
                     else: 
                         vekp_del['Clean_Parent'] = ""
                         
-                    ext_to_int_aud = dict(zip(vekp_del['Clean_HU_Ext'], vekp_del['Clean_HU_Int']))
-                    
-                    parent_map_aud = {}
-                    for _, r in vekp_del.iterrows():
-                        child = str(r['Clean_HU_Int'])
-                        parent = str(r['Clean_Parent'])
-                        if parent in ext_to_int_aud: parent = ext_to_int_aud[parent]
-                        parent_map_aud[child] = parent
+                    # Stejný strom HU jako ve fakturaci (kořen každé HU se jen dohledá v indexu)
+                    hu_index_aud = hu_index if hu_index is not None else build_hu_index(df_vekp)
 
                     valid_base_aud = set()
                     if df_vepo is not None and not df_vepo.empty:
@@ -278,12 +279,8 @@ def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df,
                     for leaf in del_leaves:
                         if leaf in actual_voll_hus:
                             continue
-                        curr = leaf
-                        visited = set()
-                        while curr in parent_map_aud and parent_map_aud[curr] != "" and curr not in visited:
-                            visited.add(curr)
-                            curr = parent_map_aud[curr]
-                        del_roots.add(curr)
+                        curr = hu_root(hu_index_aud, leaf)
+                        if curr is not None: del_roots.add(curr)
 
                     def get_audit_status(row):
                         h = str(row['Clean_HU_Int'])
@@ -294,12 +291,7 @@ def render_audit(df_pick, df_vekp, df_vepo, df_oe, queue_count_col, billing_df,
                         if h in del_roots:
                             return "✅ Účtuje se (Kořenová HU)"
                             
-                        curr = h
-                        visited = set()
-                        while curr in parent_map_aud and parent_map_aud[curr] != "" and curr not in visited:
-                            visited.add(curr)
-                            curr = parent_map_aud[curr]
-                            
+                        curr = hu_root(hu_index_aud, h)
                         if curr in del_roots:
                             if curr not in vekp_del['Clean_HU_Int'].values:
                                 return f"🔗 Podřazený obal (Nadřazené HU {curr} chybí v reportu, ale vyfakturuje se)"
@@ -2,8 +2,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from modules.utils import t, safe_hu, safe_del
+from modules.utils import t, safe_del_vectorized, stage_table, build_hu_index, hu_tree_issues
 from database import load_from_db
+from core.billing import BILLING_COLUMNS, BILLING_WORKERS, billing_logic, slice_billing
+from core.prep import load_billing_aux
 
 try:
     fast_render = st.fragment
@@ -12,347 +14,44 @@ except AttributeError:
 
 # Verze v28 - ZLATÁ LOGIKA + Podpora filtrování dle měsíců
 @st.cache_data(show_spinner=False)
-def cached_billing_logic_v28(df_pick, df_vekp, df_vepo, df_cats, queue_count_col, voll_set):
-    billing_df = pd.DataFrame()
-    df_hu_details = pd.DataFrame()
-    if df_vekp is None or df_vekp.empty: 
-        return billing_df, df_hu_details
+def cached_billing_logic_v28(data_key, _df_pick, _df_vekp, _df_vepo, _df_cats, queue_count_col, _voll_set, _hu_index=None):
+    """Cache fakturace klíčovaná otiskem dat (data_key) - velké DataFramy ani voll_set se při každém rerunu nehashují.
 
-    # ---------------------------------------------------------
-    # 1. PŘÍPRAVA A OČIŠTĚNÍ VEKP (VŠECHNY ZAKÁZKY BEZ FILTRU)
-    # ---------------------------------------------------------
-    vekp_clean = df_vekp.dropna(subset=["Handling Unit", "Generated delivery"]).copy()
-    vekp_clean['Clean_Del'] = vekp_clean['Generated delivery'].apply(safe_del)
-    vekp_filtered = vekp_clean[vekp_clean['Clean_Del'] != ''].copy() 
-    
-    if vekp_filtered.empty: return billing_df, df_hu_details
-
-    vekp_hu_col = next((c for c in vekp_filtered.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), vekp_filtered.columns[0])
-    vekp_ext_col = vekp_filtered.columns[1]
-    parent_col_vepo = next((c for c in vekp_filtered.columns if "higher-level" in str(c).lower() or "übergeordn" in str(c).lower() or "superordinate" in str(c).lower()), None)
-    
-    vekp_filtered['Clean_HU_Int'] = vekp_filtered[vekp_hu_col].apply(safe_hu)
-    vekp_filtered['Clean_HU_Ext'] = vekp_filtered[vekp_ext_col].apply(safe_hu)
-    vekp_filtered['Clean_Parent'] = vekp_filtered[parent_col_vepo].apply(safe_hu) if parent_col_vepo else ""
-
-    # Extrakce měsíce z VEKP (pro spolehlivé filtrování)
-    c_created = next((c for c in vekp_filtered.columns if any(x in str(c).lower() for x in ['created on', 'erfasst am', 'datum', 'date'])), None)
-    if c_created:
-        vekp_filtered['VEKP_Date'] = pd.to_datetime(vekp_filtered[c_created], errors='coerce')
-        vekp_filtered['VEKP_Month'] = vekp_filtered['VEKP_Date'].dt.to_period('M').astype(str).replace('NaT', 'Neznámé')
-    else:
-        vekp_filtered['VEKP_Month'] = 'Neznámé'
-        
-    del_vekp_month = vekp_filtered.groupby('Clean_Del')['VEKP_Month'].first().to_dict()
-
-    int_to_ext = dict(zip(vekp_filtered['Clean_HU_Int'], vekp_filtered['Clean_HU_Ext']))
-
-    # ---------------------------------------------------------
-    # 2. PŘÍPRAVA PICK DAT (Pro spárování s TO)
-    # ---------------------------------------------------------
-    df_pick_billing = pd.DataFrame()
-    picked_mats_by_del = {}
-    if df_pick is not None and not df_pick.empty:
-        df_pick_billing = df_pick.copy()
-        df_pick_billing['Clean_Del'] = df_pick_billing['Delivery'].apply(safe_del)
-        picked_mats_by_del = df_pick_billing.groupby('Clean_Del')['Material'].apply(lambda x: set(x.astype(str).str.strip())).to_dict()
-        
-        if 'Pohyby_Rukou' not in df_pick_billing.columns:
-            df_pick_billing['Pohyby_Rukou'] = 0
-            
-        def is_row_voll(row):
-            d = row['Clean_Del']
-            hu = safe_hu(row.get('Handling Unit', ''))
-            if not hu: hu = safe_hu(row.get('Source storage unit', ''))
-            return (d, hu) in voll_set
-        df_pick_billing['Is_Vollpalette'] = df_pick_billing.apply(is_row_voll, axis=1)
-
-    # ---------------------------------------------------------
-    # 3. ZÁKLADNÍ KATEGORIE (df_cats -> T031 -> VBPA/KEP)
-    # ---------------------------------------------------------
-    del_base_map = {}
-    if df_cats is not None and not df_cats.empty:
-        c_del_cats = next((c for c in df_cats.columns if str(c).strip().lower() in ['lieferung', 'delivery', 'zakázka']), df_cats.columns[0])
-        c_kat = next((c for c in df_cats.columns if 'kategorie' in str(c).lower() or 'category' in str(c).lower()), None)
-        if c_del_cats and c_kat:
-            for _, r in df_cats.iterrows():
-                d = safe_del(r[c_del_cats])
-                cat_val = str(r[c_kat]).strip().upper()
-                if cat_val in ['N', 'E', 'O', 'OE']:
-                    del_base_map[d] = cat_val
-
-    del_vs_map = {}
-    df_likp = load_from_db('raw_likp')
-    if df_likp is not None and not df_likp.empty:
-        c_lief = next((c for c in df_likp.columns if "Delivery" in str(c) or "Lieferung" in str(c)), df_likp.columns[0])
-        c_vs = next((c for c in df_likp.columns if "Shipping Point" in str(c) or "Versandstelle" in str(c) or "Receiving Pt" in str(c)), None)
-        if c_vs:
-            for _, r in df_likp.iterrows():
-                del_vs_map[safe_del(r[c_lief])] = str(r[c_vs]).strip().upper()
-
-    kep_carriers = set()
-    df_kep = load_from_db('aus_sdshp_am2')
-    if df_kep is not None and not df_kep.empty:
-        c_sped = next((c for c in df_kep.columns if "Spediteur" in str(c)), df_kep.columns[0])
-        c_kep = next((c for c in df_kep.columns if "KEP" in str(c)), None)
-        if c_kep:
-            for _, r in df_kep.iterrows():
-                if str(r[c_kep]).strip().upper() == 'X':
-                    kep_carriers.add(str(r[c_sped]).strip().lstrip('0'))
-
-    del_is_kep = {}
-    df_vbpa = load_from_db('aus_vbpa')
-    if df_vbpa is not None and not df_vbpa.empty:
-        c_beleg = next((c for c in df_vbpa.columns if "Vertriebsbeleg" in str(c) or "Delivery" in str(c)), df_vbpa.columns[0])
-        c_role = next((c for c in df_vbpa.columns if "Partnerrolle" in str(c) or "Partner Function" in str(c)), None)
-        c_kred = next((c for c in df_vbpa.columns if "Kreditor" in str(c) or "Vendor" in str(c)), None)
-        c_deb = next((c for c in df_vbpa.columns if "Debitor" in str(c) or "Customer" in str(c)), None)
-        
-        if c_role and (c_kred or c_deb):
-            for _, r in df_vbpa.iterrows():
-                if str(r[c_role]).strip().upper() in ['SP', 'CR']:
-                    sped = str(r.get(c_kred, r.get(c_deb, ''))).strip().lstrip('0')
-                    if sped in kep_carriers:
-                        del_is_kep[safe_del(r[c_beleg])] = True
-
-    all_active_dels = vekp_filtered['Clean_Del'].unique()
-    
-    for d in all_active_dels:
-        if d not in del_base_map:
-            vs = del_vs_map.get(d, "")
-            is_kep = del_is_kep.get(d, False)
-            
-            if vs == 'FM20': base = 'N'
-            elif vs == 'FM21': base = 'E'
-            elif vs == 'FM22': base = 'E'
-            elif vs == 'FM23': base = 'N'
-            elif vs == 'FM24': base = 'O'
-            else: base = 'N' 
-            
-            if is_kep:
-                if base == 'N': base = 'E'
-                if base == 'O': base = 'OE'
-            elif not df_pick_billing.empty:
-                grp = df_pick_billing[df_pick_billing['Clean_Del'] == d]
-                if not grp.empty:
-                    all_queues = set(grp['Queue'].dropna().astype(str).str.upper().unique())
-                    has_pallet = any(q in ['PI_PL', 'PI_PL_OE', 'FU', 'FU_O', 'FUOE', 'PI_PL_FU'] for q in all_queues)
-                    has_parcel = 'PI_PA' in all_queues or 'PI_PA_OE' in all_queues
-                    if has_parcel and not has_pallet:
-                        if base == 'N': base = 'E'
-                        if base == 'O': base = 'OE'
-                        
-            del_base_map[d] = base
-
-    # ---------------------------------------------------------
-    # 4. VEPO STROM A MAPOVÁNÍ MATERIÁLŮ
-    # ---------------------------------------------------------
-    vepo_mats = {}
-    if df_vepo is not None and not df_vepo.empty:
-        vepo_hu_col = next((c for c in df_vepo.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df_vepo.columns[0])
-        vepo_mat_col = next((c for c in df_vepo.columns if "Material" in str(c)), None)
-        if vepo_mat_col:
-            for _, r in df_vepo.dropna(subset=[vepo_hu_col, vepo_mat_col]).iterrows():
-                h = safe_hu(r[vepo_hu_col])
-                m = str(r[vepo_mat_col]).strip()
-                if h not in vepo_mats: vepo_mats[h] = set()
-                vepo_mats[h].add(m)
-
-    parent_map = dict(zip(vekp_filtered['Clean_HU_Int'], vekp_filtered['Clean_Parent']))
-    children_map = {}
-    for child, parent in parent_map.items():
-        if parent:
-            if parent not in children_map: children_map[parent] = []
-            children_map[parent].append(child)
-
-    def get_leaves(node, visited=None):
-        if visited is None: visited = set()
-        if node in visited: return []
-        visited.add(node)
-        
-        if node not in children_map or not children_map[node]: 
-            return [node]
-        
-        leaves = []
-        for child in children_map[node]:
-            leaves.extend(get_leaves(child, visited))
-        return leaves
-
-    # ---------------------------------------------------------
-    # 5. VYÚČTOVÁNÍ: ZLATÁ LOGIKA (Pouze Kořeny)
-    # ---------------------------------------------------------
-    del_hu_counts = []
-    del_mat_cats = {} 
-    hu_details_list = [] 
-
-    root_df = vekp_filtered[vekp_filtered['Clean_Parent'] == '']
-
-    for d, grp in root_df.groupby('Clean_Del'):
-        base = del_base_map.get(d, "N")
-        valid_picked_mats = picked_mats_by_del.get(d, set())
-
-        for _, r in grp.iterrows():
-            ext_hu = r['Clean_HU_Ext']
-            root_hu = r['Clean_HU_Int']
+    data_key musí jednoznačně popisovat vstupy: otisk připravených dat (app.fetch_fingerprint) + parametry úprav Picku.
+    """
+    return billing_logic(_df_pick, _df_vekp, _df_vepo, _df_cats, queue_count_col, _voll_set, _hu_index, workers=BILLING_WORKERS, **load_billing_aux())
 
-            leaves = get_leaves(root_hu)
-
-            is_voll = False
-            if (d, ext_hu) in voll_set or (d, root_hu) in voll_set:
-                is_voll = True
-            else:
-                for leaf in leaves:
-                    if (d, leaf) in voll_set or (d, int_to_ext.get(leaf, '')) in voll_set:
-                        is_voll = True
-                        break
-
-            if is_voll:
-                cat = f"{base} Vollpalette"
-                if base == "OE": cat = "O Vollpalette" 
-                if base == "E": cat = "N Vollpalette"  
-                
-                mats = set()
-                for leaf in leaves: 
-                    mats.update(vepo_mats.get(leaf, set()))
-                    
-                real_mats = {m for m in mats if m in valid_picked_mats}
-                if not real_mats and len(mats) > 0: real_mats = mats
-                
-                del_hu_counts.append({'Clean_Del': d, 'Category_Full': cat, 'pocet_hu': 1})
-                hu_details_list.append({'Clean_Del': d, 'HU_Ext': ext_hu, 'HU_Int': root_hu, 'Is_Vollpalette': 'ANO', 'Category_Full': cat, 'Materials': ", ".join(real_mats)})
-                
-                for m in real_mats:
-                    if (d, m) not in del_mat_cats: del_mat_cats[(d, m)] = set()
-                    del_mat_cats[(d, m)].add(cat)
-                    
-            else:
-                mats = set()
-                for leaf in leaves: 
-                    mats.update(vepo_mats.get(leaf, set()))
-                    
-                real_mats = {m for m in mats if m in valid_picked_mats}
-                if not real_mats and len(mats) > 0: real_mats = mats 
-                
-                if len(real_mats) > 0:
-                    cat = f"{base} Sortenrein" if len(real_mats) == 1 else f"{base} Misch"
-                    
-                    del_hu_counts.append({'Clean_Del': d, 'Category_Full': cat, 'pocet_hu': 1})
-                    hu_details_list.append({'Clean_Del': d, 'HU_Ext': ext_hu, 'HU_Int': root_hu, 'Is_Vollpalette': 'NE', 'Category_Full': cat, 'Materials': ", ".join(real_mats)})
-
-                    for m in real_mats:
-                        if (d, m) not in del_mat_cats: del_mat_cats[(d, m)] = set()
-                        del_mat_cats[(d, m)].add(cat)
-
-    df_hu_counts = pd.DataFrame(del_hu_counts)
-    if not df_hu_counts.empty:
-        df_hu_counts = df_hu_counts.groupby(['Clean_Del', 'Category_Full']).size().reset_index(name='pocet_hu')
-    else:
-        df_hu_counts = pd.DataFrame(columns=['Clean_Del', 'Category_Full', 'pocet_hu'])
-
-    df_hu_details = pd.DataFrame(hu_details_list)
-
-    # ---------------------------------------------------------
-    # 6. SPÁROVÁNÍ FYZICKÝCH PICKŮ (TO) NA VÝSLEDNÉ KATEGORIE
-    # ---------------------------------------------------------
-    if not df_pick_billing.empty:
-        non_voll_mats = df_pick_billing[~df_pick_billing['Is_Vollpalette']].groupby('Clean_Del')['Material'].nunique().to_dict()
-
-        def get_full_category(row):
-            d = row['Clean_Del']
-            base = del_base_map.get(d, "N")
-
-            if row['Is_Vollpalette']:
-                if base == "OE": return "O Vollpalette"
-                if base == "E": return "N Vollpalette"
-                return f"{base} Vollpalette"
-                
-            mat = str(row.get('Material', '')).strip()
-            cats = del_mat_cats.get((d, mat), set())
-            valid_cats = {c for c in cats if "Vollpalette" not in c}
-            
-            if len(valid_cats) == 1: return list(valid_cats)[0]
-            elif len(valid_cats) > 1: return f"{base} Misch" 
-            else:
-                mats_in_del = non_voll_mats.get(d, 1)
-                return f"{base} Misch" if mats_in_del > 1 else f"{base} Sortenrein"
-
-        df_pick_billing['Category_Full'] = df_pick_billing.apply(get_full_category, axis=1)
-
-        pick_agg = df_pick_billing.groupby(['Clean_Del', 'Category_Full']).agg(
-            pocet_to=(queue_count_col, "nunique"),
-            pohyby_celkem=("Pohyby_Rukou", "sum"),
-            pocet_lokaci=("Source Storage Bin", "nunique"),
-            pocet_mat=("Material", "nunique") 
-        ).reset_index()
-    else:
-        pick_agg = pd.DataFrame(columns=['Clean_Del', 'Category_Full', 'pocet_to', 'pohyby_celkem', 'pocet_lokaci', 'pocet_mat'])
-
-    # ---------------------------------------------------------
-    # 7. AGREGACE DLE ZAKÁZKY
-    # ---------------------------------------------------------
-    billing_df = pd.merge(df_hu_counts, pick_agg, on=['Clean_Del', 'Category_Full'], how='outer')
-
-    billing_df['Delivery'] = billing_df['Clean_Del']
-    billing_df['Clean_Del_Merge'] = billing_df['Clean_Del']
-    
-    # Přiřazení měsíce (Přednostně z VEKP data)
-    if not df_pick_billing.empty:
-        del_metadata = df_pick_billing.groupby('Clean_Del').agg(
-            Month=('Month', 'first'),
-            hlavni_fronta=("Queue", lambda x: x.mode()[0] if not x.empty else "")
-        ).to_dict('index')
-        billing_df['Month'] = billing_df['Clean_Del'].apply(
-            lambda d: del_vekp_month.get(d, 'Neznámé') if del_vekp_month.get(d, 'Neznámé') != 'Neznámé' 
-            else del_metadata.get(d, {}).get('Month', 'Neznámé')
-        )
-        billing_df['hlavni_fronta'] = billing_df.apply(lambda r: del_metadata.get(r['Clean_Del'], {}).get('hlavni_fronta', ''), axis=1)
-    else:
-        billing_df['Month'] = billing_df['Clean_Del'].map(del_vekp_month).fillna('Neznámé')
-        billing_df['hlavni_fronta'] = ''
-
-    for col in ['pocet_to', 'pohyby_celkem', 'pocet_lokaci', 'pocet_hu', 'pocet_mat']:
-        billing_df[col] = billing_df[col].fillna(0).astype(int)
-
-    billing_df["Bilance"] = (billing_df["pocet_to"] - billing_df["pocet_hu"]).astype(int)
-    billing_df["TO_navic"] = billing_df["Bilance"].clip(lower=0)
-
-    return billing_df, df_hu_details
 
 @fast_render
-def render_reliability_report(df_pick, df_vekp, df_vepo):
+def render_reliability_report(df_pick, df_vekp, df_vepo, hu_index=None, facts=None):
     if df_vekp is None or df_vekp.empty: return
     
     st.markdown("<div class='section-header'><h3>🛡️ Spolehlivost dat a chybějící záznamy</h3></div>", unsafe_allow_html=True)
     
-    df_vekp_clean = df_vekp.copy()
-    c_del = next((c for c in df_vekp_clean.columns if "Generated delivery" in str(c) or "generierte" in str(c).lower()), None)
-    c_hu = next((c for c in df_vekp_clean.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df_vekp_clean.columns[0])
-    
-    df_vekp_clean['Clean_Del'] = df_vekp_clean[c_del].apply(safe_del)
-    df_vekp_clean['Clean_HU'] = df_vekp_clean[c_hu].apply(safe_hu)
-    
+    # Clean_Del / Clean_HU_Int jsou ze stagingu, zakázky Picku z tabulky faktů (app.fetch_delivery_facts)
+    df_vekp_clean = stage_table(df_vekp, 'raw_vekp')
     all_dels = df_vekp_clean[df_vekp_clean['Clean_Del'] != '']['Clean_Del'].unique()
-    pick_dels = set(df_pick['Delivery'].apply(safe_del)) if df_pick is not None else set()
+    if facts is not None: pick_dels = set(facts['Clean_Del'])
+    else: pick_dels = set(df_pick['Clean_Del']) if df_pick is not None else set()
     
     likp_dels = set()
     df_likp = load_from_db('raw_likp')
     if df_likp is not None and not df_likp.empty:
         c_likp_del = next((c for c in df_likp.columns if "Delivery" in str(c) or "Lieferung" in str(c)), df_likp.columns[0])
-        likp_dels = set(df_likp[c_likp_del].apply(safe_del))
+        likp_dels = set(safe_del_vectorized(df_likp[c_likp_del]))
         
     vepo_hus = set()
     if df_vepo is not None and not df_vepo.empty:
-        c_vepo_hu = next((c for c in df_vepo.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df_vepo.columns[0])
-        vepo_hus = set(df_vepo[c_vepo_hu].apply(safe_hu))
+        vepo_hus = set(stage_table(df_vepo, 'raw_vepo')['Clean_HU_Int'])
         
-    del_hu_map = df_vekp_clean.groupby('Clean_Del')['Clean_HU'].apply(set).to_dict()
+    # Zakázka má obsah ve VEPO, pokud aspoň jedna její HU z VEKP je ve VEPO
+    del_has_vepo = df_vekp_clean['Clean_HU_Int'].isin(vepo_hus).groupby(df_vekp_clean['Clean_Del']).any().to_dict()
     
     missing_data = []
     for d in all_dels:
         has_pick = d in pick_dels
         has_likp = d in likp_dels
-        d_hus = del_hu_map.get(d, set())
-        has_vepo = len(d_hus.intersection(vepo_hus)) > 0
+        has_vepo = del_has_vepo.get(d, False)
         
         if not (has_pick and has_likp and has_vepo):
             missing_data.append({
@@ -375,34 +74,35 @@ def render_reliability_report(df_pick, df_vekp, df_vepo):
                 st.dataframe(pd.DataFrame(missing_data), hide_index=True, use_container_width=True)
         else:
             st.success("Perfektní! Všechny fakturované zakázky mají svá data kompletní.")
+
+    # Strom HU: cykly a chybějící nadřazené HU by jinak z fakturace tiše vypadly
+    df_tree_issues = hu_tree_issues(hu_index if hu_index is not None else build_hu_index(df_vekp))
+    if not df_tree_issues.empty:
+        n_cyc = int(df_tree_issues['Problém'].str.startswith('Cyklus').sum())
+        with st.expander(f"🌳 Problémy ve stromu HU (VEKP): {n_cyc} HU v cyklu, {len(df_tree_issues) - n_cyc} odkazů na chybějící nadřazenou HU", expanded=False):
+            st.dataframe(df_tree_issues, hide_index=True, use_container_width=True)
     st.divider()
 
 
-def render_billing(df_pick, df_vekp, df_vepo, df_cats, queue_count_col, aus_data=None):
+def render_billing(df_pick, df_vekp, df_vepo, df_cats, queue_count_col, aus_data=None, hu_index=None, billing=None, facts=None):
     def _t(cs, en): return en if st.session_state.get('lang', 'cs') == 'en' else cs
 
     st.markdown(f"<div class='section-header'><h3>💰 {_t('Korelace mezi Pickováním a Účtováním', 'Correlation Between Picking and Billing')}</h3><p>{_t('Zákazník platí podle počtu výsledných balících jednotek (HU). Zde vidíte náročnost vytvoření těchto zpoplatněných jednotek napříč fakturačními kategoriemi.', 'The customer pays based on the number of billed HUs. Here you can see the effort required to create these billed units across categories.')}</p></div>", unsafe_allow_html=True)
 
     with st.spinner("🧠 Analyzuji SAP data (VEKP, VEPO)..."):
-        render_reliability_report(df_pick, df_vekp, df_vepo)
+        render_reliability_report(df_pick, df_vekp, df_vepo, hu_index, facts)
 
-        voll_set = st.session_state.get('voll_set', set())
-        
-        # Volání cacheované logiky
-        billing_df, df_hu_details = cached_billing_logic_v28(df_pick, df_vekp, df_vepo, df_cats, queue_count_col, voll_set)
+        # Fakturace za celé období (app.fetch_billing); bez ní se počítá nad předaným Pickem (bez cache - chybí otisk dat)
+        if billing is not None:
+            billing_df, df_hu_details = billing
+        else:
+            voll_set = st.session_state.get('voll_set', set())
+            billing_df, df_hu_details = billing_logic(df_pick, df_vekp, df_vepo, df_cats, queue_count_col, voll_set, hu_index, workers=BILLING_WORKERS, **load_billing_aux())
 
         # ===============================================
         # APLIKACE FILTRU MĚSÍCE (aby vše sedělo s menu)
         # ===============================================
-        if 'Month' in df_pick.columns:
-            pick_months = [m for m in df_pick['Month'].unique() if m != 'Neznámé']
-            if len(pick_months) >= 1:
-                # OPRAVA: Očištění 'Delivery' na 'Clean_Del' přímo zde, aby nedošlo ke KeyError
-                valid_dels = set(df_pick['Delivery'].apply(safe_del).dropna().unique())
-                
-                # Zobrazíme zakázky z vybraných měsíců + zakázky spárované s Pick reportem
-                billing_df = billing_df[(billing_df['Month'].isin(pick_months)) | (billing_df['Clean_Del'].isin(valid_dels))].copy()
-                df_hu_details = df_hu_details[df_hu_details['Clean_Del'].isin(billing_df['Clean_Del'])].copy()
+        billing_df, df_hu_details = slice_billing(billing_df, df_hu_details, df_pick)
 
         st.session_state['billing_df'] = billing_df 
         st.session_state['debug_hu_details'] = df_hu_details
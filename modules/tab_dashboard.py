@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from modules.utils import t, QUEUE_DESC
+from modules.utils import t, QUEUE_DESC, sweep_move_scenarios
 
 def render_dashboard(df_pick, queue_count_col):
     # Chytrý lokální překladač pro tuto záložku
@@ -193,4 +193,55 @@ def render_dashboard(df_pick, queue_count_col):
     else:
         st.info(_t("Data neobsahují informace o měsíci.", "Data does not contain month information."))
 
+    # --- 4. SCÉNÁŘE ERGONOMICKÝCH LIMITŮ (Parameter sweep) ---
+    if 'Loose_Rest' in df_pick.columns:
+        st.markdown(f"<div class='section-header'><h3>🧪 {_t('Porovnání scénářů ergonomických limitů', 'Ergonomic Limit Scenarios')}</h3><p>{_t('Rozklad na krabice je spočítán jednou, zde se najednou přepočítá celá mřížka limitů (váha x rozměr x hrst).', 'Box decomposition is computed once; the whole grid of limits (weight x dimension x grab) is evaluated in one pass.')}</p></div>", unsafe_allow_html=True)
+
+        def parse_grid(txt, cast):
+            vals = []
+            for part in str(txt).replace(';', ',').split(','):
+                try: vals.append(cast(part.strip()))
+                except ValueError: pass
+            return sorted(set(v for v in vals if v > 0))
+
+        cg1, cg2, cg3 = st.columns(3)
+        w_grid = parse_grid(cg1.text_input(_t("Hranice váhy (kg)", "Weight limits (kg)"), value="1, 2, 3, 5", key="sweep_w"), float)
+        d_grid = parse_grid(cg2.text_input(_t("Hranice rozměru (cm)", "Dimension limits (cm)"), value="10, 15, 25", key="sweep_d"), float)
+        h_grid = parse_grid(cg3.text_input(_t("Ks do hrsti", "Pcs per grab"), value="1, 2, 5", key="sweep_h"), int)
+
+        sweep = sweep_move_scenarios(df_pick, w_grid, d_grid, h_grid)
+        if sweep.empty:
+            st.info(_t("Zadejte alespoň jednu hodnotu pro každý limit.", "Enter at least one value for each limit."))
+        else:
+            loc_per_q = to_group.groupby('Queue')['lokace_v_to'].sum()
+            sweep['Queue'] = sweep['Queue'].astype(str)
+            sweep['prum_poh_lok'] = sweep['Moves'] / sweep['Queue'].map(loc_per_q).replace(0, np.nan)
+
+            sel_sweep_q = st.multiselect(
+                _t("Fronty ve scénářích:", "Queues in scenarios:"),
+                options=sorted(sweep['Queue'].unique()),
+                default=[q for q in sorted(sweep['Queue'].unique()) if q != 'N/A'][:4],
+                key="sweep_queues"
+            )
+            sweep_view = sweep[sweep['Queue'].isin(sel_sweep_q)] if sel_sweep_q else sweep
+
+            pivot = sweep_view.pivot_table(index='Scenario', columns='Queue', values='Moves', aggfunc='sum', sort=False)
+            pivot[_t("Celkem", "Total")] = pivot.sum(axis=1)
+            st.dataframe(pivot.style.format("{:,.0f}"), use_container_width=True)
+
+            fig_sw = go.Figure()
+            colors = px.colors.qualitative.Plotly
+            for i, q in enumerate(sorted(sweep_view['Queue'].unique())):
+                q_data = sweep_view[sweep_view['Queue'] == q]
+                fig_sw.add_trace(go.Bar(x=q_data['Scenario'], y=q_data['prum_poh_lok'], name=q, marker_color=colors[i % len(colors)]))
+            fig_sw.update_layout(
+                barmode='group',
+                yaxis=dict(title=_t("Průměr pohybů na lokaci", "Avg Moves per Location")),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                margin=dict(l=0, r=0, t=30, b=0),
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+            )
+            st.plotly_chart(fig_sw, use_container_width=True)
+
     return disp_q
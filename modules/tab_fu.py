@@ -2,9 +2,15 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from modules.utils import t, safe_del, safe_hu, is_box
+from modules.utils import t, is_box, pick_vollpalettes
+from core.prep import delivery_facts
 
-def render_fu(df_pick, queue_count_col):
+# Sloupce Pick reportu pro celé palety a porovnání FU vs SAP (projekce při načítání z DB)
+FU_COLUMNS = {
+    'raw_pick': ['=Delivery', 'Handling Unit', 'Source storage unit', 'Removal of total SU', 'Storage Unit Type', 'Confirmation date', 'Transfer Order', 'Clean_'],
+}
+
+def render_fu(df_pick, queue_count_col, facts=None):
     def _t(cs, en): 
         return en if st.session_state.get('lang', 'cs') == 'en' else cs
 
@@ -89,25 +95,15 @@ def render_fu(df_pick, queue_count_col):
     if not voll_set:
         st.warning(_t("⚠️ Centrální mozek pro Vollpalety nemá žádná data (zkontrolujte nahrané VEKP a VEPO).", "⚠️ Central brain for Vollpallets has no data (check VEKP and VEPO files)."))
     
-    fu_df['Clean_Del'] = fu_df['Delivery'].apply(safe_del)
     fu_df['Has_X'] = fu_df['Removal of total SU'].astype(str).str.strip().str.upper() == 'X'
-    
-    def check_is_vollpalette(row):
-        d = row['Clean_Del']
-        hu = safe_hu(row.get('Handling Unit', ''))
-        if not hu: hu = safe_hu(row.get('Source storage unit', ''))
-        return (d, hu) in voll_set
-
-    fu_df['Neprebalovano'] = fu_df.apply(check_is_vollpalette, axis=1)
+    fu_df['Neprebalovano'] = pick_vollpalettes(fu_df, voll_set)
     
     fu_df_pallets = fu_df[~fu_df['Is_KLT']].copy()
     ignored_klt_count = fu_df[fu_df['Is_KLT']][queue_count_col].nunique()
     
-    df_scan = df_pick.copy()
-    df_scan['Clean_Del'] = df_scan['Delivery'].apply(safe_del)
-    df_scan['Q_Upper'] = df_scan['Queue'].astype(str).str.upper()
-    
-    del_all_queues = df_scan.groupby('Clean_Del')['Q_Upper'].apply(set).to_dict()
+    # Všechny fronty zakázky z tabulky faktů (app.fetch_delivery_facts)
+    if facts is None: facts = delivery_facts(df_pick, queue_count_col)
+    del_all_queues = dict(zip(facts['Clean_Del'], facts['Fronty']))
     
     pure_fu_combo_dels = {d for d, qs in del_all_queues.items() if qs.issubset({'PI_PL_FU', 'PI_PL_FUOE'})}
     only_fu_strict_dels = {d for d, qs in del_all_queues.items() if qs == {'PI_PL_FU'}}
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from modules.utils import t, safe_hu, safe_del
+from modules.utils import t
+from core.fu import fu_compare_tasks, fu_monthly_trend
 
 try:
     fast_render = st.fragment
@@ -9,7 +10,7 @@ except AttributeError:
     fast_render = lambda f: f
 
 @fast_render
-def render_fu_compare(df_pick, billing_df, voll_set, queue_count_col):
+def render_fu_compare(df_pick, billing_df, voll_set, queue_count_col, facts=None):
     def _t(cs, en): return en if st.session_state.get('lang', 'cs') == 'en' else cs
 
     st.markdown(f"<div class='section-header'><h3>⚖️ {_t('Detailní porovnání: Fyzický proces (Pick Queue) vs Fakturace ', 'Detailed Comparison: Physical Process vs Billing')}</h3><p>{_t('Tato záložka podrobně vysvětluje, proč nesedí čísla ze skeneru (fronty PI_PL_FU a PI_PL_FUOE) s konečnou fakturací, a jak Fakturační mozek zachraňuje přelepené palety.', 'This tab explains the differences between Scanner Data and Billing Data, and how the algorithm saves relabeled pallets.')}</p></div>", unsafe_allow_html=True)
@@ -19,41 +20,7 @@ def render_fu_compare(df_pick, billing_df, voll_set, queue_count_col):
         return
 
     # --- PŘÍPRAVA DAT PRO HORNÍ METRIKY (Filtrovaná data) ---
-    df_p = df_pick.copy()
-    df_p['Clean_Del'] = df_p['Delivery'].apply(safe_del)
-    df_p['Source_HU'] = df_p['Source storage unit'].apply(safe_hu)
-    df_p['Dest_HU'] = df_p['Handling Unit'].apply(safe_hu)
-
-    c_su = 'Storage Unit Type' if 'Storage Unit Type' in df_p.columns else ('Type' if 'Type' in df_p.columns else None)
-    if c_su:
-        df_p['Is_KLT'] = df_p[c_su].astype(str).str.upper().isin(['K1', 'K2', 'K3', 'K4', 'KLT', 'KLT1', 'KLT2'])
-    else:
-        df_p['Is_KLT'] = False
-
-    df_p['Queue_UPPER'] = df_p['Queue'].astype(str).str.upper()
-    df_p['Is_FU'] = (df_p['Queue_UPPER'] == 'PI_PL_FU') & (~df_p['Is_KLT'])
-    df_p['Is_FUOE'] = (df_p['Queue_UPPER'] == 'PI_PL_FUOE') & (~df_p['Is_KLT'])
-    df_p['Is_FU_Any'] = df_p['Is_FU'] | df_p['Is_FUOE']
-    df_p['Is_Untouched'] = (df_p['Source_HU'] == df_p['Dest_HU']) & (df_p['Source_HU'] != '')
-
-    def check_voll(row):
-        d = row['Clean_Del']
-        return (d, row['Dest_HU']) in voll_set or (d, row['Source_HU']) in voll_set
-
-    df_p['Is_Voll_Billed'] = df_p.apply(check_voll, axis=1)
-
-    to_agg = df_p.groupby(queue_count_col).agg(
-        Delivery=('Clean_Del', 'first'),
-        Queue=('Queue', 'first'),
-        Queue_UPPER=('Queue_UPPER', 'first'),
-        Storage_Unit_Type=(c_su, 'first') if c_su else ('Queue', 'first'),
-        Is_FU_Any=('Is_FU_Any', 'max'),
-        Is_Untouched=('Is_Untouched', 'min'),
-        Is_Voll_Billed=('Is_Voll_Billed', 'max'),
-        Source_HU=('Source_HU', 'first'),
-        Dest_HU=('Dest_HU', 'first'),
-        Material=('Material', 'first')
-    ).reset_index()
+    to_agg = fu_compare_tasks(df_pick, voll_set, queue_count_col)
 
     fu_tasks = to_agg[(to_agg['Queue_UPPER'] == 'PI_PL_FU') & (to_agg['Is_FU_Any'])].shape[0]
     fu_untouched = to_agg[(to_agg['Queue_UPPER'] == 'PI_PL_FU') & (to_agg['Is_FU_Any']) & (to_agg['Is_Untouched'])].shape[0]
@@ -61,7 +28,7 @@ def render_fu_compare(df_pick, billing_df, voll_set, queue_count_col):
     fuoe_tasks = to_agg[(to_agg['Queue_UPPER'] == 'PI_PL_FUOE') & (to_agg['Is_FU_Any'])].shape[0]
     fuoe_untouched = to_agg[(to_agg['Queue_UPPER'] == 'PI_PL_FUOE') & (to_agg['Is_FU_Any']) & (to_agg['Is_Untouched'])].shape[0]
 
-    valid_dels = set(df_p['Clean_Del'].dropna().unique())
+    valid_dels = set(facts['Clean_Del'] if facts is not None else df_pick['Clean_Del']) # Zakázky z tabulky faktů (app.fetch_delivery_facts)
     billing_df_filtered = billing_df[billing_df['Clean_Del'].isin(valid_dels)]
     
     billed_n_voll = billing_df_filtered[billing_df_filtered['Category_Full'] == 'N Vollpalette']['pocet_hu'].sum()
@@ -84,60 +51,18 @@ def render_fu_compare(df_pick, billing_df, voll_set, queue_count_col):
     # =========================================================
     # VÝPOČET GRAFU PRO VŠECHNY MĚSÍCE (Sáhnutí do raw paměti)
     # =========================================================
-    df_full = st.session_state.get('data_dict', {}).get('df_pick', df_pick).copy()
-    if 'Month' not in df_full.columns:
-        df_full['Date'] = pd.to_datetime(df_full.get('Confirmation date', df_full.get('Confirmation Date')), errors='coerce')
-        df_full['Month'] = df_full['Date'].dt.to_period('M').astype(str).replace('NaT', 'Neznámé')
-
-    df_full['Clean_Del'] = df_full['Delivery'].apply(safe_del)
-    df_full['Source_HU'] = df_full['Source storage unit'].apply(safe_hu)
-    df_full['Dest_HU'] = df_full['Handling Unit'].apply(safe_hu)
-
-    c_su_f = 'Storage Unit Type' if 'Storage Unit Type' in df_full.columns else ('Type' if 'Type' in df_full.columns else None)
-    if c_su_f: df_full['Is_KLT'] = df_full[c_su_f].astype(str).str.upper().isin(['K1', 'K2', 'K3', 'K4', 'KLT', 'KLT1', 'KLT2'])
-    else: df_full['Is_KLT'] = False
-
-    df_full['Queue_UPPER'] = df_full['Queue'].astype(str).str.upper()
-    df_full['Is_FU'] = (df_full['Queue_UPPER'] == 'PI_PL_FU') & (~df_full['Is_KLT'])
-    df_full['Is_FUOE'] = (df_full['Queue_UPPER'] == 'PI_PL_FUOE') & (~df_full['Is_KLT'])
-    df_full['Is_FU_Any'] = df_full['Is_FU'] | df_full['Is_FUOE']
-    df_full['Is_Untouched'] = (df_full['Source_HU'] == df_full['Dest_HU']) & (df_full['Source_HU'] != '')
-    df_full['Is_Voll_Billed'] = df_full.apply(check_voll, axis=1)
-
-    to_agg_full = df_full.groupby(queue_count_col).agg(
-        Delivery=('Clean_Del', 'first'),
-        Queue_UPPER=('Queue_UPPER', 'first'),
-        Month=('Month', 'first'),
-        Is_FU_Any=('Is_FU_Any', 'max'),
-        Is_Untouched=('Is_Untouched', 'min'),
-        Is_Voll_Billed=('Is_Voll_Billed', 'max')
-    ).reset_index()
-
-    months = sorted([m for m in to_agg_full['Month'].unique() if m != 'Neznámé'])
-    chart_data = []
-
-    for m in months:
-        m_df = to_agg_full[to_agg_full['Month'] == m]
-        valid_dels_m = set(m_df['Delivery'].unique())
-        
-        # Billing pro daný měsíc přesně tak jak odjel na skeneru
-        m_bill = billing_df[billing_df['Clean_Del'].isin(valid_dels_m)]
-        
-        chart_data.append({
-            'Month': m,
-            'FU_Tasks': m_df[(m_df['Queue_UPPER'] == 'PI_PL_FU') & (m_df['Is_FU_Any'])].shape[0],
-            'FU_Untouched': m_df[(m_df['Queue_UPPER'] == 'PI_PL_FU') & (m_df['Is_FU_Any']) & (m_df['Is_Untouched'])].shape[0],
-            'Billed_N': m_bill[m_bill['Category_Full'] == 'N Vollpalette']['pocet_hu'].sum(),
-            
-            'FUOE_Tasks': m_df[(m_df['Queue_UPPER'] == 'PI_PL_FUOE') & (m_df['Is_FU_Any'])].shape[0],
-            'FUOE_Untouched': m_df[(m_df['Queue_UPPER'] == 'PI_PL_FUOE') & (m_df['Is_FU_Any']) & (m_df['Is_Untouched'])].shape[0],
-            'Billed_O': m_bill[m_bill['Category_Full'].isin(['O Vollpalette', 'OE Vollpalette'])]['pocet_hu'].sum(),
-            
-            'Ideal': m_df[(m_df['Is_FU_Any']) & (m_df['Is_Untouched']) & (m_df['Is_Voll_Billed'])].shape[0],
-            'Lost': m_df[(m_df['Is_FU_Any']) & (~m_df['Is_Voll_Billed'])].shape[0]
-        })
+    # Bez plného Picku v session se úkoly nepočítají podruhé - stačí ty nahoře
+    df_full = st.session_state.get('data_dict', {}).get('df_pick')
+    if df_full is None:
+        tasks_full = to_agg
+    else:
+        df_full = df_full.copy()
+        if 'Month' not in df_full.columns:
+            df_full['Date'] = pd.to_datetime(df_full.get('Confirmation date', df_full.get('Confirmation Date')), errors='coerce')
+            df_full['Month'] = df_full['Date'].dt.to_period('M').astype(str).replace('NaT', 'Neznámé')
+        tasks_full = fu_compare_tasks(df_full, voll_set, queue_count_col)
 
-    df_chart = pd.DataFrame(chart_data)
+    df_chart = fu_monthly_trend(tasks_full, billing_df)
 
     if not df_chart.empty:
         st.markdown(f"### 📈 {_t('Trend v čase (Všechny měsíce)', 'Trend Over Time (All Months)')}")
@@ -193,7 +118,7 @@ def render_fu_compare(df_pick, billing_df, voll_set, queue_count_col):
         f"🟡 {_t('Bonusové palety (Z jiných front)', 'Bonus Pallets (From other queues)')}"
     ])
 
-    cols_to_drop = ['Is_FU_Any', 'Queue_UPPER', 'Is_Untouched', 'Is_Voll_Billed']
+    cols_to_drop = ['Is_FU_Any', 'Queue_UPPER', 'Is_Untouched', 'Is_Voll_Billed', 'Month']
 
     with t1:
         st.markdown(_t("Ideální proces: Skladník dostal úkol jít pro celou paletu, potvrdil původní štítek a v SAPu to bezpečně prošlo fakturací jako Vollpalette.", "Ideal process: Worker picked a full pallet, kept the label, and it was billed successfully."))
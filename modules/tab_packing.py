@@ -4,8 +4,8 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 import re
-from database import load_from_db
 from modules.utils import t
+from core.packing import packing_matches, packing_efficiency
 
 # Globální nastavení grafů pro jednotný vzhled
 CHART_LAYOUT = dict(
@@ -32,7 +32,7 @@ def clean_pkg_name(name):
     name = re.sub(r'-?\s*KARTON\s*', '', name)
     return name.strip()
 
-def render_packing(billing_df, df_oe):
+def render_packing(billing_df, df_oe, facts=None):
     def _t(cs, en): 
         return en if st.session_state.get('lang', 'cs') == 'en' else cs
 
@@ -46,15 +46,8 @@ def render_packing(billing_df, df_oe):
         st.warning(_t("Pro propojení chybí data z Fakturace (VEKP). Aplikace nejprve potřebuje načíst data z předchozích záložek.", "Billing data (VEKP) missing for correlation. App needs data from previous tabs first."))
         return
 
-    # Příprava dat pro čisté párování
-    df_oe_clean = df_oe.copy()
-    df_oe_clean['Clean_Del'] = df_oe_clean['Delivery'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip().str.lstrip('0')
-    
-    bill_clean = billing_df.copy()
-    bill_clean['Clean_Del'] = bill_clean['Clean_Del_Merge'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip().str.lstrip('0')
-
     # Spojení fakturačních dat a časů balení (Inner Join)
-    pack_df = pd.merge(bill_clean, df_oe_clean, on='Clean_Del', how='inner')
+    pack_df = packing_matches(billing_df, df_oe)
 
     if pack_df.empty:
         st.error(_t("Nepodařilo se spárovat žádné zakázky z OE-Times s daty ze skladu/fakturace (Zkontrolujte formát čísel Delivery).", "Failed to match any orders from OE-Times with warehouse/billing data."))
@@ -68,28 +61,7 @@ def render_packing(billing_df, df_oe):
          return
 
     # --- CHYTRÉ NAPOJENÍ NA PŘESNÁ SKLADOVÁ DATA (OPRAVA KUSŮ A MATERIÁLU) ---
-    df_pick = load_from_db('raw_pick')
-    if df_pick is not None and not df_pick.empty:
-        df_pick['Clean_Del'] = df_pick.get('Delivery', pd.Series()).astype(str).str.replace(r'\.0$', '', regex=True).str.strip().str.lstrip('0')
-        df_pick['Qty'] = pd.to_numeric(df_pick.get('Act.qty (dest)', 0), errors='coerce').fillna(0)
-        df_pick['Material'] = df_pick.get('Material', pd.Series()).astype(str).str.strip()
-        
-        # Pro každou zakázku sečteme reálné kusy a najdeme nejčastější materiál
-        pick_info = df_pick.groupby('Clean_Del').agg(
-            Skladovy_Material=('Material', lambda x: x.value_counts().index[0] if len(x.value_counts()) > 0 else ""),
-            Celkove_Kusy=('Qty', 'sum')
-        ).reset_index()
-        
-        valid_time_df = pd.merge(valid_time_df, pick_info, on='Clean_Del', how='left')
-        pcs_col = 'Celkove_Kusy'
-        mat_col = 'Skladovy_Material'
-    else:
-        # Fallback (kdyby pick report chyběl)
-        pcs_col = 'pocet_to'
-        mat_col = 'Material_y' if 'Material_y' in valid_time_df.columns else 'Material'
-
-    # Výpočet efektivity
-    valid_time_df['Min_per_HU'] = np.where(valid_time_df['pocet_hu'] > 0, valid_time_df['Process_Time_Min'] / valid_time_df['pocet_hu'], valid_time_df['Process_Time_Min'])
+    valid_time_df, pcs_col, mat_col = packing_efficiency(valid_time_df, facts) # Kusy a materiál z tabulky faktů (app.fetch_delivery_facts)
     
     # --- HLAVNÍ METRIKY ---
     c1, c2, c3, c4 = st.columns(4)
@@ -1,7 +1,11 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import re
+
+# Výpočetní logika žije v balíčku core (bez Streamlitu, použitelná i v dávce); zde zůstává kvůli importům záložek
+from core.moves import (BOX_UNITS, get_match_key_vectorized, get_match_key, parse_packing_time, fast_compute_moves, pack_box_sizes,
+                        decompose_box_moves, apply_move_limits, fast_compute_moves_vectorized, sweep_move_scenarios)
+from core.hu import (safe_hu, safe_del, safe_hu_vectorized, safe_del_vectorized, is_box, is_box_vectorized, detect_vollpalettes,
+                     detect_vollpalettes_vectorized, PREP_COLUMNS, STAGED_MARKERS, is_staged, stage_table, hu_tree_rows, build_hu_index,
+                     hu_tree_issues, hu_root, hu_depth, hu_leaves, hu_leaf_pairs, hu_is_phantom, pick_vollpalettes)
 
 # Globální nastavení barev a designu pro všechny grafy Plotly
 CHART_COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#06b6d4']
@@ -29,7 +33,6 @@ QUEUE_DESC = {
     'PI_PL_FU': 'Full Pall',
     'PI_PL_FUOE': 'OE Full Pal'
 }
-BOX_UNITS = {'AEK', 'KAR', 'KART', 'PAK', 'VPE', 'CAR', 'BLO', 'ASK', 'BAG', 'PAC'}
 
 TEXTS = {
     'cs': {
@@ -75,138 +78,3 @@ TEXTS = {
 def t(key): 
     lang = st.session_state.get('lang', 'cs')
     return TEXTS.get(lang, TEXTS['cs']).get(key, key)
-
-def get_match_key_vectorized(series):
-    s = series.astype(str).str.strip().str.upper()
-    mask_decimal = s.str.match(r'^\d+\.\d+$')
-    s = s.copy()
-    s[mask_decimal] = s[mask_decimal].str.rstrip('0').str.rstrip('.')
-    mask_numeric = s.str.match(r'^0+\d+$')
-    s[mask_numeric] = s[mask_numeric].str.lstrip('0')
-    return s
-
-def get_match_key(val):
-    v = str(val).strip().upper()
-    if '.' in v and v.replace('.', '').isdigit(): v = v.rstrip('0').rstrip('.')
-    if v.isdigit(): v = v.lstrip('0') or '0'
-    return v
-
-def parse_packing_time(val):
-    v = str(val).strip()
-    if v in ['', 'nan', 'None', 'NaN']: return 0.0
-    try:
-        num = float(v)
-        if num < 1.0: return num * 24 * 60
-        return num
-    except: pass
-    parts = v.split(':')
-    try:
-        if len(parts) == 3: return int(parts[0])*60 + int(parts[1]) + float(parts[2])/60.0
-        elif len(parts) == 2: return int(parts[0]) + float(parts[1])/60.0
-    except: pass
-    return 0.0
-
-def fast_compute_moves(qty_list, queue_list, su_list, box_list, w_list, d_list, v_lim, d_lim, h_lim):
-    res_total, res_exact, res_miss = [], [], []
-    for qty, q, su, boxes, w, d in zip(qty_list, queue_list, su_list, box_list, w_list, d_list):
-        if qty <= 0:
-            res_total.append(0); res_exact.append(0); res_miss.append(0); continue
-        if str(q).upper() in ('PI_PL_FU', 'PI_PL_FUOE') and str(su).strip().upper() == 'X':
-            res_total.append(1); res_exact.append(1); res_miss.append(0); continue
-        if not isinstance(boxes, list): boxes = []
-        real_boxes = [b for b in boxes if b > 1]
-        pb = pok = pmiss = 0
-        zbytek = qty
-        for b in real_boxes:
-            if zbytek >= b:
-                m = int(zbytek // b); pb += m; zbytek = zbytek % b
-                
-        if zbytek > 0:
-            if w >= v_lim or d >= d_lim: p = int(zbytek)
-            else: p = int(np.ceil(zbytek / h_lim))
-            if len(boxes) > 0: pok += p
-            else: pmiss += p
-            
-        res_total.append(pb + pok + pmiss); res_exact.append(pb + pok); res_miss.append(pmiss)
-    return res_total, res_exact, res_miss
-
-
-# ==========================================
-# CENTRÁLNÍ MOZEK PRO DETEKCI VOLLPALET (Vylepšené párování SSU a HU)
-# ==========================================
-
-def safe_hu(val):
-    v = str(val).strip()
-    if v.lower() in ['nan', 'none', '']: return ''
-    if v.endswith('.0'): v = v[:-2]
-    return v
-
-def safe_del(val):
-    v = str(val).strip()
-    if v.lower() in ['nan', 'none', '']: return ''
-    if v.endswith('.0'): v = v[:-2]
-    return v.lstrip('0')
-
-def is_box(v):
-    v = str(v).upper().strip()
-    if v == 'CARTON-16': return False 
-    if v in ['K1','K2','K3','K4','KLT','KLT1','KLT2']: return True
-    if v.startswith('K') and len(v) <= 2: return True
-    if 'CARTON' in v or 'BOX' in v or v in ['CT', 'CD3', 'CD', 'CR']: return True
-    return False
-
-def detect_vollpalettes(df_pick, df_vekp, df_vepo):
-    voll_set = set()
-    if any(df is None or df.empty for df in [df_pick, df_vekp, df_vepo]):
-        return voll_set
-        
-    vepo_hu_col = next((c for c in df_vepo.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df_vepo.columns[0])
-    valid_vepo_hus = set(df_vepo[vepo_hu_col].dropna().apply(safe_hu))
-    
-    vekp_hu_col = next((c for c in df_vekp.columns if "Internal HU" in str(c) or "HU-Nummer intern" in str(c)), df_vekp.columns[0])
-    vekp_ext_col = df_vekp.columns[1]
-    parent_col = next((c for c in df_vekp.columns if "higher-level" in str(c).lower() or "übergeordn" in str(c).lower() or "superordinate" in str(c).lower()), None)
-    c_gen = next((c for c in df_vekp.columns if "Generated delivery" in str(c) or "generierte" in str(c).lower()), None)
-    c_pm = next((c for c in df_vekp.columns if "Packmittel" in str(c) or "Packaging" in str(c) or "Pack. mat" in str(c)), None)
-    
-    valid_roots = {}
-    for _, r in df_vekp.iterrows():
-        deliv = safe_del(r[c_gen]) if c_gen else ""
-        parent = safe_hu(r[parent_col]) if parent_col else ""
-        pm = str(r.get(c_pm, '')).upper().strip() if c_pm else ""
-        
-        if parent == "" and not is_box(pm):
-            ext_hu = safe_hu(r[vekp_ext_col])
-            int_hu = safe_hu(r[vekp_hu_col])
-            if int_hu in valid_vepo_hus:
-                # Uložíme si externí i interní číslo, abychom dokázali z Pick reportu spárovat cokoliv!
-                if ext_hu: valid_roots[(deliv, ext_hu)] = int_hu
-                if int_hu: valid_roots[(deliv, int_hu)] = int_hu
-                
-    c_su = 'Storage Unit Type' if 'Storage Unit Type' in df_pick.columns else ('Type' if 'Type' in df_pick.columns else None)
-    
-    for _, r in df_pick.iterrows():
-        if str(r.get('Removal of total SU', '')).strip().upper() != 'X': continue 
-        su_type = str(r.get(c_su, '')) if c_su else ''
-        if is_box(su_type): continue 
-        if 'PI_PA' in str(r.get('Queue', '')).upper(): continue 
-        
-        ssu = safe_hu(r.get('Source storage unit', ''))
-        hu = safe_hu(r.get('Handling Unit', ''))
-        
-        pick_hu = ""
-        if ssu and hu:
-            if ssu != hu: continue 
-            pick_hu = ssu
-        elif ssu: pick_hu = ssu
-        elif hu: pick_hu = hu
-        else: continue
-        
-        deliv = safe_del(r.get('Delivery', ''))
-        
-        if (deliv, pick_hu) in valid_roots:
-            int_match = valid_roots[(deliv, pick_hu)]
-            voll_set.add((deliv, pick_hu))
-            voll_set.add((deliv, int_match)) # Přidáme obě varianty pro jistotu
-            
-    return voll_set
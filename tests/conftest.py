@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Testy běží bez instalace balíčku; referenční (původní) implementace a generátory dat sdílí s benchmarks/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,55 @@
+"""Základní kategorie zakázek (resolve_delivery_base_categories): pravidla, okrajové případy a shoda s původní smyčkou."""
+import pandas as pd
+import pytest
+
+from bench_base_categories import make_data, reference
+from core.billing import resolve_delivery_base_categories
+from core.hu import safe_del, safe_del_vectorized
+
+DELS = [f"00{80000000 + i}" for i in range(8)]
+
+
+@pytest.fixture(scope='module')
+def rule_result():
+    """Ručně sestavené zakázky - každá zkouší jedno pravidlo (viz test_rule)."""
+    d = DELS
+    likp = pd.DataFrame({'Delivery': d, 'Shipping Point/Receiving Pt': ['FM20', 'fm21', 'FM24', 'FM24', 'FM99', None, 'FM20', 'FM24']})
+    kep = pd.DataFrame({'Spediteur': ['0000000042', '0000000007'], 'KEP-Dienstleister': ['X', '']})
+    vbpa = pd.DataFrame({'Vertriebsbeleg': [d[3], d[6], d[0]], 'Partnerrolle': ['sp', 'CR', 'WE'], 'Kreditor': ['42', '0000000042', '42']})
+    pick = pd.DataFrame({'Delivery': [d[2], d[2], d[7], d[7], d[0]], 'Queue': ['pi_pa', None, 'PI_PA_OE', 'PI_PL', 'CLEARANCE']})
+    pick['Clean_Del'] = safe_del_vectorized(pick['Delivery'])
+    cats = pd.DataFrame({'Lieferung': [d[1], d[4], d[5]], 'Kategorie': [' o ', 'X', 'OE']})
+    return resolve_delivery_base_categories(safe_del_vectorized(pd.Series(d)).unique(), cats, likp, kep, vbpa, pick)
+
+
+@pytest.mark.parametrize('i, expected', [
+    (0, 'N'),  # FM20, KEP dopravce jen v roli WE
+    (1, 'O'),  # df_cats má přednost před FM21
+    (2, 'OE'),  # FM24 + jen balíkové fronty
+    (3, 'OE'),  # FM24 + KEP dopravce
+    (4, 'N'),  # neznámé přepravní místo a neplatná kategorie v df_cats
+    (5, 'OE'),  # jen df_cats, bez přepravního místa
+    (6, 'E'),  # FM20 + KEP (nuly v čísle dopravce)
+    (7, 'O'),  # FM24 s paletovou frontou zůstává O
+])
+def test_rule(rule_result, i, expected):
+    assert rule_result[safe_del(DELS[i])] == expected
+
+
+def test_matches_reference():
+    dels, df_cats, df_likp, df_kep, df_vbpa, pick = make_data(500, 5_000)
+    active = safe_del_vectorized(pd.Series(dels)).unique()
+    assert resolve_delivery_base_categories(active, df_cats, df_likp, df_kep, df_vbpa, pick) == reference(active, df_cats, df_likp, df_kep, df_vbpa, pick)
+
+
+@pytest.mark.parametrize('case', ['bez tabulek', 'prázdný Pick, VBPA bez Kreditora', 'df_cats bez kategorie', 'LIKP bez přepravního místa'])
+def test_missing_tables(case):
+    dels, df_cats, df_likp, df_kep, df_vbpa, pick = make_data(300, 3_000)
+    active = safe_del_vectorized(pd.Series(dels)).unique()
+    args = {
+        'bez tabulek': (None, None, None, None, pd.DataFrame()),
+        'prázdný Pick, VBPA bez Kreditora': (df_cats, None, df_kep, df_vbpa.drop(columns=['Kreditor']), pick.head(0)),
+        'df_cats bez kategorie': (df_cats.drop(columns=['Kategorie']), df_likp, None, df_vbpa, pick),
+        'LIKP bez přepravního místa': (df_cats, df_likp.drop(columns=['Shipping Point/Receiving Pt']), df_kep, df_vbpa, pick.head(1000)),
+    }[case]
+    assert resolve_delivery_base_categories(active, *args) == reference(active, *args)
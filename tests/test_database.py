@@ -0,0 +1,46 @@
+"""Předpočítané artefakty (load_artifact/save_artifact): verze v klíči a poškozené soubory."""
+import os
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def artifact_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'ARTIFACT_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_round_trip(artifact_dir):
+    database.save_artifact('prep_pick', 'abc', {'a': 1})
+    assert database.load_artifact('prep_pick', 'abc') == {'a': 1}
+    assert database.load_artifact('prep_pick', 'xyz') is None
+
+
+def test_other_version_is_not_loaded(artifact_dir, monkeypatch):
+    database.save_artifact('prep_pick', 'abc', {'a': 1})
+    monkeypatch.setattr(database, 'ARTIFACT_VERSION', 'a0-pd0')
+    assert database.load_artifact('prep_pick', 'abc') is None
+
+
+@pytest.mark.parametrize('content', [b'', b'not a pickle'])
+def test_corrupt_artifact_is_a_miss(artifact_dir, content, caplog):
+    database.save_artifact('prep_pick', 'abc', {'a': 1})
+    path, = artifact_dir.iterdir()
+    path.write_bytes(content)
+    assert database.load_artifact('prep_pick', 'abc') is None
+    assert 'Poškozený artefakt' in caplog.text
+
+
+def test_keeps_newest(artifact_dir):
+    for i in range(5):
+        database.save_artifact('prep_hu', str(i), i, keep=2)
+        os.utime(database._artifact_path('prep_hu', str(i)), (i, i))
+    assert sorted(p.name for p in artifact_dir.iterdir()) == [os.path.basename(database._artifact_path('prep_hu', k)) for k in ['3', '4']]
+
+
+def test_unpicklable_object_is_logged(artifact_dir, caplog):
+    database.save_artifact('prep_voll', 'abc', lambda: None)
+    assert list(artifact_dir.iterdir()) == []
+    assert 'nelze serializovat' in caplog.text
@@ -0,0 +1,88 @@
+"""Strom HU (build_hu_index a dotazy nad ním) a detekce vollpalet: okrajové případy a shoda s původními smyčkami."""
+import pandas as pd
+import pytest
+
+import bench_vollpalettes
+from bench_hu_index import make_vekp, reference
+from core.hu import (build_hu_index, detect_vollpalettes, detect_vollpalettes_vectorized, hu_depth, hu_is_phantom, hu_leaf_pairs, hu_leaves,
+                     hu_root, hu_tree_issues, hu_tree_rows, stage_table)
+
+COLS = ['Internal HU', 'Handling Unit', 'Generated delivery', 'Higher-level HU']
+
+
+@pytest.fixture(scope='module')
+def index():
+    d = '0080000001'
+    return build_hu_index(pd.DataFrame([
+        ['100', 'E100', d, None], ['101', 'E101', d, '100'], ['102', 'E102', d, '101'], # strom o třech úrovních
+        ['200', 'E200', d, '201'], ['201', 'E201', d, '200'], ['202', 'E202', d, '200'], # cyklus a HU pod ním
+        ['300', 'E300', d, '300'], # HU nadřazená sama sobě
+        ['400', 'E400', d, '999'], ['401', 'E401', d, '999'], # nadřazená HU 999 ve VEKP chybí
+        ['500', 'E500', d, '100'], ['500', 'E500', d, None], # duplicita - platí poslední řádek
+    ], columns=COLS))
+
+
+def tree(index, h):
+    return hu_root(index, h), sorted(hu_leaves(index, h)), hu_depth(index, h)
+
+
+@pytest.mark.parametrize('vekp', [None, pd.DataFrame(), pd.DataFrame(columns=COLS), pd.DataFrame([['1', 'E1', None, None]], columns=COLS)],
+                         ids=['None', 'bez sloupců', 'bez řádků', 'bez zakázky'])
+def test_empty_vekp(vekp):
+    # Neznámá HU je kořenem i listem sama sobě
+    index = build_hu_index(vekp)
+    rows, leaves = hu_leaf_pairs(index, ['5', '6'])
+    assert len(index['hus']) == 0
+    assert len(hu_tree_issues(index)) == 0
+    assert (hu_root(index, '5'), hu_leaves(index, '5'), rows.tolist(), leaves.tolist()) == ('5', ['5'], [0, 1], ['5', '6'])
+
+
+def test_tree(index):
+    assert [tree(index, h) for h in ['100', '101', '102']] == [('100', ['102'], 0), ('100', ['102'], 1), ('100', ['102'], 2)]
+
+
+def test_cycle_has_no_root_or_leaves(index):
+    assert [tree(index, h) for h in ['200', '201', '202', '300']] == [(None, [], -1)] * 4
+
+
+def test_phantom_parent(index):
+    assert tree(index, '400') == ('999', ['400'], 1)
+    assert tree(index, '999') == ('999', ['400', '401'], 0)
+    assert hu_is_phantom(index, '999') and not hu_is_phantom(index, '400')
+
+
+def test_duplicate_row_last_wins(index):
+    assert tree(index, '500') == ('500', ['500'], 0)
+
+
+def test_leaf_pairs(index):
+    rows, leaves = hu_leaf_pairs(index, ['100', '999', '777', '200'])
+    assert rows.tolist() == [0, 1, 1, 2]
+    assert leaves.tolist() == ['102', '400', '401', '777']
+
+
+def test_tree_issues(index):
+    issues = hu_tree_issues(index)
+    assert sorted(zip(issues['HU'], issues['Nadřazená HU'], issues['Problém'].str.split().str[0])) == [
+        ('200', '201', 'Cyklus'), ('201', '200', 'Cyklus'), ('202', '200', 'Cyklus'), ('300', '300', 'Cyklus'),
+        ('400', '999', 'Nadřazená'), ('401', '999', 'Nadřazená')]
+
+
+def test_matches_reference():
+    vekp = hu_tree_rows(make_vekp(5_000))
+    ref_leaves, ref_roots = reference(vekp)
+    index = build_hu_index(vekp)
+    roots = vekp.loc[vekp['Clean_Parent'] == '', 'Clean_HU_Int']
+    assert [set(hu_leaves(index, r)) for r in roots] == [set(a) for a in ref_leaves]
+    # HU v cyklu nemá v indexu kořen (fakturace ji nikdy nezapočítá), jinak musí kořen sedět
+    for (root, cyc), h in zip(ref_roots, dict.fromkeys(vekp['Clean_HU_Int'])):
+        assert hu_root(index, h) == (None if cyc else root)
+
+
+@pytest.mark.parametrize('seed', [7, 8, 9])
+def test_vollpalettes_match_iterrows(seed):
+    df_pick, df_vekp, df_vepo = bench_vollpalettes.make_data(2_000, 8_000, seed)
+    ref = detect_vollpalettes(df_pick, df_vekp, df_vepo)
+    assert ref # data musí vollpalety obsahovat, jinak test nic neověří
+    assert detect_vollpalettes_vectorized(df_pick, df_vekp, df_vepo) == ref
+    assert detect_vollpalettes_vectorized(stage_table(df_pick, 'raw_pick'), stage_table(df_vekp, 'raw_vekp'), stage_table(df_vepo, 'raw_vepo')) == ref
@@ -0,0 +1,60 @@
+"""Pohyby: vektorová fast_compute_moves_vectorized a apply_move_limits musí dát totéž co původní smyčka fast_compute_moves."""
+import numpy as np
+import pytest
+
+from bench_moves import LIMITS, make_inputs
+from core.moves import apply_move_limits, decompose_box_moves, fast_compute_moves, fast_compute_moves_vectorized
+
+NAN = float('nan')
+
+
+def compute_all(qty, queue, su, box, w, d, v_lim, d_lim, h_lim):
+    """(celkem, přesně, bez dat) ze smyčky, vektorově a z rozkladu + limitů; všechny tři musí být shodné."""
+    ref = [np.asarray(a) for a in fast_compute_moves(qty, queue, su, box, w, d, v_lim, d_lim, h_lim)]
+    vec = fast_compute_moves_vectorized(qty, queue, su, box, w, d, v_lim, d_lim, h_lim)
+    dec = decompose_box_moves(qty, queue, su, box)
+    lim = apply_move_limits(dec['box_moves'], dec['rest'], dec['has_boxes'], dec['is_full'], w, d, v_lim, d_lim, h_lim)
+    for a, b, c in zip(ref, vec, lim):
+        np.testing.assert_array_equal(a, b)
+        np.testing.assert_array_equal(a, c)
+    return [a.tolist() for a in ref]
+
+
+@pytest.mark.parametrize('v_lim, d_lim, h_lim', LIMITS)
+def test_matches_loop_on_random_data(v_lim, d_lim, h_lim):
+    compute_all(*make_inputs(20_000), v_lim, d_lim, h_lim)
+
+
+def test_nan_qty():
+    # NaN není <= 0: celá paleta dá 1 pohyb, jinak řádek nepřispěje (zbytek NaN není > 0)
+    queue = ['PI_PL_FU', 'pi_pl_fuoe', 'PI_PL_FU', 'PI_PL', None]
+    su = ['X', ' x ', '', 'X', 'X']
+    n = len(queue)
+    res = compute_all([NAN] * n, queue, su, [[12, 6]] * n, [1.0] * n, [10.0] * n, 2.0, 15.0, 1)
+    assert res == [[1, 1, 0, 0, 0], [1, 1, 0, 0, 0], [0, 0, 0, 0, 0]]
+
+
+def test_zero_and_negative_qty():
+    res = compute_all([0.0, -3.0, -0.5], ['PI_PL_FU'] * 3, ['X'] * 3, [[6]] * 3, [1.0] * 3, [1.0] * 3, 2.0, 15.0, 1)
+    assert res == [[0, 0, 0]] * 3
+
+
+@pytest.mark.parametrize('w, d, h_lim, expected', [
+    (2.0, 1.0, 4, 7),  # váha přesně na limitu -> těžký kus, po jednom (int zbytku)
+    (1.0, 15.0, 4, 7),  # rozměr přesně na limitu -> po jednom
+    (1.99, 14.9, 4, 2),  # těsně pod limity -> ceil(7.5 / 4)
+    (1.0, 1.0, 100, 1),  # hmat větší než zbytek -> jeden pohyb
+    (1.0, 1.0, 1, 8),  # zlomek kusu se zaokrouhlí nahoru
+    (NAN, NAN, 3, 3),  # chybějící váha/rozměr se nepočítá jako těžký kus
+])
+def test_limit_edges(w, d, h_lim, expected):
+    # 19.5 ks v krabicích po 12: 1 krabice + zbytek 7.5 ks
+    res = compute_all([19.5], ['PI_PA'], [''], [[12, 1]], [w], [d], 2.0, 15.0, h_lim)
+    assert res == [[1 + expected], [1 + expected], [0]]
+
+
+def test_boxes():
+    qty = [24.0, 5.0, 5.0, 30.0, 5.0]
+    box = [[12], [1], [], [12, 5], np.nan]  # přesný násobek, jen krabice po 1, bez krabic, dvě velikosti, chybějící seznam
+    res = compute_all(qty, ['PI_PA'] * 5, [''] * 5, box, [1.0] * 5, [1.0] * 5, 2.0, 15.0, 2)
+    assert res == [[2, 3, 3, 4, 3], [2, 3, 0, 4, 0], [0, 0, 3, 0, 3]]